@@ -0,0 +1,272 @@
+"""
+会议室可用性计算引擎
+这个模块只处理时间区间，不依赖 Flask 或数据库，便于在视图、脚本和测试中复用。
+原先的实现按 15 分钟时间槽逐个统计重叠预订，复杂度为 O(时间槽数 × 预订数)；
+这里把预订的开始、结束时间整理成事件并排序一次，再做一次扫描线计算，复杂度为 O(n log n)。
+函数:
+- buffered_window: 计算包含前后缓冲时间的检查区间
+- peak_concurrency: 计算检查区间内的最大并发预订数及首次达到该值的时间
+- first_overbooked_time: 返回检查区间内并发预订数首次达到上限的时间
+- peak_concurrency_by_room: 计算多个会议室各自的最大并发预订数
+- first_overbooked_times: 对同一会议室的多个检查区间批量计算首次达到上限的时间
+- saturated_periods: 计算并发预订数达到上限的时间段
+- find_free_windows: 在搜索范围内查找满足时长和缓冲时间要求的空闲时间段
+类:
+- IntervalIndex: 按会议室保存区间的内存索引，用于批量导入时的冲突检查
+区间约定:
+    所有区间都是左闭右开的 [start, end)，与原先 start_time <= t < end_time 的判断一致。
+"""
+from bisect import bisect_left
+from datetime import timedelta
+
+# 会议前后预留的准备时间（分钟）
+BUFFER_MINUTES = 10
+
+
+def buffered_window(start_time, end_time, buffer_minutes=BUFFER_MINUTES):
+    """
+    计算包含前后缓冲时间的检查区间
+    参数:
+        start_time (datetime): 开始时间
+        end_time (datetime): 结束时间
+        buffer_minutes (int): 缓冲时间（分钟），默认值为 BUFFER_MINUTES
+    返回:
+        tuple: (检查开始时间, 检查结束时间)
+    """
+    buffer_time = timedelta(minutes=buffer_minutes)
+    return start_time - buffer_time, end_time + buffer_time
+
+
+def _sweep_events(intervals, window_start, window_end):
+    """
+    将与检查区间重叠的预订区间转换为排序后的 (时间, 增量) 事件列表
+    开始时间早于检查区间的预订从 window_start 开始计数；
+    同一时刻先处理结束事件再处理开始事件，保证区间左闭右开。
+    """
+    events = []
+    for start, end in intervals:
+        if end <= window_start or start >= window_end or start >= end:
+            continue
+        events.append((max(start, window_start), 1))
+        events.append((end, -1))
+    # 增量 -1 排在 +1 之前，即同一时刻先结束后开始
+    events.sort()
+    return events
+
+
+def peak_concurrency(intervals, window_start, window_end):
+    """
+    计算检查区间内的最大并发预订数
+    参数:
+        intervals (iterable): (开始时间, 结束时间) 元组序列
+        window_start (datetime): 检查区间开始时间
+        window_end (datetime): 检查区间结束时间
+    返回:
+        tuple: (int, datetime) 最大并发数及首次达到该值的时间；没有重叠预订时返回 (0, None)
+    """
+    peak, peak_time, current = 0, None, 0
+    for time, delta in _sweep_events(intervals, window_start, window_end):
+        current += delta
+        if current > peak and time < window_end:
+            peak, peak_time = current, time
+    return peak, peak_time
+
+
+def first_overbooked_time(intervals, window_start, window_end, limit):
+    """
+    返回检查区间内并发预订数首次达到上限的时间
+    参数:
+        intervals (iterable): (开始时间, 结束时间) 元组序列
+        window_start (datetime): 检查区间开始时间
+        window_end (datetime): 检查区间结束时间
+        limit (int): 并发上限（会议室的总槽位数）
+    返回:
+        datetime or None: 首次达到上限的时间，未达到时返回 None
+    """
+    if limit <= 0:
+        return window_start
+    current = 0
+    for time, delta in _sweep_events(intervals, window_start, window_end):
+        current += delta
+        if current >= limit and time < window_end:
+            return time
+    return None
+
+
+def peak_concurrency_by_room(intervals_by_room, window_start, window_end):
+    """
+    计算多个会议室在检查区间内的最大并发预订数
+    参数:
+        intervals_by_room (dict): {会议室ID: (开始时间, 结束时间) 元组序列}
+        window_start (datetime): 检查区间开始时间
+        window_end (datetime): 检查区间结束时间
+    返回:
+        dict: {会议室ID: 最大并发数}
+    """
+    return {
+        room_id: peak_concurrency(intervals, window_start, window_end)[0]
+        for room_id, intervals in intervals_by_room.items()
+    }
+
+
+def first_overbooked_times(intervals, windows, limit):
+    """
+    对同一会议室的多个检查区间批量计算并发预订数首次达到上限的时间
+    预订只按开始时间排序一次，每个检查区间通过二分查找只扫描开始时间早于区间结束的预订。
+    参数:
+        intervals (iterable): 该会议室的 (开始时间, 结束时间) 元组序列
+        windows (iterable): (检查区间开始时间, 检查区间结束时间) 元组序列
+        limit (int): 并发上限（会议室的总槽位数）
+    返回:
+        list: 与 windows 一一对应的首次达到上限的时间，未达到时为 None
+    """
+    ordered = sorted(intervals)
+    starts = [start for start, _ in ordered]
+    results = []
+    for window_start, window_end in windows:
+        candidates = ordered[:bisect_left(starts, window_end)]
+        results.append(first_overbooked_time(
+            candidates, window_start, window_end, limit))
+    return results
+
+
+def saturated_periods(intervals, window_start, window_end, limit):
+    """
+    计算检查区间内并发预订数达到上限的时间段
+    参数:
+        intervals (iterable): (开始时间, 结束时间) 元组序列
+        window_start (datetime): 检查区间开始时间
+        window_end (datetime): 检查区间结束时间
+        limit (int): 并发上限（会议室的总槽位数）
+    返回:
+        list: 按时间排序且互不重叠的 (开始时间, 结束时间) 列表
+    """
+    if limit <= 0:
+        return [(window_start, window_end)]
+    periods = []
+    current = 0
+    saturated_since = None
+    events = _sweep_events(intervals, window_start, window_end)
+    index = 0
+    while index < len(events):
+        # 同一时刻的事件全部处理完后再判断，避免产生长度为 0 的时间段
+        time = events[index][0]
+        while index < len(events) and events[index][0] == time:
+            current += events[index][1]
+            index += 1
+        if current >= limit and saturated_since is None:
+            saturated_since = time
+        elif current < limit and saturated_since is not None:
+            periods.append((saturated_since, min(time, window_end)))
+            saturated_since = None
+    return periods
+
+
+def find_free_windows(intervals, limit, duration, search_start, search_end,
+                      count=5, step=timedelta(minutes=30), buffer_minutes=BUFFER_MINUTES):
+    """
+    在搜索范围内查找满足时长和缓冲时间要求的空闲时间段
+    一个时间段可以预订，当且仅当加上前后缓冲时间后不与任何已满的时间段重叠，
+    与 check_room_availability 的判断结果一致。
+    参数:
+        intervals (iterable): 该会议室的 (开始时间, 结束时间) 元组序列
+        limit (int): 并发上限（会议室的总槽位数）
+        duration (timedelta): 会议时长
+        search_start (datetime): 最早开始时间
+        search_end (datetime): 最晚结束时间
+        count (int): 最多返回的时间段数量，默认值为5
+        step (timedelta): 同一空闲区间内相邻候选开始时间的间隔，默认值为30分钟
+        buffer_minutes (int): 缓冲时间（分钟），默认值为 BUFFER_MINUTES
+    返回:
+        list: 按开始时间排序的 (开始时间, 结束时间) 列表
+    """
+    buffer_time = timedelta(minutes=buffer_minutes)
+    check_start, check_end = buffered_window(
+        search_start, search_end, buffer_minutes)
+    periods = saturated_periods(intervals, check_start, check_end, limit)
+
+    windows = []
+    # 相邻两个已满时间段之间的空闲区间
+    gap_start = check_start
+    for period_start, period_end in periods + [(check_end, check_end)]:
+        earliest = max(gap_start + buffer_time, search_start)
+        latest = min(period_start - buffer_time, search_end) - duration
+        start = earliest
+        while start <= latest and len(windows) < count:
+            windows.append((start, start + duration))
+            start += step
+        if len(windows) >= count:
+            break
+        gap_start = period_end
+    return windows
+
+
+class IntervalIndex:
+    """
+    按会议室保存区间的内存索引，用于批量导入时检查同一批记录之间以及与已有预订之间的冲突
+    每个会议室的区间按开始时间排序，并记录最长的区间时长，查询时通过二分查找只扫描可能重叠的区间。
+    方法:
+        add(room_id, start_time, end_time):
+            添加一个区间
+        overlapping(room_id, window_start, window_end):
+            返回与检查区间重叠的区间
+        first_overbooked_time(room_id, start_time, end_time, limit, buffer_minutes):
+            检查新的区间（含缓冲时间）是否会超过并发上限
+    """
+
+    def __init__(self):
+        self._starts = {}
+        self._intervals = {}
+        self._longest = {}
+
+    def add(self, room_id, start_time, end_time):
+        """
+        添加一个区间
+        参数:
+            room_id (int): 会议室ID
+            start_time (datetime): 开始时间
+            end_time (datetime): 结束时间
+        """
+        starts = self._starts.setdefault(room_id, [])
+        intervals = self._intervals.setdefault(room_id, [])
+        position = bisect_left(starts, start_time)
+        starts.insert(position, start_time)
+        intervals.insert(position, (start_time, end_time))
+        self._longest[room_id] = max(
+            self._longest.get(room_id, timedelta(0)), end_time - start_time)
+
+    def overlapping(self, room_id, window_start, window_end):
+        """
+        返回与检查区间重叠的区间
+        参数:
+            room_id (int): 会议室ID
+            window_start (datetime): 检查区间开始时间
+            window_end (datetime): 检查区间结束时间
+        返回:
+            list: (开始时间, 结束时间) 元组列表
+        """
+        starts = self._starts.get(room_id)
+        if not starts:
+            return []
+        # 开始时间早于 window_start - 最长时长的区间不可能与检查区间重叠
+        low = bisect_left(starts, window_start - self._longest[room_id])
+        high = bisect_left(starts, window_end)
+        return [(start, end) for start, end in self._intervals[room_id][low:high]
+                if end > window_start]
+
+    def first_overbooked_time(self, room_id, start_time, end_time, limit,
+                              buffer_minutes=BUFFER_MINUTES):
+        """
+        检查新的区间（含缓冲时间）是否会超过并发上限，规则与 first_overbooked_time 相同
+        参数:
+            room_id (int): 会议室ID
+            start_time (datetime): 开始时间
+            end_time (datetime): 结束时间
+            limit (int): 并发上限（会议室的总槽位数）
+            buffer_minutes (int): 缓冲时间（分钟），默认值为 BUFFER_MINUTES
+        返回:
+            datetime or None: 首次达到上限的时间，未达到时返回 None
+        """
+        window_start, window_end = buffered_window(start_time, end_time, buffer_minutes)
+        return first_overbooked_time(
+            self.overlapping(room_id, window_start, window_end), window_start, window_end, limit)
@@ -0,0 +1,220 @@
+"""
+预订热点路径基准测试
+用 generate_data 在临时数据库中生成不同规模的数据，对每种规模分别测量：
+- 微基准: availability 模块的 first_overbooked_times（不访问数据库）、check_room_availability（使用缓存 / 直接查询数据库）、
+  check_room_availability_batch
+- 宏基准: 通过 Flask 测试客户端请求 dashboard、available_rooms、new_reservation 页面和提交新预订
+每种规模在单独的子进程中使用单独的数据库文件运行，缓存和连接池互不影响。
+输出每个基准的迭代次数、平均值、p50、p95（毫秒）和每秒次数，结果为 JSON，可以保存后与之后的运行比较。
+使用方法:
+    python benchmarks/bench_hot_paths.py [--sizes 1000 10000 100000] [--iterations 200] [--output result.json]
+    python benchmarks/bench_hot_paths.py --baseline result.json [--threshold 0.2]
+说明:
+    基准测试把代码复制到临时目录并在其中生成数据，不会修改 instance 目录下的数据库。
+    提交新预订时会把 views.MAX_TOTAL_MEETINGS 调大，否则生成的数据已经超过会议总数限制，所有提交都会在检查限制时返回。
+    指定 --baseline 时与之前保存的结果比较 p50，变慢超过 --threshold 的基准会被列出，并以退出码 1 结束。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 复制到临时目录时忽略的文件
+IGNORED = shutil.ignore_patterns('.git', 'instance', 'electron', 'Releases', 'node_modules',
+                                 '__pycache__', '*.db', '*.db-wal', '*.db-shm')
+# 预热次数，不计入结果
+WARMUP = 5
+
+
+def measure(name, function, iterations, size):
+    # 反复调用 function，返回耗时统计
+    for _ in range(WARMUP):
+        function()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        'size': size,
+        'benchmark': name,
+        'iterations': iterations,
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+        'p50_ms': round(samples[len(samples) // 2] * 1000, 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        'ops_per_second': round(len(samples) / sum(samples), 1),
+    }
+
+
+def run_size(size, iterations):
+    # 在子进程中执行：生成 size 条预订并运行所有基准
+    sys.path.insert(0, os.getcwd())
+    from app import create_app
+    from availability import buffered_window, first_overbooked_times
+    from generate_data import generate
+    from init_db import init_db
+    from models import Reservation, Room, db
+    import views
+
+    app = create_app({'SESSION_COOKIE_SECURE': False})
+    # 从下一个星期一开始生成数据，每次运行的星期分布相同
+    today = date.today()
+    start_date = today + timedelta(days=7 - today.weekday())
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db(app)
+        generate(app, rooms=max(10, size // 1000), users=max(50, size // 50), reservations=size,
+                 days=90, start_date=start_date, seed=0, prefix='bench')
+    base = datetime.combine(start_date, datetime.min.time())
+    rng = random.Random(0)
+
+    def random_window():
+        start = base + timedelta(days=rng.randrange(90), hours=rng.randrange(8, 18), minutes=15 * rng.randrange(4))
+        return start, start + timedelta(minutes=rng.choice((30, 60, 90)))
+
+    results = []
+
+    def bench(name, function):
+        # 每个基准使用相同的随机时间段序列，不同次运行之间可以比较
+        rng.seed(0)
+        results.append(measure(name, function, iterations, size))
+
+    with app.app_context():
+        # 预订最多的会议室排在最前面（容量最小的会议室）
+        room_ids = [room_id for (room_id,) in db.session.query(Room.id).filter(
+            Room.name.like('bench-room-%')).order_by(Room.capacity, Room.id)]
+        busiest = room_ids[0]
+
+        # 扫描线引擎本身：最忙的会议室的全部预订，一次检查 20 个时间段
+        busiest_room = db.session.get(Room, busiest)
+        intervals = [(start, end) for _, _, start, end in views.load_reservation_intervals(
+            [busiest], base, base + timedelta(days=90))]
+        bench('first_overbooked_times[20]', lambda: first_overbooked_times(
+            intervals, [buffered_window(*random_window()) for _ in range(20)], busiest_room.total_slots))
+        bench('check_room_availability[cached]', lambda: views.check_room_availability(busiest, *random_window()))
+        bench('check_room_availability[db]',
+              lambda: views.check_room_availability(busiest, *random_window(), use_cache=False))
+        bench('check_room_availability_batch[20]', lambda: views.check_room_availability_batch(
+            [(rng.choice(room_ids[:10]), *random_window()) for _ in range(20)]))
+        db.session.remove()
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench-user-1', 'password': 'password'})
+
+    def get(path):
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+
+    def available_rooms():
+        start, end = random_window()
+        get(f"/available_rooms?start_time={start:%Y-%m-%dT%H:%M}&end_time={end:%Y-%m-%dT%H:%M}")
+
+    # 在生成数据之后的日期提交，大部分提交可以成功
+    post_base = base + timedelta(days=120)
+    posted = []
+
+    def post_reservation():
+        start = post_base + timedelta(days=len(posted) // 40, hours=8 + len(posted) % 40 // 4,
+                                      minutes=15 * (len(posted) % 4))
+        posted.append(start)
+        response = client.post('/reservation/new', data={
+            'room_id': str(room_ids[len(posted) % len(room_ids)]),
+            'title': 'bench',
+            'start_time': f'{start:%Y-%m-%dT%H:%M}',
+            'end_time': f'{start + timedelta(minutes=30):%Y-%m-%dT%H:%M}',
+            'attendees': '1',
+        })
+        assert response.status_code == 302, response.status_code
+
+    bench('GET /dashboard', lambda: get('/dashboard'))
+    bench('GET /available_rooms', available_rooms)
+    bench('GET /reservation/new', lambda: get('/reservation/new'))
+    views.MAX_TOTAL_MEETINGS = sys.maxsize
+    with app.app_context():
+        before = Reservation.query.count()
+    bench('POST /reservation/new', post_reservation)
+    with app.app_context():
+        # 成功创建的预订数量，提交被拒绝时同样返回重定向
+        results[-1]['created'] = Reservation.query.count() - before
+    return results
+
+
+def compare(report, baseline, threshold):
+    # 返回 p50 比基线慢超过 threshold 的基准
+    previous = {(item['size'], item['benchmark']): item for item in baseline['results']}
+    regressions = []
+    for item in report['results']:
+        old = previous.get((item['size'], item['benchmark']))
+        if old and old['p50_ms'] and item['p50_ms'] > old['p50_ms'] * (1 + threshold):
+            regressions.append({'size': item['size'], 'benchmark': item['benchmark'],
+                                'baseline_p50_ms': old['p50_ms'], 'p50_ms': item['p50_ms'],
+                                'change': round(item['p50_ms'] / old['p50_ms'] - 1, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='预订热点路径基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='预订数量')
+    parser.add_argument('--iterations', type=int, default=200, help='每个基准的测量次数')
+    parser.add_argument('--output', help='把结果写入 JSON 文件，默认输出到标准输出')
+    parser.add_argument('--baseline', help='与之前保存的 JSON 结果比较')
+    parser.add_argument('--threshold', type=float, default=0.2, help='p50 变慢超过这个比例时视为性能回退')
+    parser.add_argument('--run-size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size is not None:
+        print(json.dumps(run_size(args.run_size, args.iterations)))
+        return
+
+    directory = tempfile.mkdtemp()
+    try:
+        source = os.path.join(directory, 'app')
+        shutil.copytree(ROOT, source, ignore=IGNORED)
+        results = []
+        for size in args.sizes:
+            output = subprocess.run(
+                [sys.executable, os.path.join('benchmarks', os.path.basename(__file__)),
+                 '--run-size', str(size), '--iterations', str(args.iterations)],
+                cwd=source, check=True, stdout=subprocess.PIPE, text=True,
+                env=dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, f'bench-{size}.db')}")).stdout
+            results.extend(json.loads(output.splitlines()[-1]))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'iterations': args.iterations,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        for item in regressions:
+            print(f"性能回退: {item['benchmark']}（{item['size']} 条预订）p50 "
+                  f"{item['baseline_p50_ms']} ms -> {item['p50_ms']} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
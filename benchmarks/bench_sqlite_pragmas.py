@@ -0,0 +1,135 @@
+"""
+SQLite 连接参数基准测试
+模拟多个 gunicorn 工作进程同时读写预订表，比较默认连接参数和 sqlite_pragmas 中的调优参数。
+每个进程使用独立的引擎，按比例混合执行：
+- 读: 查询某个会议室某一天的预订（与可用性检查相同的查询）
+- 写: 插入一条预订并提交
+输出每种配置的吞吐量（次/秒）、读写次数和 "database is locked" 错误次数。
+使用方法:python benchmarks/bench_sqlite_pragmas.py [--processes 4] [--seconds 5] [--write-ratio 0.2]
+说明:基准测试使用临时数据库文件，不会修改 instance 目录下的数据库。
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlite_pragmas import install_pragmas, pragmas_from_env  # noqa: E402
+
+ROOMS = 20
+BASE_TIME = datetime(2024, 1, 1, 8, 0)
+
+SCHEMA = [
+    'CREATE TABLE reservation ('
+    'id INTEGER PRIMARY KEY, room_id INTEGER NOT NULL, user_id INTEGER NOT NULL, '
+    'title VARCHAR(200) NOT NULL, start_time DATETIME NOT NULL, end_time DATETIME NOT NULL, '
+    'purpose VARCHAR(200), created_at DATETIME, attendees INTEGER)',
+    'CREATE INDEX ix_reservation_room_time ON reservation (room_id, start_time, end_time)',
+]
+
+
+def make_engine(path, tuned):
+    # 默认配置只保留 pysqlite 自带的 5 秒等待，调优配置使用 sqlite_pragmas 的默认值
+    engine = create_engine(f'sqlite:///{path}')
+    if tuned:
+        install_pragmas(engine, pragmas_from_env({}))
+    return engine
+
+
+def prepare(path, rows):
+    engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as connection:
+        for statement in SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text(
+            'INSERT INTO reservation (room_id, user_id, title, start_time, end_time) '
+            'VALUES (:room_id, 1, :title, :start_time, :end_time)'
+        ), [_random_reservation(random.Random(i)) for i in range(rows)])
+    engine.dispose()
+
+
+def _random_reservation(rng):
+    start = BASE_TIME + timedelta(days=rng.randrange(30), minutes=15 * rng.randrange(40))
+    return {'room_id': rng.randrange(1, ROOMS + 1), 'title': 'bench',
+            'start_time': start, 'end_time': start + timedelta(minutes=30 * rng.randrange(1, 5))}
+
+
+def worker(path, tuned, seconds, write_ratio, seed, barrier, results):
+    rng = random.Random(seed)
+    engine = make_engine(path, tuned)
+    reads = writes = locked = 0
+    barrier.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as connection:
+                    connection.execute(text(
+                        'INSERT INTO reservation (room_id, user_id, title, start_time, end_time) '
+                        'VALUES (:room_id, 1, :title, :start_time, :end_time)'
+                    ), _random_reservation(rng))
+                writes += 1
+            else:
+                day = BASE_TIME + timedelta(days=rng.randrange(30))
+                with engine.connect() as connection:
+                    connection.execute(text(
+                        'SELECT start_time, end_time FROM reservation '
+                        'WHERE room_id = :room_id AND end_time > :start AND start_time < :end'
+                    ), {'room_id': rng.randrange(1, ROOMS + 1), 'start': day,
+                        'end': day + timedelta(days=1)}).all()
+                reads += 1
+        except OperationalError:
+            locked += 1
+    engine.dispose()
+    results.put((reads, writes, locked))
+
+
+def run(tuned, processes, seconds, write_ratio, rows):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench.db')
+    prepare(path, rows)
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [
+        context.Process(target=worker, args=(path, tuned, seconds, write_ratio, seed, barrier, results))
+        for seed in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    totals = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    reads = sum(item[0] for item in totals)
+    writes = sum(item[1] for item in totals)
+    return {
+        'config': 'tuned' if tuned else 'default',
+        'reads': reads,
+        'writes': writes,
+        'locked_errors': sum(item[2] for item in totals),
+        'ops_per_second': round((reads + writes) / seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite 连接参数基准测试')
+    parser.add_argument('--processes', type=int, default=4, help='并发进程数，默认与 gunicorn 工作进程数相同')
+    parser.add_argument('--seconds', type=float, default=5, help='每种配置的运行时间（秒）')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='写操作所占比例')
+    parser.add_argument('--rows', type=int, default=20000, help='预先插入的预订数量')
+    args = parser.parse_args()
+    report = [run(tuned, args.processes, args.seconds, args.write_ratio, args.rows)
+              for tuned in (False, True)]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+导入和冷启动时间基准测试
+每次测量都在新的 Python 进程中进行，比较以下几种启动方式：
+- import_app: 只导入 app 模块（工厂函数，不创建应用）
+- maintenance: create_app(web=False)，初始化数据库、清理过期预订等维护脚本使用的方式
+- web: create_app()，加载路由、模板和缓存
+- first_request: create_app() 并处理第一个请求（登录页面），即工作进程的冷启动时间
+输出每种方式进程内耗时和包括解释器启动在内的总耗时的中位数（毫秒），以及加载的模块数量。
+使用方法:python benchmarks/bench_startup.py [--repeat 10]
+说明:基准测试通过 DATABASE_URL 使用临时数据库文件，不会修改 instance 目录下的数据库。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 启动方式 -> 在子进程中执行的语句
+SCENARIOS = {
+    'import_app': 'import app',
+    'maintenance': 'import app; app.create_app(web=False)',
+    'web': 'import app; app.create_app()',
+    'first_request': 'import app; app.create_app().test_client().get("/login")',
+}
+
+# 子进程中计时并输出耗时和模块数量
+TEMPLATE = '''
+import sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(elapsed, len(sys.modules))
+'''
+
+
+def measure(statement, env):
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', TEMPLATE.format(statement=statement)],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+    total = time.perf_counter() - started
+    elapsed, modules = output.split()
+    return float(elapsed), total, int(modules)
+
+
+def run(name, statement, repeat, env):
+    # 第一次运行用于生成字节码缓存，不计入结果
+    measure(statement, env)
+    samples = [measure(statement, env) for _ in range(repeat)]
+    return {
+        'scenario': name,
+        'in_process_ms': round(statistics.median(sample[0] for sample in samples) * 1000, 1),
+        'total_ms': round(statistics.median(sample[1] for sample in samples) * 1000, 1),
+        'modules': samples[0][2],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导入和冷启动时间基准测试')
+    parser.add_argument('--repeat', type=int, default=10, help='每种方式的测量次数')
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'bench.db')}")
+    report = [run(name, statement, args.repeat, env) for name, statement in SCENARIOS.items()]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
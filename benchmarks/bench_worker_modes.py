@@ -0,0 +1,206 @@
+"""
+gunicorn 工作进程模式负载测试
+分别以 sync 和 gthread（以及已安装 gevent 时的 gevent）工作进程启动应用，
+用多个并发客户端反复请求仪表板和可用会议室接口，同时用若干“慢客户端”逐字节发送请求头，
+模拟周一早上预订高峰期网络较差的客户端占用连接的情况。
+输出每种模式的请求数、错误数、p50/p99 延迟（毫秒）和吞吐量（次/秒）。
+使用方法:python benchmarks/bench_worker_modes.py [--modes sync gthread] [--clients 32] [--slow-clients 8] [--seconds 10]
+说明:
+    基准测试把代码复制到临时目录并在其中初始化数据库，不会修改 instance 目录下的数据库。
+    会话 Cookie 设置了 Secure 标志，因此客户端直接解析 Set-Cookie 并手动发送 Cookie 头。
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 复制到临时目录时忽略的文件
+IGNORED = shutil.ignore_patterns('.git', 'instance', 'electron', 'Releases', 'node_modules',
+                                 '__pycache__', '*.db', '*.db-wal', '*.db-shm')
+RESERVATIONS = 200
+
+
+def prepare(directory):
+    # 复制代码并初始化数据库，插入一些预订让页面有真实的查询量
+    source = os.path.join(directory, 'app')
+    shutil.copytree(ROOT, source, ignore=IGNORED)
+    script = (
+        'from datetime import datetime, timedelta\n'
+        'import init_db; init_db.init_db()\n'
+        'from app import create_app\n'
+        'from models import db, Reservation, Room, User, record_reservation_changes\n'
+        'with create_app(web=False).app_context():\n'
+        '    admin = User.query.filter_by(username="admin").one()\n'
+        '    rooms = [room.id for room in Room.query.all()]\n'
+        '    base = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)\n'
+        f'    for index in range({RESERVATIONS}):\n'
+        '        start = base + timedelta(days=index // 40, hours=index % 8)\n'
+        '        room = rooms[(index // 8) % len(rooms)]\n'
+        '        db.session.add(Reservation(room_id=room, user_id=admin.id, title="bench",\n'
+        '                                   start_time=start, end_time=start + timedelta(minutes=40)))\n'
+        '        record_reservation_changes([(room, admin.id, 1)])\n'
+        '    db.session.commit()\n'
+    )
+    subprocess.run([sys.executable, '-c', script], cwd=source, check=True, stdout=subprocess.DEVNULL)
+    return source
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(source, worker_class, workers, threads, port):
+    env = dict(os.environ,
+               GUNICORN_BIND=f'127.0.0.1:{port}',
+               GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_WORKERS=str(workers),
+               GUNICORN_THREADS=str(threads),
+               GUNICORN_TIMEOUT='30')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'wsgi:app', '-c', 'gunicorn.conf.py'],
+        cwd=source, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            status, _, _ = request(port, 'GET', '/login')
+            if status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{worker_class} 工作进程启动失败')
+
+
+def request(port, method, path, body=None, cookie=None, timeout=30):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    headers = {}
+    if cookie:
+        headers['Cookie'] = cookie
+    if body is not None:
+        body = urlencode(body)
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    try:
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status, response.getheader('Set-Cookie'), response
+    finally:
+        connection.close()
+
+
+def login(port):
+    _, set_cookie, _ = request(port, 'POST', '/login', {'username': 'admin', 'password': 'admin123'})
+    # 只需要 Cookie 的“名称=值”部分
+    return set_cookie.split(';', 1)[0]
+
+
+def client(port, cookie, paths, deadline, latencies, errors):
+    index = 0
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            status, _, _ = request(port, 'GET', path, cookie=cookie)
+        except OSError:
+            errors.append(1)
+            continue
+        if status != 200:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+def slow_client(port, deadline, byte_interval):
+    # 每个字节之间等待 byte_interval 秒，一个请求大约需要数秒才能发完
+    payload = b'GET /login HTTP/1.1\r\nHost: 127.0.0.1\r\nX-Slow-Client: 1\r\n\r\n'
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=30) as sock:
+                for offset in range(len(payload)):
+                    if time.perf_counter() >= deadline:
+                        return
+                    sock.sendall(payload[offset:offset + 1])
+                    time.sleep(byte_interval)
+                sock.recv(65536)
+        except OSError:
+            time.sleep(byte_interval)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(source, worker_class, args):
+    port = free_port()
+    process = start_server(source, worker_class, args.workers, args.threads, port)
+    try:
+        cookie = login(port)
+        start = (datetime.now() + timedelta(days=1)).replace(hour=10, minute=0)
+        window = urlencode({'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+                            'end_time': (start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M')})
+        paths = ['/dashboard', f'/available_rooms?{window}']
+        latencies = []
+        errors = []
+        deadline = time.perf_counter() + args.seconds
+        threads = [threading.Thread(target=slow_client, args=(port, deadline, args.byte_interval))
+                   for _ in range(args.slow_clients)]
+        threads += [threading.Thread(target=client, args=(port, cookie, paths, deadline, latencies, errors))
+                    for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        'worker_class': worker_class,
+        'workers': args.workers,
+        'threads': args.threads if worker_class == 'gthread' else 1,
+        'clients': args.clients,
+        'slow_clients': args.slow_clients,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        'requests_per_second': round(len(latencies) / args.seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='gunicorn 工作进程模式负载测试')
+    default_modes = ['sync', 'gthread'] + (['gevent'] if importlib.util.find_spec('gevent') else [])
+    parser.add_argument('--modes', nargs='+', default=default_modes, help='要比较的工作进程类型')
+    parser.add_argument('--workers', type=int, default=4, help='工作进程数')
+    parser.add_argument('--threads', type=int, default=8, help='gthread 模式下每个进程的线程数')
+    parser.add_argument('--clients', type=int, default=32, help='正常客户端数量')
+    parser.add_argument('--slow-clients', type=int, default=8, help='慢客户端数量')
+    parser.add_argument('--byte-interval', type=float, default=0.05, help='慢客户端发送每个字节的间隔（秒）')
+    parser.add_argument('--seconds', type=float, default=10, help='每种模式的运行时间（秒）')
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    try:
+        source = prepare(directory)
+        report = [run(source, mode, args) for mode in args.modes]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+串行化预订事务
+检查可用性和写入预订如果分两步执行，多个 gunicorn 工作进程可能同时通过检查，导致超额预订。
+这个模块把“检查 + 写入”放进同一个写事务：
+- SQLite: 使用 BEGIN IMMEDIATE 在事务开始时就获取写锁，其他写事务必须等待；
+- 其他数据库: 使用 SELECT ... FOR UPDATE 锁定会议室记录，只串行化同一会议室的预订。
+获取锁失败（数据库被锁定）时按指数退避重试，次数有限。
+类:
+- BookingConflict: 事务内可用性检查失败时抛出的异常
+- BookingStats: 记录事务次数、重试次数和等待锁的时间
+函数:
+- run_serialized(session, room_model, room_id, work, stats): 在串行化事务中执行 work 并提交
+"""
+import random
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+# 获取锁失败时的最大尝试次数和首次重试前的等待时间（秒）
+MAX_ATTEMPTS = 5
+BASE_DELAY = 0.05
+
+
+class BookingConflict(Exception):
+    """
+    事务内可用性检查失败时抛出的异常
+    属性:
+        message (str): 展示给用户的原因
+    """
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class BookingStats:
+    """
+    记录串行化预订事务的统计数据（按工作进程统计）
+    方法:
+        record(lock_wait, retries, outcome):
+            记录一次事务
+        stats():
+            返回统计数据
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.transactions = 0
+        self.conflicts = 0
+        self.retries = 0
+        self.lock_failures = 0
+        self.lock_wait_total = 0.0
+        self.lock_wait_max = 0.0
+
+    def record(self, lock_wait, retries, outcome):
+        """
+        记录一次事务
+        参数:
+            lock_wait (float): 本次事务等待锁的总时间（秒）
+            retries (int): 本次事务的重试次数
+            outcome (str): 'committed'、'conflict' 或 'lock_failed'
+        """
+        with self._lock:
+            self.transactions += 1
+            self.retries += retries
+            self.lock_wait_total += lock_wait
+            self.lock_wait_max = max(self.lock_wait_max, lock_wait)
+            if outcome == 'conflict':
+                self.conflicts += 1
+            elif outcome == 'lock_failed':
+                self.lock_failures += 1
+
+    def stats(self):
+        """
+        返回统计数据
+        返回:
+            dict: 包含 transactions、conflicts、retries、lock_failures、
+                lock_wait_total、lock_wait_max 和 lock_wait_avg（秒）
+        """
+        with self._lock:
+            return {
+                'transactions': self.transactions,
+                'conflicts': self.conflicts,
+                'retries': self.retries,
+                'lock_failures': self.lock_failures,
+                'lock_wait_total': self.lock_wait_total,
+                'lock_wait_max': self.lock_wait_max,
+                'lock_wait_avg': (self.lock_wait_total / self.transactions
+                                  if self.transactions else 0.0),
+            }
+
+
+def _is_lock_error(error):
+    # SQLite 在写锁被占用且超过 busy_timeout 时报 "database is locked"
+    return 'locked' in str(error.orig).lower() or 'busy' in str(error.orig).lower()
+
+
+def _acquire(session, room_model, room_id):
+    # 开始写事务并获取锁，调用前会话中不能有未提交的写操作
+    connection = session.connection()
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+    elif room_id is not None:
+        session.query(room_model).filter(
+            room_model.id == room_id).with_for_update().one_or_none()
+
+
+def run_serialized(session, room_model, room_id, work, stats=None,
+                   max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY):
+    """
+    在串行化事务中执行 work 并提交
+    参数:
+        session (sqlalchemy.orm.Session): 数据库会话
+        room_model (type): 会议室模型，用于在非 SQLite 数据库上锁定会议室记录
+        room_id (int): 会议室ID，为 None 时在非 SQLite 数据库上不锁定会议室记录（用于批量删除等操作）
+        work (callable): 无参数函数，在持有锁时执行可用性检查和写入；检查失败时抛出 BookingConflict
+        stats (BookingStats, optional): 统计数据
+        max_attempts (int): 获取锁失败时的最大尝试次数
+        base_delay (float): 首次重试前的等待时间（秒），之后每次翻倍并加入随机抖动
+    返回:
+        work 的返回值
+    异常:
+        BookingConflict: 可用性检查失败
+        sqlalchemy.exc.OperationalError: 多次重试后仍无法获取锁
+    """
+    lock_wait = 0.0
+    for attempt in range(max_attempts):
+        started = time.perf_counter()
+        try:
+            _acquire(session, room_model, room_id)
+        except OperationalError as error:
+            lock_wait += time.perf_counter() - started
+            session.rollback()
+            if not _is_lock_error(error) or attempt == max_attempts - 1:
+                if stats is not None:
+                    stats.record(lock_wait, attempt, 'lock_failed')
+                raise
+            time.sleep(base_delay * (2 ** attempt) * (1 + random.random()))
+            continue
+        lock_wait += time.perf_counter() - started
+
+        try:
+            result = work()
+            session.commit()
+        except BookingConflict:
+            session.rollback()
+            if stats is not None:
+                stats.record(lock_wait, attempt, 'conflict')
+            raise
+        except Exception:
+            session.rollback()
+            raise
+        if stats is not None:
+            stats.record(lock_wait, attempt, 'committed')
+        return result
@@ -0,0 +1,60 @@
+"""
+批量导出数据的格式化
+把数据库逐批返回的行编码为 CSV 或 JSON Lines 文本块，供流式响应和命令行命令使用，不访问数据库。
+每次只编码一批行，内存占用与导出的总行数无关。
+变量:
+- EXPORT_FORMATS: 支持的导出格式及其 MIME 类型
+函数:
+- encode_rows(rows, columns, fmt, batch_size): 把行序列编码为文本块
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from itertools import islice
+
+# 导出格式 -> MIME 类型
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _json_value(value):
+    # 日期时间使用 ISO 8601 格式，与导入时接受的格式一致
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+def encode_rows(rows, columns, fmt, batch_size=1000):
+    """
+    把行序列编码为文本块
+    参数:
+        rows (iterable): 与 columns 顺序一致的行元组序列，可以是数据库游标
+        columns (list): 列名
+        fmt (str): 'csv' 或 'jsonl'
+        batch_size (int): 每个文本块包含的行数
+    返回:
+        generator: 文本块，CSV 格式的第一个文本块是表头
+    """
+    iterator = iter(rows)
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        if fmt == 'csv':
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(batch)
+            yield buffer.getvalue()
+        else:
+            yield ''.join(
+                json.dumps({column: _json_value(value) for column, value in zip(columns, row)},
+                           ensure_ascii=False) + '\n'
+                for row in batch)
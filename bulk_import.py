@@ -0,0 +1,273 @@
+"""
+批量导入数据的读取和校验
+导入文件可以是 CSV（第一行为表头）或 JSON Lines（每行一个 JSON 对象），逐行读取，不会把整个文件载入内存。
+这个模块只负责读取、字段解析、分块和错误报告，不访问数据库；
+按块查询会议室/用户、检查冲突和批量写入由 views.py 中的 import_data 完成。
+变量:
+- IMPORT_KINDS: 支持导入的数据类型
+- IMPORT_CHUNK_SIZE: 默认每个事务写入的行数
+- MAX_REPORTED_ERRORS: 错误报告中最多保留的错误数量
+类:
+- ImportRowError: 单行数据无效时抛出的异常
+- ImportReport: 导入结果和逐行错误报告
+函数:
+- detect_format(filename): 根据文件扩展名判断文件格式
+- read_rows(stream, fmt): 逐行读取 CSV 或 JSON Lines 文件
+- chunked(rows, size): 把行序列按固定大小分块
+- parse_room / parse_user / parse_reservation: 解析并校验一行数据
+字段:
+- rooms: name, capacity, total_slots, max_reservations（可选）, description（可选）
+- users: username, password, is_admin（可选，true/false/1/0）
+- reservations: room_id 或 room_name, user_id 或 username, title, start_time, end_time,
+  purpose（可选）, attendees（可选）；时间格式为 ISO 8601，例如 2024-05-01 09:00 或 2024-05-01T09:00，
+  按服务器本地时间解释，不能带时区偏移
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+
+# 支持导入的数据类型
+IMPORT_KINDS = ('rooms', 'users', 'reservations')
+
+# 默认每个事务写入的行数
+IMPORT_CHUNK_SIZE = 500
+
+# 错误报告中最多保留的错误数量，超过的错误只计数
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportRowError(Exception):
+    """
+    单行数据无效时抛出的异常
+    属性:
+        message (str): 错误原因
+    """
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class ImportReport:
+    """
+    导入结果和逐行错误报告
+    属性:
+        processed (int): 读取的行数
+        imported (int): 成功导入的行数
+        failed (int): 失败的行数
+        errors (list): (行号, 错误原因) 列表，最多保留 max_errors 条
+        on_error (callable, optional): 每出现一个错误时调用 on_error(行号, 错误原因)，
+            命令行工具用它把完整的错误报告逐行写入文件
+    方法:
+        add_error(line, message):
+            记录一行错误
+        to_dict():
+            返回可以转换为 JSON 的导入结果
+    """
+
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS, on_error=None):
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+        self.on_error = on_error
+
+    def add_error(self, line, message):
+        """
+        记录一行错误
+        参数:
+            line (int): 行号（CSV 表头为第 1 行）
+            message (str): 错误原因
+        """
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+        if self.on_error is not None:
+            self.on_error(line, message)
+
+    def to_dict(self):
+        """
+        返回可以转换为 JSON 的导入结果
+        返回:
+            dict: 包含 processed、imported、failed、errors 和 errors_truncated
+        """
+        return {
+            'processed': self.processed,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': [{'line': line, 'error': message} for line, message in self.errors],
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def detect_format(filename):
+    """
+    根据文件扩展名判断文件格式
+    参数:
+        filename (str): 文件名
+    返回:
+        str: 'csv' 或 'jsonl'
+    """
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """
+    逐行读取 CSV 或 JSON Lines 文件
+    参数:
+        stream (file): 二进制或文本文件对象，二进制文件按 UTF-8（可带 BOM）解码
+        fmt (str): 'csv' 或 'jsonl'
+    返回:
+        generator: (行号, dict 或 ImportRowError) 元组；无法解析的行返回 ImportRowError 而不是中断读取
+    """
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield line_number, ImportRowError(f'JSON 格式错误: {error}')
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ImportRowError('每行必须是一个 JSON 对象')
+            continue
+        yield line_number, row
+
+
+def chunked(rows, size):
+    """
+    把行序列按固定大小分块
+    参数:
+        rows (iterable): 行序列
+        size (int): 每块的行数
+    返回:
+        generator: 每次返回一个最多 size 项的列表
+    """
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _text(row, field, required=True, max_length=None):
+    value = row.get(field)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise ImportRowError(f'缺少字段 {field}')
+    if max_length and len(value) > max_length:
+        raise ImportRowError(f'字段 {field} 超过 {max_length} 个字符')
+    return value
+
+
+def _integer(row, field, default=None, minimum=1):
+    value = row.get(field)
+    if value is None or str(value).strip() == '':
+        if default is None:
+            raise ImportRowError(f'缺少字段 {field}')
+        return default
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        raise ImportRowError(f'字段 {field} 必须是整数')
+    if number < minimum:
+        raise ImportRowError(f'字段 {field} 不能小于 {minimum}')
+    return number
+
+
+def _boolean(row, field):
+    value = str(row.get(field) or '').strip().lower()
+    if value in ('', '0', 'false', 'no', 'n'):
+        return False
+    if value in ('1', 'true', 'yes', 'y'):
+        return True
+    raise ImportRowError(f'字段 {field} 必须是 true 或 false')
+
+
+def _datetime(row, field):
+    value = _text(row, field)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ImportRowError(f'字段 {field} 不是有效的时间: {value}')
+    # 预订时间按服务器本地时间保存，不带时区；带时区偏移的时间无法与其他行比较
+    if parsed.tzinfo is not None:
+        raise ImportRowError(f'字段 {field} 不能包含时区: {value}')
+    return parsed
+
+
+def parse_room(row):
+    """
+    解析并校验一行会议室数据
+    参数:
+        row (dict): 原始数据
+    返回:
+        dict: Room 的字段
+    异常:
+        ImportRowError: 数据无效
+    """
+    return {
+        'name': _text(row, 'name', max_length=100),
+        'capacity': _integer(row, 'capacity'),
+        'total_slots': _integer(row, 'total_slots'),
+        'max_reservations': _integer(row, 'max_reservations', default=5),
+        'description': _text(row, 'description', required=False),
+    }
+
+
+def parse_user(row):
+    """
+    解析并校验一行用户数据
+    参数:
+        row (dict): 原始数据
+    返回:
+        dict: User 的字段
+    异常:
+        ImportRowError: 数据无效
+    """
+    return {
+        'username': _text(row, 'username', max_length=80),
+        'password': _text(row, 'password', max_length=120),
+        'is_admin': _boolean(row, 'is_admin'),
+    }
+
+
+def parse_reservation(row):
+    """
+    解析并校验一行预订数据，会议室和用户可以用ID或名称指定
+    参数:
+        row (dict): 原始数据
+    返回:
+        dict: Reservation 的字段，另外包含用于查找会议室和用户的 room_name、username（ID 未指定时）
+    异常:
+        ImportRowError: 数据无效
+    """
+    record = {
+        'title': _text(row, 'title', max_length=200),
+        'start_time': _datetime(row, 'start_time'),
+        'end_time': _datetime(row, 'end_time'),
+        'purpose': _text(row, 'purpose', required=False, max_length=200),
+        'attendees': _integer(row, 'attendees', default=1),
+    }
+    if record['start_time'] >= record['end_time']:
+        raise ImportRowError('开始时间必须早于结束时间')
+    if _text(row, 'room_id', required=False):
+        record['room_id'] = _integer(row, 'room_id')
+    else:
+        record['room_name'] = _text(row, 'room_name')
+    if _text(row, 'user_id', required=False):
+        record['user_id'] = _integer(row, 'user_id')
+    else:
+        record['username'] = _text(row, 'username')
+    return record
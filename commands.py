@@ -0,0 +1,129 @@
+"""
+flask 命令行命令
+命令由 create_app 注册。只需要数据库的命令（cleanup、rebuild-counters）不导入 views 模块；
+导入、导出和查询预算命令需要 views 中的函数、缓存和路由，在执行时才导入，
+应用以 create_app(web=False) 创建时由 _load_views 补充初始化。
+命令:
+- flask cleanup: 立即执行一次过期预订清理
+- flask rebuild-counters: 根据预订表重新计算预订数量计数器
+- flask export-reservations: 按筛选条件导出预订
+- flask import-data: 从 CSV 或 JSON Lines 文件批量导入数据
+- flask check-query-budgets: 检查关键视图的 SQL 查询数是否超过预算，可用于持续集成
+函数:
+- register_commands(app): 把命令注册到应用
+"""
+import csv
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from bulk_export import EXPORT_FORMATS, encode_rows
+from bulk_import import IMPORT_CHUNK_SIZE, IMPORT_KINDS, ImportReport, detect_format
+from models import rebuild_reservation_counters
+from query_budget import check_query_budgets
+
+
+def _load_views():
+    # 导入 views 模块；应用创建时没有加载 Web 界面则在这里创建缓存并注册蓝图
+    import views
+    if 'occupancy_cache' not in current_app.extensions:
+        views.init_app(current_app._get_current_object())
+    return views
+
+
+@click.command('cleanup')
+@with_appcontext
+def cleanup_command():
+    """立即清理一次过期预订，可用于 cron 或托管平台的定时任务"""
+    removed = current_app.extensions['maintenance_scheduler'].run_once()
+    print(f'已清理 {removed} 条过期预订')
+
+
+@click.command('rebuild-counters')
+@with_appcontext
+def rebuild_counters_command():
+    """根据预订表重新计算预订数量计数器，用于手动修改数据库之后"""
+    total = rebuild_reservation_counters()
+    print(f'已重新计算预订数量计数器，当前预订总数 {total}')
+
+
+@click.command('export-reservations')
+@click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), default='csv',
+              show_default=True, help='导出格式')
+@click.option('--room-id', type=int, help='只导出这个会议室的预订')
+@click.option('--username', help='只导出这个用户的预订')
+@click.option('--date-from', help='最早的开始日期，格式为 YYYY-MM-DD')
+@click.option('--date-to', help='最晚的开始日期，格式为 YYYY-MM-DD')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-',
+              help='输出文件，默认为标准输出')
+@with_appcontext
+def export_reservations_command(fmt, room_id, username, date_from, date_to, output):
+    """按筛选条件导出预订，逐批读取和写入，适合导出大量数据"""
+    views = _load_views()
+    criteria = views.reservation_filters(room_id, username, views.parse_date(date_from), views.parse_date(date_to))
+    rows = views.export_reservation_rows(criteria)
+    for chunk in encode_rows(rows, views.EXPORT_COLUMNS, fmt, views.EXPORT_BATCH_SIZE):
+        output.write(chunk)
+
+
+@click.command('import-data')
+@click.argument('kind', type=click.Choice(IMPORT_KINDS))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='文件格式，默认根据扩展名判断')
+@click.option('--chunk-size', default=IMPORT_CHUNK_SIZE, show_default=True,
+              help='每个事务写入的行数')
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False),
+              help='把完整的逐行错误报告写入这个 CSV 文件')
+@with_appcontext
+def import_data_command(kind, path, fmt, chunk_size, errors_path):
+    """从 CSV 或 JSON Lines 文件批量导入会议室、用户或预订"""
+    views = _load_views()
+    errors_file = open(errors_path, 'w', newline='', encoding='utf-8') if errors_path else None
+    try:
+        if errors_file:
+            writer = csv.writer(errors_file)
+            writer.writerow(['line', 'error'])
+            report = ImportReport(max_errors=0, on_error=lambda line, message: writer.writerow([line, message]))
+        else:
+            report = ImportReport()
+        with open(path, 'rb') as stream:
+            views.import_data(stream, fmt or detect_format(path), kind, report, chunk_size)
+    finally:
+        if errors_file:
+            errors_file.close()
+    print(f'读取 {report.processed} 行，成功导入 {report.imported} 行，失败 {report.failed} 行')
+    if not errors_file:
+        for line, message in report.errors:
+            print(f'第 {line} 行: {message}')
+
+
+@click.command('check-query-budgets')
+@click.option('--verbose', is_flag=True, help='列出每个视图执行的 SQL 语句')
+@with_appcontext
+def check_query_budgets_command(verbose):
+    """检查关键视图的 SQL 查询数是否超过预算，超过时列出执行的语句并以退出码 1 结束"""
+    _load_views()
+    failed = False
+    for result in check_query_budgets(current_app._get_current_object()):
+        over = result['status'] != 200 or result['queries'] > result['max_queries']
+        failed = failed or over
+        print(f"{'超出' if over else '通过'} {result['endpoint']} {result['path']}: "
+              f"{result['queries']}/{result['max_queries']} 条查询，状态码 {result['status']}")
+        if over or verbose:
+            for index, statement in enumerate(result['statements'], 1):
+                print(f'  {index}. {statement}')
+    if failed:
+        raise SystemExit(1)
+
+
+def register_commands(app):
+    """
+    把命令注册到应用
+    参数:
+        app (flask.Flask): 应用实例
+    """
+    for command in (cleanup_command, rebuild_counters_command, export_reservations_command,
+                    import_data_command, check_query_budgets_command):
+        app.cli.add_command(command)
@@ -0,0 +1,92 @@
+"""
+应用配置
+所有配置都从环境变量读取，未设置时使用与原来硬编码的值相同的默认值；create_app 的 config 参数可以再覆盖其中任意一项。
+这个模块导入时不会加载 Flask，也不会创建数据库连接。
+环境变量:
+- SECRET_KEY: Flask 应用程序的密钥，生产环境必须设置
+- DATABASE_URL: 数据库 URI，默认为实例目录下的 SQLite 数据库 meeting_rooms.db
+- SESSION_COOKIE_SECURE: 是否只通过 HTTPS 发送会话和记住我 Cookie，默认为 true
+- OCCUPANCY_CACHE_SIZE: 每个工作进程缓存的 (会议室, 日期) 占用情况条目数，0 表示不缓存
+- USER_CACHE_TTL_SECONDS: 登录用户身份缓存的有效时间（秒），0 表示不缓存
+- DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT: 连接池大小、溢出连接数和等待连接的超时时间，
+  未设置时使用 SQLAlchemy 的默认值 5、10、30 秒；gthread/gevent 工作进程下 gunicorn.conf.py 会按并发数设置 DB_POOL_SIZE
+- SQLITE_*: SQLite 连接参数（WAL、busy_timeout 等），见 sqlite_pragmas 模块
+- CLEANUP_INTERVAL_SECONDS: 后台清理过期预订的间隔（秒），0 表示不启动后台清理
+- MAX_RESERVATIONS_PER_USER: 每个普通用户最多持有的预订数量，0 表示不限制
+- ENFORCE_ROOM_QUOTA: 是否按会议室的 max_reservations 限制预订数量
+- METRICS_FLUSH_SECONDS: 每个工作进程写入指标快照的最小间隔（秒），/metrics 中其他工作进程的数据最多延迟这么久
+- SLOW_QUERY_SECONDS: 执行时间超过这个值（秒）的 SQL 语句连同路由和参数写入日志，0 表示不记录
+- PROFILE_SAMPLE_RATE: 随机在 cProfile 下执行的请求比例，0 表示只分析管理员带 X-Profile: 1 请求头的请求
+- PROFILE_KEEP: 实例目录下 profiles 目录中最多保留的分析结果数量
+函数:
+- load_config(environ): 读取环境变量生成配置
+"""
+import os
+
+from sqlite_pragmas import pragmas_from_env
+
+
+def _flag(environ, name, default):
+    value = environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _pool_options(environ):
+    # 只传入显式设置的连接池参数，未设置时使用 SQLAlchemy 的默认值（5、10、30 秒）；
+    # 内存 SQLite 数据库（sqlite://）使用不接受这些参数的 StaticPool，不设置时也能正常创建
+    options = {}
+    for name, option, convert in (('DB_POOL_SIZE', 'pool_size', int),
+                                  ('DB_MAX_OVERFLOW', 'max_overflow', int),
+                                  ('DB_POOL_TIMEOUT', 'pool_timeout', float)):
+        value = environ.get(name)
+        if value:
+            options[option] = convert(value)
+    return options
+
+
+def load_config(environ=None):
+    """
+    读取环境变量生成配置
+    参数:
+        environ (Mapping, optional): 环境变量，默认为 os.environ
+    返回:
+        dict: Flask 配置项
+    """
+    if environ is None:
+        environ = os.environ
+    secure_cookies = _flag(environ, 'SESSION_COOKIE_SECURE', True)
+    return {
+        # 配置 Flask 应用的密钥
+        'SECRET_KEY': environ.get('SECRET_KEY', 'p@ssw0rd'),
+        # 配置 SQLAlchemy 数据库 URI，相对路径的 SQLite 数据库位于实例目录
+        'SQLALCHEMY_DATABASE_URI': environ.get('DATABASE_URL', 'sqlite:///meeting_rooms.db'),
+        # 启用安全的会话 Cookie 和记住我 Cookie
+        'SESSION_COOKIE_SECURE': secure_cookies,
+        'REMEMBER_COOKIE_SECURE': secure_cookies,
+        # 启用 HttpOnly 会话 Cookie
+        'SESSION_COOKIE_HTTPONLY': True,
+        # 每个工作进程缓存的 (会议室, 日期) 占用情况条目数，0 表示不缓存
+        'OCCUPANCY_CACHE_SIZE': int(environ.get('OCCUPANCY_CACHE_SIZE', 1024)),
+        # 每个工作进程缓存登录用户身份的有效时间（秒），0 表示不缓存
+        'USER_CACHE_TTL_SECONDS': float(environ.get('USER_CACHE_TTL_SECONDS', 60)),
+        # 后台清理过期预订的间隔（秒），0 表示不启动后台清理
+        'CLEANUP_INTERVAL_SECONDS': int(environ.get('CLEANUP_INTERVAL_SECONDS', 300)),
+        # 每个工作进程的数据库连接池大小；多线程（gthread）或协程（gevent）工作进程中每个并发请求各占一个连接
+        'SQLALCHEMY_ENGINE_OPTIONS': _pool_options(environ),
+        # 在每个新建的 SQLite 连接上设置的 WAL、busy_timeout 等参数
+        'SQLITE_PRAGMAS': pragmas_from_env(environ),
+        # 每个普通用户最多持有的预订数量，0 表示不限制（管理员不受限制）
+        'MAX_RESERVATIONS_PER_USER': int(environ.get('MAX_RESERVATIONS_PER_USER', 0)),
+        # 是否按会议室的 max_reservations 限制每个会议室的预订数量
+        'ENFORCE_ROOM_QUOTA': _flag(environ, 'ENFORCE_ROOM_QUOTA', False),
+        # 每个工作进程写入指标快照的最小间隔（秒）
+        'METRICS_FLUSH_SECONDS': float(environ.get('METRICS_FLUSH_SECONDS', 5)),
+        # 慢查询日志的阈值（秒），0 表示不记录
+        'SLOW_QUERY_SECONDS': float(environ.get('SLOW_QUERY_SECONDS', 0.5)),
+        # 随机分析的请求比例，0 表示只分析管理员通过请求头指定的请求
+        'PROFILE_SAMPLE_RATE': float(environ.get('PROFILE_SAMPLE_RATE', 0)),
+        # 最多保留的分析结果数量，较早的自动删除
+        'PROFILE_KEEP': int(environ.get('PROFILE_KEEP', 100)),
+    }
@@ -0,0 +1,299 @@
+"""
+合成数据生成脚本
+在 init_db 初始化的数据库上批量生成会议室、用户和预订，用于在本地复现生产规模的数据量，进行负载和容量测试。
+生成规则:
+- 会议室: 容量和可同时预订数（total_slots）按常见会议室规格随机选取，小会议室更多
+- 用户: 预订次数按幂律分布，少数用户预订大部分会议
+- 预订: 工作日多、周末少；上午 9-11 点和下午 2-4 点是高峰；时长以 30 分钟和 1 小时为主；
+  开始时间按 15 分钟对齐，参会人数不超过会议室容量
+- 每个预订都满足与 check_room_availability 相同的规则（含前后缓冲时间的时间段内已有预订数小于 total_slots），
+  某个时间段已满时换一个时间重试，多次失败后跳过这一条并计入 skipped
+相同的 --seed 和 --start 生成完全相同的数据。
+写入使用批量 INSERT（SQLite 上直接使用 DBAPI 的 executemany），大量写入时先删除预订表的索引、写入后重建，
+全部数据在一个事务中提交，然后重新计算预订数量计数器并递增变更版本和缓存代数，正在运行的应用会看到新数据。
+函数:
+- generate_rooms(rng, count, prefix): 生成会议室
+- generate_users(count, prefix): 生成用户
+- generate_reservations(rng, rooms, user_ids, count, start_date, days): 生成预订
+- generate(app, ...): 写入数据库
+使用方法:
+    python generate_data.py --rooms 1000 --users 20000 --reservations 1000000 --days 365 --seed 42
+    python generate_data.py --help 查看所有参数
+说明:生成的用户密码均为 password；名称以 --prefix 开头，同一前缀的数据已存在时拒绝生成。
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import insert
+
+from app import create_app
+from availability import BUFFER_MINUTES
+from init_db import init_db
+from models import Reservation, Room, User, db, rebuild_reservation_counters, touch_change_versions
+
+# 会议室规格: (容量, 可同时预订数, 权重)
+ROOM_TYPES = [
+    (4, 1, 30),
+    (6, 2, 30),
+    (12, 3, 20),
+    (20, 5, 12),
+    (50, 10, 8),
+]
+# 星期一到星期日的预订权重
+WEEKDAY_WEIGHTS = [1.0, 1.1, 1.1, 1.0, 0.8, 0.08, 0.04]
+# 开始时间（整点）的权重，8 点到 18 点
+HOUR_WEIGHTS = {8: 3, 9: 10, 10: 12, 11: 8, 12: 2, 13: 5, 14: 10, 15: 10, 16: 7, 17: 3, 18: 1}
+# (时长（分钟）, 权重)
+DURATIONS = [(30, 35), (60, 40), (90, 10), (120, 10), (180, 5)]
+# 会议标题
+TITLES = ['周例会', '项目评审', '需求讨论', '客户沟通', '面试', '培训', '技术分享', '一对一', '部门会议', '方案汇报']
+# 每天的占用情况按 5 分钟分段记录，覆盖 0 点到 24 点
+SEGMENT_MINUTES = 5
+SEGMENTS_PER_DAY = 24 * 60 // SEGMENT_MINUTES
+# 时间段已满时最多重试的次数
+MAX_ATTEMPTS = 5
+# 每次批量抽取的候选预订数量
+CANDIDATE_BLOCK = 10000
+# 每次批量 INSERT 的行数
+BATCH_SIZE = 10000
+# bytes.translate 使用的转换表，把每个字节加 1
+_INCREMENT = bytes(range(1, 256)) + b'\xff'
+
+
+def _weighted(items, weights):
+    # 预先计算累积权重，供 random.choices 批量选取
+    return list(items), list(accumulate(weights))
+
+
+def generate_rooms(rng, count, prefix):
+    """
+    生成会议室
+    参数:
+        rng (random.Random): 随机数生成器
+        count (int): 会议室数量
+        prefix (str): 名称前缀
+    返回:
+        list: Room 字段的字典列表
+    """
+    types = rng.choices(ROOM_TYPES, weights=[weight for _, _, weight in ROOM_TYPES], k=count)
+    return [{
+        'name': f'{prefix}-room-{index}',
+        'capacity': capacity,
+        'total_slots': total_slots,
+        'max_reservations': 5,
+        'description': f'{capacity} 人会议室',
+    } for index, (capacity, total_slots, _) in enumerate(types, 1)]
+
+
+def generate_users(count, prefix):
+    """
+    生成用户
+    参数:
+        count (int): 用户数量
+        prefix (str): 用户名前缀
+    返回:
+        list: User 字段的字典列表
+    """
+    return [{'username': f'{prefix}-user-{index}', 'password': 'password', 'is_admin': False}
+            for index in range(1, count + 1)]
+
+
+def _candidates(rng, rooms, user_ids, start_date, days):
+    # 无限产生候选预订 (会议室, 第几天, 开始分钟, 时长, 用户ID, 标题, 参会比例)
+    # 每次用 random.choices 批量抽取 CANDIDATE_BLOCK 个，比逐个抽取快数倍
+    room_choice = _weighted(rooms, [1 / (rank + 1) ** 0.5 for rank in range(len(rooms))])
+    day_choice = _weighted(range(days), [WEEKDAY_WEIGHTS[(start_date + timedelta(days=day)).weekday()]
+                                         for day in range(days)])
+    start_choice = _weighted([hour * 60 + quarter * 15 for hour in HOUR_WEIGHTS for quarter in range(4)],
+                             [weight for weight in HOUR_WEIGHTS.values() for _ in range(4)])
+    duration_choice = _weighted([minutes for minutes, _ in DURATIONS], [weight for _, weight in DURATIONS])
+    user_choice = _weighted(user_ids, [1 / (rank + 1) for rank in range(len(user_ids))])
+    while True:
+        yield from zip(
+            *(rng.choices(items, cum_weights=cumulative, k=CANDIDATE_BLOCK)
+              for items, cumulative in (room_choice, day_choice, start_choice, duration_choice, user_choice)),
+            rng.choices(TITLES, k=CANDIDATE_BLOCK),
+            [rng.random() for _ in range(CANDIDATE_BLOCK)],
+        )
+
+
+def generate_reservations(rng, rooms, user_ids, count, start_date, days):
+    """
+    生成预订
+    参数:
+        rng (random.Random): 随机数生成器
+        rooms (list): (会议室ID, 容量, 可同时预订数) 元组列表，排在前面的会议室预订更多
+        user_ids (list): 用户ID列表，排在前面的用户预订更多
+        count (int): 要生成的预订数量
+        start_date (date): 第一天
+        days (int): 天数
+    返回:
+        generator: 每次产生一个 (会议室ID, 用户ID, 标题, 开始时间, 结束时间, 参会人数) 元组，
+            时间段已满而跳过时产生 None
+    """
+    candidates = _candidates(rng, rooms, user_ids, start_date, days)
+    buffer_segments = BUFFER_MINUTES // SEGMENT_MINUTES
+    # 会议室ID * 天数 + 第几天 -> 每个 5 分钟分段中的预订数
+    occupancy = {}
+    # 第几天 * 一天的分钟数 + 分钟 -> datetime，相同的时间复用同一个对象
+    times = {}
+    base = datetime.combine(start_date, datetime.min.time())
+
+    def at(day, minute):
+        key = day * 1440 + minute
+        value = times.get(key)
+        if value is None:
+            value = times[key] = base + timedelta(minutes=key)
+        return value
+
+    for _ in range(count):
+        for _, candidate in zip(range(MAX_ATTEMPTS), candidates):
+            (room_id, capacity, total_slots), day, start_minute, duration, user_id, title, fraction = candidate
+            first = start_minute // SEGMENT_MINUTES
+            last = (start_minute + duration) // SEGMENT_MINUTES
+            key = room_id * days + day
+            segments = occupancy.get(key)
+            if segments is None:
+                segments = occupancy[key] = bytearray(SEGMENTS_PER_DAY)
+            # 与 check_room_availability 相同：含缓冲时间的时间段内已有预订数必须小于 total_slots
+            if max(segments[max(first - buffer_segments, 0):last + buffer_segments]) < total_slots:
+                break
+        else:
+            yield None
+            continue
+        segments[first:last] = segments[first:last].translate(_INCREMENT)
+        yield (room_id, user_id, title, at(day, start_minute), at(day, start_minute + duration),
+               int(fraction * capacity) + 1)
+
+
+def _insert_reservations(rows, created_at):
+    # 分批写入预订，返回写入的行数和跳过（值为 None）的行数
+    # SQLite 直接使用 DBAPI 的 executemany，并用列类型的 bind_processor 转换时间（结果按值缓存），
+    # 比 ORM 的批量 INSERT 快一个数量级；其他数据库使用 Core 的批量 INSERT
+    connection = db.session.connection()
+    table = Reservation.__table__
+    columns = ['room_id', 'user_id', 'title', 'start_time', 'end_time', 'attendees', 'created_at']
+    if connection.dialect.name == 'sqlite':
+        cursor = connection.connection.driver_connection.cursor()
+        statement = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        dialect = connection.dialect
+        process = table.c.start_time.type.dialect_impl(dialect).bind_processor(dialect) or (lambda value: value)
+        converted = {}
+
+        def convert(value):
+            result = converted.get(value)
+            if result is None:
+                result = converted[value] = process(value)
+            return result
+
+        created_at = process(created_at)
+
+        def write(batch):
+            cursor.executemany(statement, [
+                (room_id, user_id, title, convert(start_time), convert(end_time), attendees, created_at)
+                for room_id, user_id, title, start_time, end_time, attendees in batch])
+    else:
+        def write(batch):
+            connection.execute(table.insert(), [dict(zip(columns, row + (created_at,))) for row in batch])
+
+    inserted = skipped = 0
+    batch = []
+    for row in rows:
+        if row is None:
+            skipped += 1
+            continue
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            write(batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        write(batch)
+        inserted += len(batch)
+    return inserted, skipped
+
+
+def generate(app, rooms=50, users=500, reservations=10000, days=90, start_date=None, seed=0, prefix='gen'):
+    """
+    生成数据并写入数据库
+    参数:
+        app (flask.Flask): 应用实例
+        rooms (int): 会议室数量
+        users (int): 用户数量
+        reservations (int): 预订数量
+        days (int): 预订分布的天数
+        start_date (date, optional): 第一天，默认为明天
+        seed (int): 随机数种子
+        prefix (str): 会议室名称和用户名的前缀
+    返回:
+        dict: 各类数据的写入数量、跳过的预订数量和耗时（秒）
+    异常:
+        ValueError: 参数无效或同一前缀的数据已存在
+    """
+    if rooms < 1 or users < 1 or days < 1 or reservations < 0:
+        raise ValueError('会议室、用户数量和天数必须大于 0，预订数量不能为负数')
+    start_date = start_date or date.today() + timedelta(days=1)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    with app.app_context():
+        if Room.query.filter(Room.name.like(f'{prefix}-room-%')).first() or \
+                User.query.filter(User.username.like(f'{prefix}-user-%')).first():
+            raise ValueError(f'前缀为 {prefix} 的数据已存在，请使用其他 --prefix')
+
+        db.session.execute(insert(Room), generate_rooms(rng, rooms, prefix))
+        db.session.execute(insert(User), generate_users(users, prefix))
+        room_rows = db.session.query(Room.id, Room.capacity, Room.total_slots).filter(
+            Room.name.like(f'{prefix}-room-%')).order_by(Room.capacity, Room.id).all()
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(
+            User.username.like(f'{prefix}-user-%')).order_by(User.id)]
+        # 大量写入时先删除预订表的索引，写入后再重建，比逐行维护索引快得多
+        indexes = Reservation.__table__.indexes if reservations >= BATCH_SIZE else ()
+        connection = db.session.connection()
+        for index in indexes:
+            index.drop(connection)
+        inserted, skipped = _insert_reservations(generate_reservations(
+            rng, [tuple(row) for row in room_rows], user_ids, reservations, start_date, days),
+            created_at=datetime.now())
+        for index in indexes:
+            index.create(connection)
+        touch_change_versions()
+        db.session.commit()
+        # 计数器在单独的串行化事务中根据预订表重新计算
+        rebuild_reservation_counters()
+    app.extensions['generations'].bump([None])
+    return {
+        'rooms': rooms,
+        'users': users,
+        'reservations': inserted,
+        'skipped': skipped,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成用于负载和容量测试的会议室、用户和预订数据')
+    parser.add_argument('--rooms', type=int, default=50, help='会议室数量')
+    parser.add_argument('--users', type=int, default=500, help='用户数量')
+    parser.add_argument('--reservations', type=int, default=10000, help='预订数量')
+    parser.add_argument('--days', type=int, default=90, help='预订分布的天数')
+    parser.add_argument('--start', type=date.fromisoformat, help='第一天，格式为 YYYY-MM-DD，默认为明天')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子，相同的种子和 --start 生成相同的数据')
+    parser.add_argument('--prefix', default='gen', help='会议室名称和用户名的前缀')
+    args = parser.parse_args()
+
+    app = create_app(web=False)
+    init_db(app)
+    try:
+        result = generate(app, args.rooms, args.users, args.reservations, args.days,
+                          args.start, args.seed, args.prefix)
+    except ValueError as error:
+        parser.exit(1, f'{error}\n')
+    print(f"已生成 {result['rooms']} 个会议室、{result['users']} 个用户、{result['reservations']} 条预订"
+          f"（跳过 {result['skipped']} 条），耗时 {result['seconds']} 秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,51 @@
-# 绑定的Unix套接字地址
-bind = "unix:/tmp/gunicorn.sock"
+import os
+import sys
+
+# 所有参数都可以通过环境变量覆盖，默认值与原来的同步工作进程配置相同。
+# 推荐的高并发配置：GUNICORN_WORKER_CLASS=gthread GUNICORN_THREADS=8，
+# 慢客户端只占用一个线程而不是整个工作进程；说明和负载测试见 README 与 benchmarks/bench_worker_modes.py。
+# gevent 需要另外安装（pip install gevent），SQLite 的查询和锁等待会阻塞整个事件循环，
+# 只建议在使用网络数据库（并安装相应的协程驱动）时使用。
+
+# 绑定的地址，默认为 Unix 套接字
+bind = os.environ.get('GUNICORN_BIND', 'unix:/tmp/gunicorn.sock')
 # 工作进程数
-workers = 4
-# 工作进程类型
-worker_class = "sync"
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+# 工作进程类型: sync、gthread 或 gevent
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+# gthread 工作进程中每个进程的线程数；sync 模式下 threads 大于 1 时 gunicorn 会改用 gthread，因此固定为 1
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
+# gevent 工作进程中每个进程同时处理的最大连接数
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
 # 超时时间（秒）
-timeout = 120
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+# 收到重启/停止信号后等待正在处理的请求完成的时间（秒）
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
 # 保持连接的时间（秒）
-keepalive = 2
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 2))
+
+# 每个线程或协程在请求期间都会占用一个数据库连接，连接池至少要与并发数相同，
+# 否则请求会在 pool_timeout 内排队等待连接；显式设置的 DB_POOL_SIZE 优先
+if worker_class == 'gthread':
+    os.environ.setdefault('DB_POOL_SIZE', str(max(5, threads)))
+elif worker_class == 'gevent':
+    os.environ.setdefault('DB_POOL_SIZE', str(min(worker_connections, 20)))
+
+
+def post_fork(server, worker):
+    # 如果启用了 preload_app，主进程中创建的数据库连接不能在工作进程间共享，
+    # fork 后丢弃继承的连接，让每个工作进程使用自己的连接池
+    wsgi = sys.modules.get('wsgi')
+    if wsgi is not None:
+        with wsgi.app.app_context():
+            wsgi.app.extensions['sqlalchemy'].engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    # 工作进程退出时停止后台清理线程并释放执行锁，让其他工作进程立即接替，
+    # 然后关闭连接池中的连接，避免未提交的写事务把 SQLite 数据库锁到进程退出
+    wsgi = sys.modules.get('wsgi')
+    if wsgi is not None:
+        wsgi.maintenance_scheduler.stop()
+        with wsgi.app.app_context():
+            wsgi.app.extensions['sqlalchemy'].engine.dispose()
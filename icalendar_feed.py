@@ -0,0 +1,87 @@
+"""
+iCalendar（.ics）订阅内容的生成
+按 RFC 5545 生成 VCALENDAR 文本，不访问数据库，也不依赖第三方库。
+预订时间保存为不带时区的本地时间，因此 DTSTART/DTEND 使用“浮动时间”（不带 Z 后缀），
+日历客户端会按订阅者所在时区显示；DTSTAMP 按规范转换为 UTC。
+类:
+- CalendarEvent: 一个日历事件
+函数:
+- build_calendar(name, events): 生成完整的 VCALENDAR 文本
+"""
+from collections import namedtuple
+from datetime import timezone
+
+# 一个日历事件，uid 在同一个日历中必须唯一且不随修改变化
+CalendarEvent = namedtuple(
+    'CalendarEvent', ['uid', 'start_time', 'end_time', 'summary', 'description', 'location', 'stamp'])
+
+# 产品标识
+PRODID = '-//Conference Room Reservation System//CN'
+
+
+def _escape(value):
+    # 按 RFC 5545 3.3.11 转义文本
+    return (str(value or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    # 按 RFC 5545 3.1 折行，每行不超过 75 个字节，续行以空格开头，不拆开多字节字符
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    current = ''
+    limit = 75
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = ''
+            limit = 74
+        current += char
+    parts.append(current)
+    return '\r\n '.join(parts)
+
+
+def _local(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def _utc(value):
+    # 不带时区的时间按本地时间转换为 UTC
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def build_calendar(name, events):
+    """
+    生成完整的 VCALENDAR 文本
+    参数:
+        name (str): 日历名称，显示在日历客户端中
+        events (iterable): CalendarEvent 序列
+    返回:
+        str: 以 CRLF 分行的 iCalendar 文本
+    """
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+    ]
+    for event in events:
+        lines.extend([
+            'BEGIN:VEVENT',
+            f'UID:{event.uid}',
+            f'DTSTAMP:{_utc(event.stamp)}',
+            f'DTSTART:{_local(event.start_time)}',
+            f'DTEND:{_local(event.end_time)}',
+            f'SUMMARY:{_escape(event.summary)}',
+        ])
+        if event.description:
+            lines.append(f'DESCRIPTION:{_escape(event.description)}')
+        if event.location:
+            lines.append(f'LOCATION:{_escape(event.location)}')
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
@@ -1,22 +1,33 @@
-from app import app, db, User, Room
+from app import create_app
+from migrations import upgrade
+from models import db, User, Room
 """
 初始化数据库脚本
-这个脚本用于初始化数据库，包括创建表、检查和创建管理员用户以及创建基础会议室模版。
-函数:init_db(): 初始化数据库，包括创建表、检查和创建管理员用户以及创建基础会议室模版。
+这个脚本用于初始化数据库，包括创建表、执行结构迁移、检查和创建管理员用户以及创建基础会议室模版。
+函数:init_db(): 初始化数据库，包括创建表、执行结构迁移、检查和创建管理员用户以及创建基础会议室模版。
 使用方法:直接运行 python init_db.py (python3 init_db.py) 以初始化数据库。
+说明:脚本以 create_app(web=False) 创建应用，不加载路由和模板。
 初始化默认:
     - 管理员用户名: admin
     - 管理员密码: admin123
 """
 
 
-def init_db():
+def init_db(app=None):
     """
     初始化数据库
+    参数:
+        app (flask.Flask, optional): 应用实例，默认以 create_app(web=False) 创建
     """
+    if app is None:
+        app = create_app(web=False)
     with app.app_context():
         # 创建表
         db.create_all()
+        # 执行尚未执行的结构迁移（为已有数据库补充索引等）
+        applied_versions = upgrade(db.engine)
+        if applied_versions:
+            print(f'已执行迁移: {applied_versions}')
 
         # 检查管理员用户是否存在
         admin = User.query.filter_by(username='admin').first()
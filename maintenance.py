@@ -0,0 +1,142 @@
+"""
+后台维护任务调度器
+这个模块把定期维护任务（例如清理过期预订）从请求路径中移出，放到后台线程中按固定间隔执行。
+gunicorn 会启动多个工作进程，每个进程都会创建调度器，但只有成功获取文件锁的进程会真正执行任务，
+其余进程在每个周期重新尝试获取锁，因此当执行任务的进程退出后，其他进程会自动接替。
+类:
+- MaintenanceScheduler: 维护任务调度器
+说明:
+    文件锁依赖 fcntl，在不支持 fcntl 的平台（如 Windows）上当前进程直接作为执行者。
+    任务的最近执行时间和删除行数写入状态文件，所有工作进程都可以读取。
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows 等平台
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class MaintenanceScheduler:
+    """
+    维护任务调度器
+    属性:
+        job (callable): 要执行的任务，返回本次删除的行数
+        interval (int): 执行间隔（秒），小于等于 0 时不启动后台线程
+        lock_path (str): 用于在多个工作进程间选举执行者的锁文件路径
+        status_path (str): 记录最近一次执行情况的状态文件路径
+    方法:
+        start():
+            启动后台线程
+        stop():
+            停止后台线程
+        run_once():
+            立即执行一次任务并更新状态文件
+        status():
+            读取最近一次执行的状态
+    """
+
+    def __init__(self, job, interval, lock_path, status_path):
+        self.job = job
+        self.interval = interval
+        self.lock_path = lock_path
+        self.status_path = status_path
+        self._lock_file = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_leader(self):
+        # 当前进程是否持有执行锁
+        return self._lock_file is not None
+
+    def _try_acquire_lock(self):
+        """
+        尝试以非阻塞方式获取执行锁，获取后一直持有到进程退出
+        返回:
+            bool: 当前进程是否为执行者
+        """
+        if self.is_leader:
+            return True
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        lock_file = open(self.lock_path, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        return True
+
+    def run_once(self):
+        """
+        立即执行一次任务并更新状态文件
+        返回:
+            int: 本次删除的行数
+        """
+        removed = self.job()
+        previous = self.status()
+        status = {
+            'last_run': datetime.now().isoformat(timespec='seconds'),
+            'removed': removed,
+            'total_removed': previous.get('total_removed', 0) + removed,
+            'pid': os.getpid(),
+        }
+        os.makedirs(os.path.dirname(self.status_path), exist_ok=True)
+        tmp_path = f'{self.status_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f)
+        os.replace(tmp_path, self.status_path)
+        return removed
+
+    def status(self):
+        """
+        读取最近一次执行的状态
+        返回:
+            dict: 包含 last_run、removed、total_removed 和 pid，尚未执行过时为空字典
+        """
+        try:
+            with open(self.status_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _loop(self):
+        # 每个周期尝试成为执行者，成为执行者后按间隔执行任务
+        while not self._stop_event.is_set():
+            if self._try_acquire_lock():
+                try:
+                    self.run_once()
+                except Exception:
+                    logger.exception('维护任务执行失败')
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        """
+        启动后台线程，重复调用不会启动多个线程
+        """
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name='maintenance-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止后台线程并释放执行锁
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
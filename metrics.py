@@ -0,0 +1,337 @@
+"""
+请求和 SQL 查询指标
+这个模块在每个工作进程内记录：
+- 每个端点的请求数（按方法和状态码）和延迟直方图
+- 每个端点的 SQL 查询数和查询耗时直方图（通过 SQLAlchemy 引擎事件），以及每个请求的查询数直方图
+- 由 add_collector 注册的其他运行统计（缓存命中、预订事务等）
+gunicorn 的多个工作进程各自记录，并定期把快照写入实例目录下的 metrics 目录（每个进程一个 JSON 文件），
+aggregate 读取所有存活进程的快照并求和，render_prometheus 输出 Prometheus 文本格式。
+类:
+- RequestMetrics: 指标收集器
+函数:
+- render_prometheus(merged, extra): 把汇总的指标输出为 Prometheus 文本格式
+说明:
+    快照按 flush_interval 节流写入，其他工作进程的数据最多延迟 flush_interval 秒。
+    已退出的工作进程的快照文件在下次汇总时删除，对应的计数器会减少，Prometheus 会视为计数器重置。
+"""
+import json
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# 请求延迟直方图的桶上限（秒）
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# SQL 查询耗时直方图的桶上限（秒）
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# 每个请求的查询数直方图的桶上限
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# 请求之外（后台清理、命令行）执行的查询使用的端点名称
+BACKGROUND = 'background'
+
+
+def _observe(histograms, key, buckets, value):
+    # 直方图保存为 [各个桶的计数（不累计，最后一个为 +Inf）, 总和]
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = [[0] * (len(buckets) + 1), 0.0]
+    index = len(buckets)
+    for position, bound in enumerate(buckets):
+        if value <= bound:
+            index = position
+            break
+    histogram[0][index] += 1
+    histogram[1] += value
+
+
+class RequestMetrics:
+    """
+    指标收集器（每个工作进程一个实例）
+    属性:
+        directory (str): 保存各个工作进程快照的目录
+        flush_interval (float): 写入快照的最小间隔（秒）
+    方法:
+        init_app(app):
+            注册请求钩子，在每个请求结束后记录延迟和查询数
+        install(engine):
+            在引擎上注册查询计时的事件监听
+        add_collector(collector):
+            注册在写入快照时调用的运行统计收集函数
+        observe_request(endpoint, method, status, duration, queries):
+            记录一个请求
+        observe_query(endpoint, duration):
+            记录一条 SQL 查询
+        snapshot():
+            返回当前进程的指标
+        flush(force):
+            把当前进程的快照写入文件
+        aggregate():
+            读取并汇总所有存活工作进程的快照
+    """
+
+    def __init__(self, directory, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._collectors = []
+        self._last_flush = 0.0
+        # (端点, 方法, 状态码) -> 请求数
+        self._requests = {}
+        # 端点 -> 直方图
+        self._request_duration = {}
+        self._query_duration = {}
+        self._queries_per_request = {}
+
+    def init_app(self, app):
+        """
+        注册请求钩子，在每个请求结束后记录延迟和查询数，并按间隔写入快照
+        参数:
+            app (flask.Flask): 应用实例
+        """
+        @app.before_request
+        def start_timer():
+            g.metrics_started = time.perf_counter()
+            g.query_count = 0
+
+        @app.after_request
+        def remember_status(response):
+            g.metrics_status = response.status_code
+            return response
+
+        @app.teardown_request
+        def record_request(error=None):
+            started = g.pop('metrics_started', None)
+            if started is None:
+                return
+            # 视图抛出未处理的异常时不会调用 after_request，按 500 记录
+            status = 500 if error is not None else g.pop('metrics_status', 500)
+            self.observe_request(request.endpoint or 'unmatched', request.method, status,
+                                 time.perf_counter() - started, g.get('query_count', 0))
+            self.flush()
+
+    def install(self, engine):
+        """
+        在引擎上注册查询计时的事件监听，请求中的查询按端点统计，并累加到 g.query_count
+        参数:
+            engine (sqlalchemy.engine.Engine): 数据库引擎
+        """
+        # 开始时间保存在每条语句的执行上下文中：语句出错时不会调用 after_cursor_execute，
+        # 保存在连接上会在连接池的连接中留下多余的开始时间。
+        # 没有执行上下文的特殊语句（序列、字段默认值）不计时
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._metrics_started = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, '_metrics_started', None)
+            if started is None:
+                return
+            duration = time.perf_counter() - started
+            endpoint = BACKGROUND
+            if has_request_context():
+                endpoint = request.endpoint or 'unmatched'
+                g.query_count = g.get('query_count', 0) + 1
+            self.observe_query(endpoint, duration)
+
+    def add_collector(self, collector):
+        """
+        注册在写入快照时调用的运行统计收集函数
+        参数:
+            collector (callable): 返回 (指标名, 说明, 类型, 标签字典, 值) 元组列表，
+                类型为 'counter' 或 'gauge'，汇总时各工作进程的值相加
+        """
+        self._collectors.append(collector)
+
+    def observe_request(self, endpoint, method, status, duration, queries=0):
+        """
+        记录一个请求
+        参数:
+            endpoint (str): 端点名称
+            method (str): 请求方法
+            status (int): 响应状态码
+            duration (float): 处理时间（秒）
+            queries (int): 处理请求时执行的 SQL 查询数
+        """
+        key = (endpoint, method, str(status))
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            _observe(self._request_duration, endpoint, REQUEST_BUCKETS, duration)
+            _observe(self._queries_per_request, endpoint, QUERIES_PER_REQUEST_BUCKETS, queries)
+
+    def observe_query(self, endpoint, duration):
+        """
+        记录一条 SQL 查询
+        参数:
+            endpoint (str): 端点名称，请求之外的查询为 BACKGROUND
+            duration (float): 执行时间（秒）
+        """
+        with self._lock:
+            _observe(self._query_duration, endpoint, QUERY_BUCKETS, duration)
+
+    def snapshot(self):
+        """
+        返回当前进程的指标，各个收集函数在调用者的上下文中执行
+        返回:
+            dict: 可以序列化为 JSON 的指标
+        """
+        samples = []
+        for collector in self._collectors:
+            samples.extend(list(sample) for sample in collector())
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'requests': [[*key, count] for key, count in self._requests.items()],
+                'request_duration': [[key, *value] for key, value in self._request_duration.items()],
+                'query_duration': [[key, *value] for key, value in self._query_duration.items()],
+                'queries_per_request': [[key, *value] for key, value in self._queries_per_request.items()],
+                'samples': samples,
+            }
+
+    def flush(self, force=False):
+        """
+        把当前进程的快照写入文件，距上次写入不足 flush_interval 秒时跳过
+        参数:
+            force (bool): 是否忽略写入间隔
+        """
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        snapshot = self.snapshot()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{snapshot['pid']}.json")
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def aggregate(self):
+        """
+        读取并汇总所有存活工作进程的快照，先写入当前进程的最新快照，已退出进程的快照文件会被删除
+        返回:
+            dict: 与 snapshot 格式相同的汇总结果，另有 workers 表示汇总的进程数
+        """
+        self.flush(force=True)
+        requests = {}
+        histograms = {'request_duration': {}, 'query_duration': {}, 'queries_per_request': {}}
+        samples = {}
+        workers = 0
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, filename)
+            if not _is_alive(int(filename[:-5])):
+                _remove(path)
+                continue
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            workers += 1
+            for *key, count in snapshot['requests']:
+                requests[tuple(key)] = requests.get(tuple(key), 0) + count
+            for section, merged in histograms.items():
+                for key, counts, total in snapshot[section]:
+                    if key in merged:
+                        merged[key][0] = [a + b for a, b in zip(merged[key][0], counts)]
+                        merged[key][1] += total
+                    else:
+                        merged[key] = [counts, total]
+            for name, help_, kind, labels, value in snapshot['samples']:
+                key = (name, tuple(sorted(labels.items())))
+                if key in samples:
+                    samples[key][4] += value
+                else:
+                    samples[key] = [name, help_, kind, labels, value]
+        return {
+            'workers': workers,
+            'requests': [[*key, count] for key, count in requests.items()],
+            **{section: [[key, *value] for key, value in merged.items()] for section, merged in histograms.items()},
+            'samples': list(samples.values()),
+        }
+
+
+def _is_alive(pid):
+    # 进程是否存在，没有权限发送信号也说明进程存在
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _escape(value):
+    # 标签值中的反斜杠、双引号和换行需要转义
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name, help_, label, entries, buckets):
+    lines = [f'# HELP {name} {help_}', f'# TYPE {name} histogram']
+    for key, counts, total in sorted(entries, key=lambda entry: entry[0]):
+        cumulative = 0
+        for bound, count in zip((*buckets, float('inf')), counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels({label: key, "le": _format_value(bound)})} {cumulative}')
+        lines.append(f'{name}_sum{_labels({label: key})} {_format_value(float(total))}')
+        lines.append(f'{name}_count{_labels({label: key})} {cumulative}')
+    return lines
+
+
+def render_prometheus(merged, extra=()):
+    """
+    把汇总的指标输出为 Prometheus 文本格式
+    参数:
+        merged (dict): RequestMetrics.aggregate 的返回值
+        extra (iterable): 不需要汇总的其他样本，(指标名, 说明, 类型, 标签字典, 值) 元组
+    返回:
+        str: Prometheus 文本格式（text/plain; version=0.0.4）
+    """
+    lines = [
+        '# HELP metrics_workers 汇总的工作进程数',
+        '# TYPE metrics_workers gauge',
+        f"metrics_workers {merged['workers']}",
+        '# HELP http_requests_total 按端点、方法和状态码统计的请求数',
+        '# TYPE http_requests_total counter',
+    ]
+    for endpoint, method, status, count in sorted(merged['requests']):
+        lines.append(f'http_requests_total{_labels({"endpoint": endpoint, "method": method, "status": status})} '
+                     f'{count}')
+    lines += _histogram_lines('http_request_duration_seconds', '按端点统计的请求处理时间（秒）',
+                              'endpoint', merged['request_duration'], REQUEST_BUCKETS)
+    lines += _histogram_lines('db_query_duration_seconds', '按端点统计的 SQL 查询执行时间（秒），_count 为查询数',
+                              'endpoint', merged['query_duration'], QUERY_BUCKETS)
+    lines += _histogram_lines('db_queries_per_request', '每个请求执行的 SQL 查询数',
+                              'endpoint', merged['queries_per_request'], QUERIES_PER_REQUEST_BUCKETS)
+    described = set()
+    for name, help_, kind, labels, value in sorted([*merged['samples'], *extra], key=lambda sample: sample[0]):
+        if name not in described:
+            described.add(name)
+            lines += [f'# HELP {name} {help_}', f'# TYPE {name} {kind}']
+        lines.append(f'{name}{_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
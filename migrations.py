@@ -0,0 +1,161 @@
+"""
+数据库结构迁移脚本
+db.create_all() 只会创建不存在的表，不会为已有的表补充索引或字段。
+这个模块按版本号顺序执行迁移，并把已执行的最高版本记录在 schema_version 表中，
+因此对已有数据库重复执行是安全的。
+变量:
+- COUNTER_REBUILD_STATEMENTS: 根据预订表重新计算预订数量计数器的 SQL 语句
+- MIGRATIONS: (版本号, 说明, 步骤列表) 组成的迁移列表，版本号必须递增，
+  步骤为 SQL 语句，或接受数据库连接的函数（用于 SQL 无法表达“不存在才执行”的情况，例如添加字段）
+函数:
+- add_column(table, column, definition): 生成“字段不存在时才添加”的迁移步骤
+- current_version(connection): 获取数据库当前的结构版本
+- upgrade(engine): 执行所有尚未执行的迁移，返回本次执行的版本号列表
+使用方法:python init_db.py 会在建表后自动执行迁移，也可以直接运行 python migrations.py。
+新增迁移:在 MIGRATIONS 末尾追加一项，同时修改 models.py 中对应的模型定义，保证新建数据库和迁移后的数据库结构一致。
+"""
+from datetime import datetime
+from sqlalchemy import inspect, text
+
+# 根据预订表重新计算预订数量计数器，迁移和 flask rebuild-counters 命令共用
+COUNTER_REBUILD_STATEMENTS = [
+    'DELETE FROM reservation_counter',
+    "INSERT INTO reservation_counter (scope, scope_id, reservation_count) "
+    "SELECT 'total', 0, COUNT(*) FROM reservation",
+    "INSERT INTO reservation_counter (scope, scope_id, reservation_count) "
+    "SELECT 'room', room_id, COUNT(*) FROM reservation GROUP BY room_id",
+    "INSERT INTO reservation_counter (scope, scope_id, reservation_count) "
+    "SELECT 'user', user_id, COUNT(*) FROM reservation GROUP BY user_id",
+]
+
+
+def add_column(table, column, definition):
+    """
+    生成“字段不存在时才添加”的迁移步骤
+    db.create_all() 新建的表已经包含模型中的所有字段，直接执行 ALTER TABLE 会因字段重复而失败。
+    参数:
+        table (str): 表名
+        column (str): 字段名
+        definition (str): 字段类型和约束，例如 'INTEGER REFERENCES reservation_series (id)'
+    返回:
+        callable: 接受数据库连接的迁移步骤
+    """
+    def step(connection):
+        columns = {info['name'] for info in inspect(connection).get_columns(table)}
+        if column not in columns:
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
+    return step
+
+
+MIGRATIONS = [
+    (1, '为预订表添加冲突检查、仪表盘和过期清理使用的索引', [
+        # 冲突检查: room_id 等值过滤 + start_time/end_time 范围过滤，索引同时覆盖查询的起止时间
+        'CREATE INDEX IF NOT EXISTS ix_reservation_room_time '
+        'ON reservation (room_id, start_time, end_time)',
+        # 仪表盘: 按 user_id 过滤并按开始时间排序
+        'CREATE INDEX IF NOT EXISTS ix_reservation_user_start '
+        'ON reservation (user_id, start_time)',
+        # 过期清理: 按 end_time 范围删除
+        'CREATE INDEX IF NOT EXISTS ix_reservation_end_time '
+        'ON reservation (end_time)',
+    ]),
+    (2, '为预订表添加按开始时间分页使用的索引', [
+        'CREATE INDEX IF NOT EXISTS ix_reservation_start_time '
+        'ON reservation (start_time)',
+    ]),
+    (3, '添加预订数量计数器表并根据现有预订初始化', [
+        'CREATE TABLE IF NOT EXISTS reservation_counter ('
+        'scope VARCHAR(10) NOT NULL, '
+        'scope_id INTEGER NOT NULL, '
+        'reservation_count INTEGER NOT NULL, '
+        'PRIMARY KEY (scope, scope_id))',
+    ] + COUNTER_REBUILD_STATEMENTS),
+    (4, '添加周期性预订系列表，并为预订表添加所属系列字段', [
+        'CREATE TABLE IF NOT EXISTS reservation_series ('
+        'id INTEGER NOT NULL PRIMARY KEY, '
+        'room_id INTEGER NOT NULL REFERENCES room (id), '
+        'user_id INTEGER NOT NULL REFERENCES "user" (id), '
+        'title VARCHAR(200) NOT NULL, '
+        'frequency VARCHAR(10) NOT NULL, '
+        'repeat_interval INTEGER NOT NULL, '
+        'occurrences INTEGER NOT NULL, '
+        'created_at DATETIME)',
+        add_column('reservation', 'series_id', 'INTEGER REFERENCES reservation_series (id)'),
+        'CREATE INDEX IF NOT EXISTS ix_reservation_series '
+        'ON reservation (series_id)',
+    ]),
+    (5, '添加变更版本表，用于日历订阅等条件请求', [
+        'CREATE TABLE IF NOT EXISTS change_version ('
+        'scope VARCHAR(10) NOT NULL, '
+        'scope_id INTEGER NOT NULL, '
+        'version INTEGER NOT NULL, '
+        'updated_at DATETIME NOT NULL, '
+        'PRIMARY KEY (scope, scope_id))',
+    ]),
+]
+
+
+def _ensure_version_table(connection):
+    # 创建记录结构版本的表
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_version ('
+        'version INTEGER NOT NULL PRIMARY KEY, '
+        'description VARCHAR(200), '
+        'applied_at DATETIME)'
+    ))
+
+
+def current_version(connection):
+    """
+    获取数据库当前的结构版本
+    参数:
+        connection (sqlalchemy.engine.Connection): 数据库连接
+    返回:
+        int: 已执行的最高迁移版本，未执行过任何迁移时为 0
+    """
+    _ensure_version_table(connection)
+    version = connection.execute(
+        text('SELECT MAX(version) FROM schema_version')).scalar()
+    return version or 0
+
+
+def upgrade(engine):
+    """
+    执行所有尚未执行的迁移，每个迁移在单独的事务中执行
+    参数:
+        engine (sqlalchemy.engine.Engine): 数据库引擎
+    返回:
+        list: 本次执行的迁移版本号列表
+    """
+    applied = []
+    with engine.begin() as connection:
+        version = current_version(connection)
+    for migration_version, description, statements in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        with engine.begin() as connection:
+            for statement in statements:
+                if callable(statement):
+                    statement(connection)
+                else:
+                    connection.execute(text(statement))
+            connection.execute(
+                text('INSERT INTO schema_version (version, description, applied_at) '
+                     'VALUES (:version, :description, :applied_at)'),
+                {'version': migration_version, 'description': description,
+                 'applied_at': datetime.now()}
+            )
+        applied.append(migration_version)
+    return applied
+
+
+if __name__ == '__main__':
+    from app import create_app
+    from models import db
+    with create_app(web=False).app_context():
+        db.create_all()
+        applied_versions = upgrade(db.engine)
+    if applied_versions:
+        print(f'已执行迁移: {applied_versions}')
+    else:
+        print('数据库结构已是最新版本')
@@ -0,0 +1,352 @@
+"""
+数据模型和数据库辅助函数
+这个模块只依赖 Flask-SQLAlchemy，不加载路由、模板和缓存，
+因此初始化数据库、清理过期预订等维护脚本可以只导入这个模块，不需要启动完整的 Web 应用。
+db 在 create_app 中通过 init_app 绑定到应用。
+变量:
+- db: Flask-SQLAlchemy 实例
+- COUNTER_UPSERT / VERSION_UPSERT: 调整预订数量计数器和递增变更版本的语句
+模型:
+- User: 用户模型，包含用户名、密码、管理员标志和预订关系
+- Room: 会议室模型，包含名称、容量、总槽位数、最大预订数、描述和预订关系
+- Reservation: 预订模型，包含会议室 ID、用户 ID、标题、开始时间、结束时间、目的、创建时间和参会人数
+- ReservationSeries: 周期性预订系列模型，包含会议室 ID、用户 ID、标题和重复规则
+- ChangeVersion: 变更版本模型，按全局、会议室和用户分别记录版本号和修改时间
+- ReservationCounter: 预订数量计数器模型，按总数、会议室和用户分别计数
+函数:
+- touch_change_versions / get_change_version: 在写事务中递增和读取全局、会议室和用户的变更版本
+- record_reservation_changes / get_reservation_count: 在写事务中调整和读取预订数量计数器
+- delete_reservations: 批量删除预订并在同一事务中调整计数器
+- cleanup_expired_reservations: 用一条 DELETE 语句清理过期的预订
+- rebuild_reservation_counters: 根据预订表重新计算预订数量计数器
+"""
+from collections import Counter
+from datetime import datetime
+
+from flask_login import UserMixin
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import exists, text
+
+from booking import run_serialized
+from migrations import COUNTER_REBUILD_STATEMENTS
+
+# 数据库实例，由 create_app 绑定到应用
+db = SQLAlchemy()
+
+# 调整预订数量计数器，计数器不存在时插入
+COUNTER_UPSERT = text(
+    'INSERT INTO reservation_counter (scope, scope_id, reservation_count) '
+    'VALUES (:scope, :scope_id, :delta) '
+    'ON CONFLICT (scope, scope_id) DO UPDATE SET '
+    'reservation_count = reservation_counter.reservation_count + excluded.reservation_count'
+)
+# 递增变更版本，版本不存在时插入
+VERSION_UPSERT = text(
+    'INSERT INTO change_version (scope, scope_id, version, updated_at) '
+    'VALUES (:scope, :scope_id, 1, :updated_at) '
+    'ON CONFLICT (scope, scope_id) DO UPDATE SET '
+    'version = change_version.version + 1, updated_at = excluded.updated_at'
+)
+
+
+class User(UserMixin, db.Model):
+    """
+    用户类，继承自UserMixin和db.Model
+    属性:
+        id (int): 用户ID,主键
+        username (str): 用户名，唯一且不能为空
+        password (str): 密码，不能为空
+        is_admin (bool): 是否为管理员,默认值为False
+        reservations (list): 用户的预订关系
+    方法:
+        set_password(password):
+            设置用户密码
+        check_password(password):
+            检查用户密码是否正确
+    """
+    # 用户ID，主键
+    id = db.Column(db.Integer, primary_key=True)
+    # 用户名，唯一且不能为空
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    # 密码，不能为空
+    password = db.Column(db.String(120), nullable=False)
+    # 是否为管理员，默认值为False
+    is_admin = db.Column(db.Boolean, default=False)
+    # 用户的预订关系
+    reservations = db.relationship('Reservation', backref='user', lazy=True)
+
+    def set_password(self, password):
+        # 设置用户密码
+        self.password = password
+
+    def check_password(self, password):
+        # 检查用户密码是否正确
+        return self.password == password
+
+
+class Room(db.Model):
+    """
+    会议室类，继承自db.Model
+    属性:
+        id (int): 会议室ID,主键
+        name (str): 会议室名称，不能为空
+        capacity (int): 会议室容量，不能为空
+        total_slots (int): 会议室的总槽位数，不能为空
+        max_reservations (int): 最大预订数，默认值为5
+        description (str): 会议室描述
+        reservations (list): 会议室的预订关系
+    """
+    # 会议室ID，主键
+    id = db.Column(db.Integer, primary_key=True)
+    # 会议室名称，不能为空
+    name = db.Column(db.String(100), nullable=False)
+    # 会议室容量，不能为空
+    capacity = db.Column(db.Integer, nullable=False)
+    # 会议室的总槽位数，不能为空
+    total_slots = db.Column(db.Integer, nullable=False)
+    # 最大预订数，默认值为5
+    max_reservations = db.Column(db.Integer, default=5)
+    # 会议室描述
+    description = db.Column(db.Text)
+    # 会议室的预订关系
+    reservations = db.relationship('Reservation', backref='room', lazy=True)
+
+
+class Reservation(db.Model):
+    """
+    预订类，表示会议室预订信息。
+    属性:
+        id (int): 预订的唯一标识符，主键。
+        room_id (int): 预订的会议室ID，外键关联到Room表。
+        user_id (int): 预订的用户ID，外键关联到User表。
+        title (str): 预订的标题，必填字段。
+        start_time (datetime): 预订的开始时间，必填字段。
+        end_time (datetime): 预订的结束时间，必填字段。
+        purpose (str): 预订的目的，可选字段。
+        created_at (datetime): 预订的创建时间，默认为当前时间。
+        attendees (int): 参会人数，默认为1。
+        series_id (int): 所属周期性预订系列的ID，单次预订为空。
+    索引:
+        ix_reservation_room_time: (room_id, start_time, end_time)，用于冲突检查，覆盖查询的起止时间。
+        ix_reservation_user_start: (user_id, start_time)，用于查询用户的预订。
+        ix_reservation_end_time: (end_time)，用于清理过期预订。
+        ix_reservation_start_time: (start_time)，用于管理员预订列表按开始时间分页。
+        ix_reservation_series: (series_id)，用于批量修改和取消周期性预订系列。
+        已有数据库通过 migrations.py 补充这些索引。
+    """
+    __table_args__ = (
+        db.Index('ix_reservation_room_time', 'room_id', 'start_time', 'end_time'),
+        db.Index('ix_reservation_user_start', 'user_id', 'start_time'),
+        db.Index('ix_reservation_end_time', 'end_time'),
+        db.Index('ix_reservation_start_time', 'start_time'),
+        db.Index('ix_reservation_series', 'series_id'),
+    )
+    # 预订的唯一标识符，主键
+    id = db.Column(db.Integer, primary_key=True)
+    # 预订的会议室ID，外键关联到Room表
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False)
+    # 预订的用户ID，外键关联到User表
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # 预订的标题，必填字段
+    title = db.Column(db.String(200), nullable=False)
+    # 预订的开始时间，必填字段
+    start_time = db.Column(db.DateTime, nullable=False)
+    # 预订的结束时间，必填字段
+    end_time = db.Column(db.DateTime, nullable=False)
+    # 预订的目的，可选字段
+    purpose = db.Column(db.String(200))
+    # 预订的创建时间，默认为当前时间
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    # 参会人数，默认为1
+    attendees = db.Column(db.Integer, default=1)
+    # 所属周期性预订系列的ID，单次预订为空
+    series_id = db.Column(db.Integer, db.ForeignKey('reservation_series.id'))
+
+
+class ReservationSeries(db.Model):
+    """
+    周期性预订系列，记录创建系列时使用的重复规则，系列中的每次预订是一条 Reservation 记录。
+    属性:
+        id (int): 系列ID，主键。
+        room_id (int): 会议室ID，外键关联到Room表。
+        user_id (int): 创建系列的用户ID，外键关联到User表。
+        title (str): 会议标题。
+        frequency (str): 重复频率，'daily' 或 'weekly'。
+        repeat_interval (int): 每隔几个周期重复一次。
+        occurrences (int): 创建时规则展开的预订次数（包括因冲突被跳过的）。
+        created_at (datetime): 创建时间，默认为当前时间。
+    已有数据库通过 migrations.py 创建这个表。
+    """
+    # 系列ID，主键
+    id = db.Column(db.Integer, primary_key=True)
+    # 会议室ID，外键关联到Room表
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False)
+    # 创建系列的用户ID，外键关联到User表
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # 会议标题
+    title = db.Column(db.String(200), nullable=False)
+    # 重复频率
+    frequency = db.Column(db.String(10), nullable=False)
+    # 每隔几个周期重复一次
+    repeat_interval = db.Column(db.Integer, nullable=False, default=1)
+    # 创建时规则展开的预订次数
+    occurrences = db.Column(db.Integer, nullable=False)
+    # 创建时间，默认为当前时间
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+
+class ChangeVersion(db.Model):
+    """
+    变更版本，与数据的修改在同一个事务中递增，用于生成 ETag 和 Last-Modified，
+    客户端的条件请求只需要按主键读取一行就能判断内容是否变化。
+    属性:
+        scope (str): 范围，'global'、'room' 或 'user'，主键的一部分。
+        scope_id (int): 会议室ID或用户ID，scope 为 'global' 时为 0，主键的一部分。
+        version (int): 版本号，每次修改加 1。
+        updated_at (datetime): 最后一次修改的时间。
+    已有数据库通过 migrations.py 创建这个表。
+    """
+    # 范围
+    scope = db.Column(db.String(10), primary_key=True)
+    # 会议室ID或用户ID
+    scope_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # 版本号
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # 最后一次修改的时间
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+
+class ReservationCounter(db.Model):
+    """
+    预订数量计数器，与预订的写入和删除在同一个事务中更新，用于代替 COUNT(*) 检查预订数量限制。
+    属性:
+        scope (str): 计数范围，'total'、'room' 或 'user'，主键的一部分。
+        scope_id (int): 会议室ID或用户ID，scope 为 'total' 时为 0，主键的一部分。
+        reservation_count (int): 预订数量。
+    已有数据库通过 migrations.py 创建并初始化，计数器与预订表不一致时可以执行 flask rebuild-counters 重新计算。
+    """
+    # 计数范围
+    scope = db.Column(db.String(10), primary_key=True)
+    # 会议室ID或用户ID
+    scope_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # 预订数量
+    reservation_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+def touch_change_versions(keys=()):
+    """
+    在当前事务中递增变更版本并记录修改时间，应与数据的修改在同一个事务中调用
+    版本分为三类: ('global', 0) 在任何修改时都会递增，('room', 会议室ID) 和 ('user', 用户ID)
+    在该会议室或该用户的预订（以及会议室、用户本身）被修改时递增。
+    参数:
+        keys (iterable): (范围, ID) 元组序列，('global', 0) 总是会被递增
+    """
+    now = datetime.now()
+    keys = sorted(set(keys) | {('global', 0)})
+    db.session.execute(VERSION_UPSERT, [
+        {'scope': scope, 'scope_id': scope_id, 'updated_at': now} for scope, scope_id in keys])
+
+
+def get_change_version(scope, scope_id=0):
+    """
+    读取变更版本（按主键查询一行，不查询预订表）
+    参数:
+        scope (str): 'global'、'room' 或 'user'
+        scope_id (int): 会议室ID或用户ID，scope 为 'global' 时为 0
+    返回:
+        tuple: (版本号, 修改时间)，从未修改过时为 (0, None)
+    """
+    row = db.session.query(ChangeVersion.version, ChangeVersion.updated_at).filter_by(
+        scope=scope, scope_id=scope_id).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def record_reservation_changes(changes):
+    """
+    在当前事务中记录预订的变化：调整预订数量计数器，并递增涉及的会议室和用户的变更版本
+    应与预订的写入、修改或删除在同一个事务中调用。
+    计数器分为三类: ('total', 0) 为预订总数，('room', 会议室ID) 和 ('user', 用户ID) 分别为每个会议室和每个用户的预订数。
+    参数:
+        changes (iterable): (会议室ID, 用户ID, 变化量) 元组序列，修改预订但数量不变时变化量为 0
+    """
+    deltas = {}
+    for room_id, user_id, delta in changes:
+        for key in (('total', 0), ('room', room_id), ('user', user_id)):
+            deltas[key] = deltas.get(key, 0) + delta
+    for (scope, scope_id), delta in sorted(deltas.items()):
+        if delta:
+            db.session.execute(COUNTER_UPSERT, {
+                'scope': scope, 'scope_id': scope_id, 'delta': delta})
+    touch_change_versions(key for key in deltas if key[0] != 'total')
+
+
+def get_reservation_count(scope, scope_id=0):
+    """
+    读取预订数量计数器（按主键查询一行，不扫描预订表）
+    参数:
+        scope (str): 'total'、'room' 或 'user'
+        scope_id (int): 会议室ID或用户ID，scope 为 'total' 时为 0
+    返回:
+        int: 预订数量，计数器不存在时为 0
+    """
+    count = db.session.query(ReservationCounter.reservation_count).filter_by(
+        scope=scope, scope_id=scope_id).scalar()
+    return count or 0
+
+
+def delete_reservations(*criteria):
+    """
+    用一条 DELETE 语句删除满足条件的预订，并在同一个事务中调整预订数量计数器
+    删除前按 (会议室, 用户) 统计要删除的数量，只查询这两列，不逐条加载 ORM 对象。
+    应在 run_serialized 的串行化事务中调用，避免统计和删除之间有新的预订写入。
+    参数:
+        *criteria: 传给 Reservation.query.filter 的过滤条件
+    返回:
+        int: 删除的预订数量
+    """
+    # 不在 SQL 中 GROUP BY：SQLite 会为了分组顺序扫描整个 ix_reservation_room_time 索引，
+    # 而不是用与过滤条件对应的索引（例如清理时的 ix_reservation_end_time）只读取要删除的行
+    groups = Counter(db.session.query(Reservation.room_id, Reservation.user_id).filter(*criteria))
+    if not groups:
+        return 0
+    removed = Reservation.query.filter(*criteria).delete(synchronize_session=False)
+    record_reservation_changes(
+        (room_id, user_id, -count) for (room_id, user_id), count in groups.items())
+    return removed
+
+
+def cleanup_expired_reservations():
+    """
+    清理过期的预订记录。
+    该函数获取当前时间，并用一条 DELETE 语句删除所有结束时间早于当前时间的预订记录，
+    不再逐条加载 ORM 对象。删除和预订数量计数器的调整在同一个串行化事务中完成，
+    同时删除所有预订都已结束的周期性预订系列。
+    调用者负责在删除后让占用情况缓存失效（见 app.run_cleanup_job）。
+    返回:
+        int: 删除的预订数量
+    """
+    current_time = datetime.now()
+
+    def delete_expired():
+        removed = delete_reservations(Reservation.end_time < current_time)
+        # 删除所有预订都已结束的周期性预订系列
+        ReservationSeries.query.filter(
+            ~exists().where(Reservation.series_id == ReservationSeries.id)
+        ).delete(synchronize_session=False)
+        return removed
+
+    return run_serialized(db.session, Room, None, delete_expired)
+
+
+def rebuild_reservation_counters():
+    """
+    根据预订表重新计算预订数量计数器，用于手动修改数据库之后
+    返回:
+        int: 重新计算后的预订总数
+    """
+    def rebuild():
+        for statement in COUNTER_REBUILD_STATEMENTS:
+            db.session.execute(text(statement))
+        return get_reservation_count('total')
+
+    return run_serialized(db.session, Room, None, rebuild)
@@ -0,0 +1,351 @@
+"""
+会议室占用情况缓存
+可用性检查、可用会议室列表和空闲时间搜索会反复查询同一会议室同一天的预订。
+这个模块在每个工作进程内按 (会议室ID, 日期) 缓存当天的预订区间，容量有限，按最近最少使用（LRU）淘汰。
+gunicorn 的多个工作进程各自维护缓存，写操作需要让所有进程的缓存失效，因此失效通过共享的“代数”表完成：
+代数表是实例目录下的一个内存映射文件，每个 (会议室ID, 日期) 散列到其中一个计数器。
+写操作提交后递增对应计数器，缓存条目记录填充时的计数器值，读取时发现不一致即视为未命中。
+类:
+- SharedGenerations: 多进程共享的代数计数器表
+- OccupancyCache: 按 (会议室ID, 日期) 缓存预订区间的 LRU 缓存
+- CachedValue: 通过共享代数失效的单值缓存（例如会议室列表）
+说明:
+    计数器递增依赖 fcntl 文件锁，在不支持 fcntl 的平台（如 Windows）上只保证单进程内正确。
+    统计数据（命中、未命中、淘汰、失效次数）按工作进程分别统计。
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows 等平台
+    fcntl = None
+
+# 每个计数器占 8 字节
+_COUNTER = struct.Struct('<Q')
+
+
+class SharedGenerations:
+    """
+    多进程共享的代数计数器表
+    属性:
+        path (str): 内存映射文件路径
+        slots (int): 计数器数量，键通过散列映射到计数器，冲突只会造成多余的缓存未命中
+    方法:
+        get(key):
+            读取键对应的计数器
+        bump(keys):
+            递增多个键对应的计数器
+    """
+
+    # 第 0 个计数器作为全局计数器，递增后所有缓存条目失效
+    GLOBAL_SLOT = 0
+
+    def __init__(self, path, slots=4096):
+        self.path = path
+        self.slots = slots
+        self._mmap = None
+        self._file = None
+        self._open_lock = threading.Lock()
+        # flock 按打开的文件加锁，同一进程的多个线程共用一个文件对象时互不阻塞，
+        # 因此 gthread 等多线程工作进程还需要线程锁保护递增
+        self._bump_lock = threading.Lock()
+
+    def _map(self):
+        # 首次使用时打开（在 gunicorn fork 出工作进程之后），文件不存在或长度不足时补齐
+        if self._mmap is not None:
+            return self._mmap
+        with self._open_lock:
+            if self._mmap is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                size = self.slots * _COUNTER.size
+                self._file = open(self.path, 'a+b')
+                self._lock_file()
+                try:
+                    if os.fstat(self._file.fileno()).st_size < size:
+                        self._file.truncate(size)
+                finally:
+                    self._unlock_file()
+                self._mmap = mmap.mmap(self._file.fileno(), size)
+        return self._mmap
+
+    def _lock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+
+    def _unlock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def _slot(self, key):
+        # 使用 crc32 而不是 hash()，因为 hash() 在不同进程中的结果可能不同
+        if key is None:
+            return self.GLOBAL_SLOT
+        return 1 + zlib.crc32(repr(key).encode()) % (self.slots - 1)
+
+    def get(self, key):
+        """
+        读取键对应的计数器
+        参数:
+            key (hashable): 缓存键，None 表示全局计数器
+        返回:
+            int: 计数器当前值
+        """
+        return _COUNTER.unpack_from(self._map(), self._slot(key) * _COUNTER.size)[0]
+
+    def bump(self, keys):
+        """
+        递增多个键对应的计数器，在线程锁和文件锁内完成以免多个线程或进程同时递增时丢失更新
+        参数:
+            keys (iterable): 缓存键，None 表示全局计数器
+        """
+        mapped = self._map()
+        offsets = {self._slot(key) * _COUNTER.size for key in keys}
+        with self._bump_lock:
+            self._lock_file()
+            try:
+                for offset in offsets:
+                    value = _COUNTER.unpack_from(mapped, offset)[0]
+                    _COUNTER.pack_into(mapped, offset, value + 1)
+            finally:
+                self._unlock_file()
+
+
+class OccupancyCache:
+    """
+    按 (会议室ID, 日期) 缓存预订区间的 LRU 缓存
+    属性:
+        loader (callable): loader(room_ids, range_start, range_end) 返回这些会议室与该范围重叠的
+            (会议室ID, 预订ID, 开始时间, 结束时间) 序列
+        generations (SharedGenerations): 多进程共享的代数计数器表
+        max_entries (int): 最多缓存的条目数，0 表示不缓存
+    方法:
+        intervals_by_room(room_ids, start_time, end_time, exclude_reservation_id=None):
+            返回多个会议室与指定时间段重叠的预订区间，未命中的条目用一次查询补齐
+        intervals(room_id, start_time, end_time, exclude_reservation_id=None):
+            返回单个会议室与指定时间段重叠的预订区间
+        invalidate(room_id, start_time, end_time):
+            使会议室在指定时间段涉及的日期的缓存失效
+        invalidate_all():
+            使所有缓存失效
+        stats():
+            返回命中、未命中、淘汰和失效次数
+    """
+
+    def __init__(self, loader, generations, max_entries=1024):
+        self.loader = loader
+        self.generations = generations
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _days(start_time, end_time):
+        # 时间段 [start_time, end_time) 涉及的所有日期
+        day = start_time.date()
+        last_day = (end_time - timedelta(microseconds=1)).date()
+        while day <= last_day:
+            yield day
+            day += timedelta(days=1)
+
+    def _lookup(self, keys):
+        """
+        返回每个 (会议室ID, 日期) 键对应的预订列表，未命中的键用一次 loader 调用补齐
+        """
+        # 先读取代数再查询数据库，保证查询期间的写操作会让这次填充的条目失效
+        global_generation = self.generations.get(None)
+        generations = {key: (global_generation, self.generations.get(key)) for key in keys}
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key) if self.max_entries > 0 else None
+                if entry is not None and entry[0] == generations[key]:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(key)
+                    self.misses += 1
+        if not missing:
+            return found
+
+        days = [day for _, day in missing]
+        range_start = datetime.combine(min(days), time.min)
+        range_end = datetime.combine(max(days), time.min) + timedelta(days=1)
+        loaded = {key: [] for key in missing}
+        room_ids = sorted({room_id for room_id, _ in missing})
+        for room_id, reservation_id, start, end in self.loader(room_ids, range_start, range_end):
+            for day in self._days(max(start, range_start), min(end, range_end)):
+                bucket = loaded.get((room_id, day))
+                if bucket is not None:
+                    bucket.append((reservation_id, start, end))
+        found.update(loaded)
+
+        if self.max_entries > 0:
+            with self._lock:
+                for key, intervals in loaded.items():
+                    self._entries[key] = (generations[key], intervals)
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return found
+
+    def intervals_by_room(self, room_ids, start_time, end_time, exclude_reservation_id=None):
+        """
+        返回多个会议室与指定时间段重叠的预订区间
+        参数:
+            room_ids (iterable): 会议室ID序列
+            start_time (datetime): 开始时间
+            end_time (datetime): 结束时间
+            exclude_reservation_id (int, optional): 要排除的预订ID
+        返回:
+            dict: {会议室ID: (开始时间, 结束时间) 元组列表}，跨天的预订只出现一次
+        """
+        room_ids = list(room_ids)
+        days = list(self._days(start_time, end_time))
+        entries = self._lookup([(room_id, day) for room_id in room_ids for day in days])
+        result = {}
+        for room_id in room_ids:
+            seen = set()
+            intervals = []
+            for day in days:
+                for reservation_id, start, end in entries[(room_id, day)]:
+                    if reservation_id in seen or reservation_id == exclude_reservation_id:
+                        continue
+                    seen.add(reservation_id)
+                    if end > start_time and start < end_time:
+                        intervals.append((start, end))
+            result[room_id] = intervals
+        return result
+
+    def intervals(self, room_id, start_time, end_time, exclude_reservation_id=None):
+        """
+        返回单个会议室与指定时间段重叠的预订区间
+        参数:
+            room_id (int): 会议室ID
+            start_time (datetime): 开始时间
+            end_time (datetime): 结束时间
+            exclude_reservation_id (int, optional): 要排除的预订ID
+        返回:
+            list: (开始时间, 结束时间) 元组列表
+        """
+        return self.intervals_by_room(
+            [room_id], start_time, end_time, exclude_reservation_id)[room_id]
+
+    def invalidate(self, room_id, start_time, end_time):
+        """
+        使会议室在指定时间段涉及的日期的缓存失效，应在写操作提交之后调用
+        参数:
+            room_id (int): 会议室ID
+            start_time (datetime): 开始时间
+            end_time (datetime): 结束时间
+        """
+        keys = [(room_id, day) for day in self._days(start_time, end_time)]
+        self.generations.bump(keys)
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def invalidate_all(self):
+        """
+        使所有缓存失效，用于批量删除等无法逐条确定影响范围的写操作
+        """
+        self.generations.bump([None])
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        返回当前工作进程的缓存统计
+        返回:
+            dict: 包含 entries、max_entries、hits、misses、evictions、invalidations 和 hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CachedValue:
+    """
+    通过共享代数失效的单值缓存，例如会议室列表
+    缓存的值应当是与数据库会话无关的普通对象，不能是 ORM 实例。
+    属性:
+        loader (callable): 无参数函数，返回要缓存的值
+        generations (SharedGenerations): 多进程共享的代数计数器表
+        key (hashable): 该值在代数表中使用的键
+    方法:
+        get():
+            返回缓存的值，失效后重新加载
+        invalidate():
+            使所有工作进程中的缓存失效，应在写操作提交之后调用
+        stats():
+            返回命中和未命中次数
+    """
+
+    def __init__(self, loader, generations, key):
+        self.loader = loader
+        self.generations = generations
+        self.key = key
+        self._lock = threading.Lock()
+        self._generation = None
+        self._value = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self):
+        """
+        返回缓存的值，失效后重新加载
+        """
+        generation = (self.generations.get(None), self.generations.get(self.key))
+        with self._lock:
+            if self._generation == generation:
+                self.hits += 1
+                return self._value
+            self.misses += 1
+        value = self.loader()
+        with self._lock:
+            self._generation, self._value = generation, value
+        return value
+
+    def invalidate(self):
+        """
+        使所有工作进程中的缓存失效，应在写操作提交之后调用
+        """
+        self.generations.bump([self.key])
+        with self._lock:
+            self._generation = self._value = None
+
+    def stats(self):
+        """
+        返回当前工作进程的缓存统计
+        返回:
+            dict: 包含 hits、misses 和 hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,171 @@
+"""
+按需请求性能分析
+在不重新部署的情况下查看某个页面慢在哪里：被选中的请求在 cProfile 下执行，
+分析结果（.prof，可用 pstats 或 snakeviz 打开）和元数据（.json：路由、耗时、状态码、耗时最多的函数）
+写入实例目录下的 profiles 目录，只保留最近的 keep 个，较早的自动删除。
+选择请求的方式:
+- 管理员请求带有 X-Profile: 1 请求头时分析该请求，响应头 X-Profile-Id 为分析结果的名称
+- PROFILE_SAMPLE_RATE 大于 0 时按这个比例随机分析所有请求
+类:
+- RequestProfiler: 请求性能分析器
+说明:
+    cProfile 只分析处理请求的线程；同一线程中已有其他分析器运行时（例如 Python 3.12 起不能同时启用多个）跳过分析。
+"""
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import time
+from datetime import datetime
+
+from flask import g, request
+from flask_login import current_user
+
+# 触发分析的请求头
+PROFILE_HEADER = 'X-Profile'
+# 元数据中列出的耗时最多的函数数量
+TOP_FUNCTIONS = 20
+
+
+class RequestProfiler:
+    """
+    请求性能分析器
+    属性:
+        directory (str): 保存分析结果的目录
+        sample_rate (float): 随机分析的请求比例，0 表示只分析管理员通过请求头指定的请求
+        keep (int): 最多保留的分析结果数量
+    方法:
+        init_app(app):
+            注册请求钩子
+        list_profiles():
+            返回已保存的分析结果的元数据，最新的在前
+        path(profile_id, extension):
+            返回分析结果文件的路径
+    """
+
+    def __init__(self, directory, sample_rate=0.0, keep=100):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.keep = keep
+
+    def _trigger(self):
+        # 返回分析本次请求的原因，不分析时返回 None
+        if request.headers.get(PROFILE_HEADER) == '1' and current_user.is_authenticated and current_user.is_admin:
+            return 'header'
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+    def init_app(self, app):
+        """
+        注册请求钩子：被选中的请求在 cProfile 下执行，请求结束后写入分析结果
+        参数:
+            app (flask.Flask): 应用实例
+        """
+        @app.before_request
+        def start_profile():
+            trigger = self._trigger()
+            if trigger is None:
+                return
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # 已有其他分析器在运行
+                return
+            g.profile = (profile, trigger, time.perf_counter(), datetime.now())
+
+        @app.after_request
+        def add_profile_header(response):
+            if 'profile' in g:
+                g.profile_status = response.status_code
+                g.profile_id = self._new_id()
+                response.headers['X-Profile-Id'] = g.profile_id
+            return response
+
+        @app.teardown_request
+        def finish_profile(error=None):
+            state = g.pop('profile', None)
+            if state is None:
+                return
+            profile, trigger, started, started_at = state
+            profile.disable()
+            self._save(profile, g.pop('profile_id', None) or self._new_id(), {
+                'endpoint': request.endpoint or 'unmatched',
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'status': 500 if error is not None else g.pop('profile_status', 500),
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                'started_at': started_at.isoformat(timespec='milliseconds'),
+                'trigger': trigger,
+                'user_id': current_user.get_id() if current_user.is_authenticated else None,
+                'pid': os.getpid(),
+            })
+
+    def _new_id(self):
+        # 名称以时间开头，按名称排序即按时间排序
+        endpoint = re.sub(r'[^A-Za-z0-9_.-]', '_', request.endpoint or 'unmatched')
+        return f'{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}-{endpoint}'
+
+    def path(self, profile_id, extension):
+        """
+        返回分析结果文件的路径
+        参数:
+            profile_id (str): 分析结果的名称
+            extension (str): 'prof' 或 'json'
+        返回:
+            str: 文件路径
+        """
+        return os.path.join(self.directory, f'{profile_id}.{extension}')
+
+    def _save(self, profile, profile_id, metadata):
+        # 写入分析结果和元数据，然后删除超过 keep 个的较早结果
+        os.makedirs(self.directory, exist_ok=True)
+        profile.dump_stats(self.path(profile_id, 'prof'))
+        stats = pstats.Stats(profile)
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        metadata['id'] = profile_id
+        metadata['top'] = [{
+            'function': pstats.func_std_string(function),
+            'calls': calls,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        } for function, (_, calls, total, cumulative, _) in top]
+        tmp_path = f"{self.path(profile_id, 'json')}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path(profile_id, 'json'))
+        self._rotate()
+
+    def _rotate(self):
+        names = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith('.prof'))
+        for profile_id in names[:max(len(names) - self.keep, 0)]:
+            for extension in ('prof', 'json'):
+                try:
+                    os.remove(self.path(profile_id, extension))
+                except OSError:
+                    # 其他工作进程已经删除
+                    pass
+
+    def list_profiles(self):
+        """
+        返回已保存的分析结果的元数据（不含耗时最多的函数列表），最新的在前
+        返回:
+            list: 元数据字典列表
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                continue
+            metadata.pop('top', None)
+            profiles.append(metadata)
+        return profiles
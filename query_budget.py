@@ -0,0 +1,159 @@
+"""
+SQL 查询数预算
+N+1 查询（例如在模板中逐行访问 reservation.room、reservation.user 触发的延迟加载）只有在数据量增长后才会变慢，
+这个模块为关键视图设定查询数上限，可以在测试或持续集成中检查，超过上限时报告执行过的所有语句。
+类:
+- QueryCounter: 记录代码块中执行的 SQL 语句
+- QueryBudgetExceeded: 查询数超过预算时抛出的异常（AssertionError 的子类，测试框架会报告为断言失败）
+函数:
+- count_queries(engine): 统计代码块中执行的 SQL 语句的上下文管理器
+- assert_max_queries(engine, limit, label): 代码块执行的查询数超过 limit 时抛出 QueryBudgetExceeded
+- check_query_budgets(app, budgets): 用测试客户端请求各个视图，返回每个视图的查询数
+常量:
+- QUERY_BUDGETS: 端点 -> (请求路径, 是否以管理员登录, 最大查询数)
+使用方法:
+    with assert_max_queries(db.engine, 5, 'dashboard'):
+        client.get('/dashboard')
+    flask --app app check-query-budgets   # 对当前数据库检查 QUERY_BUDGETS 中的所有视图
+说明:
+    预算按缓存已预热时计算：每个视图先请求一次，第二次请求的查询数才与预算比较。
+    数据库中需要有一定数量的预订（例如用 generate_data.py 生成），否则逐行加载不会产生额外的查询。
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, func
+
+from models import Reservation, User, db
+
+QueryBudget = namedtuple('QueryBudget', ['path', 'admin', 'max_queries'])
+
+# 缓存已预热时的查询数，另外允许一条登录用户缓存过期后的查询；可用会议室在占用情况缓存未命中时最多两条查询。
+# 路径中的 {tomorrow} 替换为明天的日期（YYYY-MM-DD）
+QUERY_BUDGETS = {
+    'main.dashboard': QueryBudget('/dashboard', False, 4),
+    'main.admin_reservations': QueryBudget('/admin/reservations', True, 2),
+    'main.available_rooms': QueryBudget(
+        '/available_rooms?start_time={tomorrow}T10:00&end_time={tomorrow}T11:00', False, 3),
+}
+
+
+class QueryCounter:
+    """
+    记录代码块中执行的 SQL 语句
+    属性:
+        statements (list): 执行过的 SQL 语句
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        # 执行过的语句数量
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(' '.join(statement.split()))
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    查询数超过预算时抛出的异常
+    属性:
+        label (str): 被检查的代码块或视图
+        limit (int): 最大查询数
+        statements (list): 执行过的 SQL 语句
+    """
+
+    def __init__(self, label, limit, statements):
+        self.label = label
+        self.limit = limit
+        self.statements = statements
+        details = '\n'.join(f'  {index}. {statement}' for index, statement in enumerate(statements, 1))
+        super().__init__(f'{label} 执行了 {len(statements)} 条 SQL 查询，超过预算 {limit} 条:\n{details}')
+
+
+@contextmanager
+def count_queries(engine):
+    """
+    统计代码块中执行的 SQL 语句的上下文管理器
+    参数:
+        engine (sqlalchemy.engine.Engine): 数据库引擎
+    返回:
+        QueryCounter: 代码块结束后 count 为执行的语句数量
+    """
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+
+@contextmanager
+def assert_max_queries(engine, limit, label='代码块'):
+    """
+    代码块执行的 SQL 查询数超过 limit 时抛出 QueryBudgetExceeded
+    参数:
+        engine (sqlalchemy.engine.Engine): 数据库引擎
+        limit (int): 最大查询数
+        label (str): 错误信息中显示的名称
+    返回:
+        QueryCounter: 执行的语句
+    异常:
+        QueryBudgetExceeded: 查询数超过 limit
+    """
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        raise QueryBudgetExceeded(label, limit, counter.statements)
+
+
+def _login(client, user_id):
+    # 直接写入 Flask-Login 的会话字段，不需要知道密码
+    with client.session_transaction(base_url='https://localhost') as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+def check_query_budgets(app, budgets=None):
+    """
+    用测试客户端依次请求各个视图，统计第二次请求执行的 SQL 查询数
+    管理员视图以 ID 最小的管理员登录，其他视图以未结束预订最多的用户登录（仪表盘会显示这些预订）。
+    参数:
+        app (flask.Flask): 已加载 Web 界面的应用
+        budgets (dict, optional): 端点 -> QueryBudget，默认为 QUERY_BUDGETS
+    返回:
+        list: 每个视图一个字典，包含 endpoint、path、status、queries、max_queries 和 statements
+    """
+    budgets = QUERY_BUDGETS if budgets is None else budgets
+    with app.app_context():
+        engine = db.engine
+        admin_id = db.session.query(func.min(User.id)).filter(User.is_admin.is_(True)).scalar()
+        busiest_id = db.session.query(Reservation.user_id).filter(
+            Reservation.end_time > datetime.now()
+        ).group_by(Reservation.user_id).order_by(func.count().desc()).limit(1).scalar()
+        db.session.remove()
+
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    results = []
+    for endpoint, budget in budgets.items():
+        client = app.test_client()
+        _login(client, admin_id if budget.admin else busiest_id or admin_id)
+        path = budget.path.format(tomorrow=tomorrow)
+        # 每个请求使用新的应用上下文，在命令行命令的应用上下文中调用时 g 中的登录用户也不会被复用
+        with app.app_context():
+            client.get(path, base_url='https://localhost')
+        with app.app_context(), count_queries(engine) as counter:
+            response = client.get(path, base_url='https://localhost')
+        results.append({
+            'endpoint': endpoint,
+            'path': path,
+            'status': response.status_code,
+            'queries': counter.count,
+            'max_queries': budget.max_queries,
+            'statements': counter.statements,
+        })
+    return results
@@ -0,0 +1,72 @@
+"""
+周期性预订规则
+把“每天/每周重复 N 次”的规则展开为各次预订的 (开始时间, 结束时间)，不访问数据库。
+变量:
+- FREQUENCIES: 支持的重复频率及其周期
+- MAX_OCCURRENCES: 一个系列最多包含的预订次数
+- MAX_SERIES_DAYS: 一个系列从第一次到最后一次预订最多跨越的天数
+函数:
+- expand_occurrences(start_time, end_time, frequency, count, interval): 展开周期性规则
+- validate_rule(start_time, end_time, frequency, count, interval, buffer_minutes): 检查规则是否有效
+"""
+from datetime import timedelta
+
+# 重复频率 -> 一个周期的长度
+FREQUENCIES = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+# 一个系列最多包含的预订次数
+MAX_OCCURRENCES = 52
+# 一个系列从第一次到最后一次预订最多跨越的天数（约两年），同时限制了重复间隔，展开规则时不会超出 datetime 的范围
+MAX_SERIES_DAYS = 730
+
+
+def expand_occurrences(start_time, end_time, frequency, count, interval=1):
+    """
+    展开周期性规则
+    参数:
+        start_time (datetime): 第一次预订的开始时间
+        end_time (datetime): 第一次预订的结束时间
+        frequency (str): 'daily' 或 'weekly'
+        count (int): 预订次数
+        interval (int): 每隔几个周期重复一次，默认为 1
+    返回:
+        list: 按时间排序的 (开始时间, 结束时间) 元组列表
+    """
+    step = FREQUENCIES[frequency] * interval
+    return [(start_time + step * index, end_time + step * index) for index in range(count)]
+
+
+def validate_rule(start_time, end_time, frequency, count, interval=1, buffer_minutes=0):
+    """
+    检查规则是否有效
+    相邻两次预订（含前后缓冲时间）不能重叠，因此每次预订只需要与已有预订比较，不需要与同一系列的其他预订比较。
+    参数:
+        start_time (datetime): 第一次预订的开始时间
+        end_time (datetime): 第一次预订的结束时间
+        frequency (str): 重复频率
+        count (int): 预订次数
+        interval (int): 每隔几个周期重复一次
+        buffer_minutes (int): 每次预订前后的缓冲时间（分钟）
+    返回:
+        str: 规则无效时返回原因，否则返回 None
+    """
+    if frequency not in FREQUENCIES:
+        return '不支持的重复频率'
+    if not 1 <= count <= MAX_OCCURRENCES:
+        return f'重复次数必须在 1 到 {MAX_OCCURRENCES} 之间'
+    # 按天数计算，避免很大的间隔在 timedelta 乘法中溢出
+    period_days = FREQUENCIES[frequency].days
+    max_interval = MAX_SERIES_DAYS // period_days
+    if not 1 <= interval <= max_interval:
+        return f'重复间隔必须在 1 到 {max_interval} 之间'
+    if period_days * interval * (count - 1) > MAX_SERIES_DAYS:
+        return f'整个系列的时间跨度不能超过 {MAX_SERIES_DAYS} 天，请减少重复次数或重复间隔'
+    if start_time >= end_time:
+        return '开始时间必须早于结束时间'
+    duration = end_time - start_time + timedelta(minutes=2 * buffer_minutes)
+    if duration > FREQUENCIES[frequency] * interval:
+        return '每次预订的时长（含准备时间）不能超过重复周期'
+    return None
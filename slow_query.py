@@ -0,0 +1,75 @@
+"""
+慢查询日志
+在数据库引擎上注册事件监听，执行时间超过阈值的 SQL 语句以 WARNING 级别写入日志，
+日志包含执行时间、所在的路由（请求方法、路径和端点，请求之外为 background）、语句和参数。
+函数:
+- install_slow_query_log(engine, threshold): 在引擎上注册慢查询日志
+- format_parameters(statement, parameters): 格式化语句参数，涉及密码的语句不输出参数
+说明:
+    参数最多输出 MAX_PARAMETER_LENGTH 个字符；批量执行（executemany）只输出参数组数和第一组参数。
+"""
+import logging
+import time
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# 日志中参数的最大长度（字符）
+MAX_PARAMETER_LENGTH = 500
+
+
+def format_parameters(statement, parameters, executemany=False):
+    """
+    格式化语句参数，涉及密码的语句不输出参数
+    参数:
+        statement (str): SQL 语句
+        parameters (tuple 或 dict 或 list): 语句参数，executemany 时为参数列表
+        executemany (bool): 是否为批量执行
+    返回:
+        str: 参数的文本表示
+    """
+    if 'password' in statement.lower():
+        return '<已隐藏>'
+    if executemany and parameters:
+        text = f'{len(parameters)} 组，第一组 {parameters[0]!r}'
+    else:
+        text = repr(parameters)
+    if len(text) > MAX_PARAMETER_LENGTH:
+        text = text[:MAX_PARAMETER_LENGTH] + '...'
+    return text
+
+
+def _route():
+    # 当前请求的方法、路径和端点，请求之外（后台清理、命令行）为 background
+    if not has_request_context():
+        return 'background'
+    return f'{request.method} {request.path} ({request.endpoint or "unmatched"})'
+
+
+def install_slow_query_log(engine, threshold):
+    """
+    在引擎上注册慢查询日志，threshold 小于等于 0 时不做任何处理
+    参数:
+        engine (sqlalchemy.engine.Engine): 数据库引擎
+        threshold (float): 阈值（秒），执行时间超过阈值的语句写入日志
+    """
+    if threshold <= 0:
+        return
+
+    # 开始时间保存在每条语句的执行上下文中，语句出错时不会在连接上留下多余的开始时间
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_slow_query_started', None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        if duration > threshold:
+            logger.warning('慢查询 %.3f 秒 [%s] %s 参数: %s', duration, _route(), ' '.join(statement.split()),
+                           format_parameters(statement, parameters, executemany))
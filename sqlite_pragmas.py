@@ -0,0 +1,65 @@
+"""
+SQLite 连接参数配置
+默认的 SQLite 连接使用回滚日志（journal_mode=DELETE），写事务会阻塞所有读操作，
+多个 gunicorn 工作进程同时写入时容易出现 "database is locked" 错误。
+这个模块在每个新建的数据库连接上执行 PRAGMA 语句：
+- journal_mode=WAL: 读写互不阻塞，只有写操作之间互斥
+- busy_timeout: 遇到锁时等待而不是立即报错
+- synchronous=NORMAL: WAL 模式下安全且减少 fsync 次数
+- cache_size / mmap_size / temp_store: 增大页缓存并使用内存映射读取
+所有参数都可以通过环境变量覆盖，设置为空字符串表示不执行对应的 PRAGMA。
+变量:
+- DEFAULT_PRAGMAS: 默认的 PRAGMA 设置
+函数:
+- pragmas_from_env(environ): 读取环境变量覆盖默认设置
+- install_pragmas(engine, pragmas): 在引擎的每个新连接上执行 PRAGMA
+"""
+from sqlalchemy import event
+
+# PRAGMA 名称 -> (环境变量名, 默认值)
+DEFAULT_PRAGMAS = {
+    'journal_mode': ('SQLITE_JOURNAL_MODE', 'WAL'),
+    'busy_timeout': ('SQLITE_BUSY_TIMEOUT_MS', '5000'),
+    'synchronous': ('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    # 负数表示以 KiB 为单位，-16384 即 16 MiB
+    'cache_size': ('SQLITE_CACHE_SIZE', '-16384'),
+    # 256 MiB
+    'mmap_size': ('SQLITE_MMAP_SIZE', '268435456'),
+    'temp_store': ('SQLITE_TEMP_STORE', 'MEMORY'),
+}
+
+
+def pragmas_from_env(environ):
+    """
+    读取环境变量覆盖默认的 PRAGMA 设置
+    参数:
+        environ (Mapping): 环境变量，通常为 os.environ
+    返回:
+        dict: {PRAGMA 名称: 值}，值为空字符串的项被忽略
+    """
+    pragmas = {}
+    for name, (variable, default) in DEFAULT_PRAGMAS.items():
+        value = environ.get(variable, default)
+        if value != '':
+            pragmas[name] = value
+    return pragmas
+
+
+def install_pragmas(engine, pragmas):
+    """
+    在引擎的每个新连接上执行 PRAGMA，非 SQLite 引擎不做任何处理
+    参数:
+        engine (sqlalchemy.engine.Engine): 数据库引擎
+        pragmas (dict): {PRAGMA 名称: 值}
+    """
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
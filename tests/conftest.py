@@ -0,0 +1,48 @@
+"""
+测试夹具
+每个测试使用临时目录中的实例目录和 SQLite 数据库，不会修改 instance 目录下的数据库。
+夹具:
+- app: 已初始化数据库（管理员 admin / admin123 和四个基础会议室）的应用
+- client: 应用的测试客户端
+函数:
+- login(client, username, password): 登录并检查是否成功
+"""
+import contextlib
+import io
+
+import pytest
+
+from app import create_app
+from init_db import init_db
+from models import db
+
+
+def make_app(directory, **config):
+    # 在 directory 中创建实例目录和数据库并初始化
+    app = create_app(dict({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{directory / 'test.db'}",
+        'SESSION_COOKIE_SECURE': False,
+        'METRICS_FLUSH_SECONDS': 0,
+    }, **config), instance_path=str(directory / 'instance'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db(app)
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, username, password):
+    response = client.post('/login', data={'username': username, 'password': password})
+    # 登录失败时重新显示登录页面（200）
+    assert response.status_code == 302, username
@@ -0,0 +1,110 @@
+"""
+可用性计算引擎的性质测试
+以原先按 15 分钟时间槽逐个统计的检查方法为参照，用随机生成的预订验证扫描线实现：
+- 预订和检查时间都按 15 分钟对齐时，两者的判断结果相同
+- 时间不对齐时，扫描线实现不会比时间槽检查更宽松（时间槽之间的冲突也能发现）
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from availability import (buffered_window, find_free_windows, first_overbooked_time, first_overbooked_times,
+                          peak_concurrency)
+
+BASE = datetime(2030, 1, 7, 8, 0)
+CASES = 1000
+
+
+def get_time_slots(start_time, end_time, slot_minutes=15):
+    # 原先 check_room_availability 使用的时间槽划分
+    slots = []
+    current = start_time
+    while current < end_time:
+        slots.append(current)
+        current += timedelta(minutes=slot_minutes)
+    return slots
+
+
+def slot_counts(intervals, start_time, end_time):
+    # 原先的检查方法：含缓冲时间的区间内每个时间槽的预订数
+    check_start, check_end = buffered_window(start_time, end_time)
+    return [(slot, sum(1 for start, end in intervals if start <= slot < end))
+            for slot in get_time_slots(check_start, check_end)]
+
+
+def slot_overbooked_time(intervals, start_time, end_time, limit):
+    # 原先的检查方法：返回第一个预订数达到上限的时间槽，都未达到时返回 None
+    for slot, count in slot_counts(intervals, start_time, end_time):
+        if count >= limit:
+            return slot
+    return None
+
+
+def random_case(rng, grid_minutes):
+    # 随机生成 (预订列表, 检查开始时间, 检查结束时间, 并发上限)，时间按 grid_minutes 对齐
+    def at(minutes):
+        return BASE + timedelta(minutes=minutes // grid_minutes * grid_minutes)
+
+    intervals = []
+    for _ in range(rng.randrange(12)):
+        start = rng.randrange(0, 10 * 60)
+        intervals.append((at(start), at(start + rng.randrange(15, 150))))
+    start = rng.randrange(0, 10 * 60)
+    return intervals, at(start), at(start + rng.randrange(15, 150)), rng.randint(1, 3)
+
+
+def sweep_overbooked_time(intervals, start_time, end_time, limit):
+    return first_overbooked_time(intervals, *buffered_window(start_time, end_time), limit)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_slot_checker_on_grid(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES):
+        intervals, start, end, limit = random_case(rng, 15)
+        expected = slot_overbooked_time(intervals, start, end, limit)
+        actual = sweep_overbooked_time(intervals, start, end, limit)
+        assert (actual is None) == (expected is None), (intervals, start, end, limit)
+        peak, _ = peak_concurrency(intervals, *buffered_window(start, end))
+        assert peak == max(count for _, count in slot_counts(intervals, start, end)), (intervals, start, end)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_never_more_permissive_off_grid(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES):
+        intervals, start, end, limit = random_case(rng, 1)
+        expected = slot_overbooked_time(intervals, start, end, limit)
+        actual = sweep_overbooked_time(intervals, start, end, limit)
+        if expected is not None:
+            assert actual is not None and actual <= expected, (intervals, start, end, limit)
+
+
+@pytest.mark.parametrize('grid_minutes', [1, 15])
+def test_batch_matches_single_checks(grid_minutes):
+    rng = random.Random(grid_minutes)
+    for _ in range(CASES // 5):
+        intervals, _, _, limit = random_case(rng, grid_minutes)
+        windows = [buffered_window(*random_case(rng, grid_minutes)[1:3]) for _ in range(10)]
+        assert first_overbooked_times(intervals, windows, limit) == [
+            first_overbooked_time(intervals, window_start, window_end, limit)
+            for window_start, window_end in windows]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_free_windows_pass_slot_checker(seed):
+    rng = random.Random(seed)
+    search_start, search_end = BASE, BASE + timedelta(hours=10)
+    for _ in range(CASES // 5):
+        intervals, _, _, limit = random_case(rng, 15)
+        duration = timedelta(minutes=15 * rng.randint(1, 8))
+        windows = find_free_windows(intervals, limit, duration, search_start, search_end, count=50)
+        for start, end in windows:
+            assert end - start == duration and search_start <= start and end <= search_end
+            assert slot_overbooked_time(intervals, start, end, limit) is None, (intervals, limit, start, end)
+            assert sweep_overbooked_time(intervals, start, end, limit) is None
+        # 时间槽检查认为有可以预订的时间时，查找结果不为空
+        starts = get_time_slots(search_start, search_end - duration + timedelta(minutes=1))
+        if any(slot_overbooked_time(intervals, start, start + duration, limit) is None for start in starts):
+            assert windows, (intervals, limit, duration)
@@ -0,0 +1,52 @@
+"""
+可用性接口的时间范围限制测试
+占用情况缓存按 (会议室, 日期) 分条目，查询很长的时间范围会取出并缓存大量条目，接口应拒绝超过上限的时间段，
+批量检查中相距很远的候选应分组获取预订。
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import views
+from conftest import login
+
+
+@pytest.fixture
+def logged_in(client):
+    login(client, 'admin', 'admin123')
+    return client
+
+
+def test_available_rooms_rejects_long_span(app, logged_in):
+    response = logged_in.get('/available_rooms?start_time=2030-01-01T09:00&end_time=2130-01-01T09:00')
+    assert response.status_code == 400
+    response = logged_in.get('/available_rooms?start_time=2030-01-01T09:00&end_time=2030-01-31T09:00')
+    assert response.status_code == 200
+    assert len(response.get_json()['rooms']) == 4
+    with app.app_context():
+        assert app.extensions['occupancy_cache'].stats()['entries'] < 200
+
+
+def test_batch_rejects_long_candidate(logged_in):
+    response = logged_in.post('/available_rooms/batch', json={'candidates': [
+        {'room_id': 1, 'start_time': '2030-01-01T09:00', 'end_time': '2130-01-01T09:00'}]})
+    assert response.status_code == 400
+
+
+def test_batch_groups_distant_candidates(app, logged_in, monkeypatch):
+    ranges = []
+    original = views.OccupancyCache.intervals
+
+    def intervals(cache, room_id, range_start, range_end, *args):
+        ranges.append(range_end - range_start)
+        return original(cache, room_id, range_start, range_end, *args)
+
+    monkeypatch.setattr(views.OccupancyCache, 'intervals', intervals)
+    starts = [datetime(2030, 1, 1, 9), datetime(2030, 1, 2, 9), datetime(2130, 1, 1, 9)]
+    response = logged_in.post('/available_rooms/batch', json={'candidates': [
+        {'room_id': 1, 'start_time': start.isoformat(), 'end_time': (start + timedelta(hours=1)).isoformat()}
+        for start in starts]})
+    assert response.status_code == 200
+    assert [result['available'] for result in response.get_json()['results']] == [True, True, True]
+    assert len(ranges) == 2
+    assert max(ranges) < timedelta(days=views.MAX_AVAILABILITY_SPAN_DAYS + 1)
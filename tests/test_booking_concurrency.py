@@ -0,0 +1,75 @@
+"""
+并发预订压力测试
+多个进程（每个进程一个应用实例和一个用户，相当于多个 gunicorn 工作进程）同时提交同一个会议室的同一时间段，
+检查 run_serialized 串行化后不会超订，并且预订数量计数器与预订表一致。
+"""
+import multiprocessing
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app import create_app
+from conftest import login
+from models import Reservation, ReservationCounter, Room, User, db
+
+WORKERS = 12
+POSTS_PER_WORKER = 5
+TOTAL_SLOTS = 3
+
+
+def post_reservations(config, instance_path, username, start, ready, go, results):
+    # 在子进程中执行：创建自己的应用，等所有进程就绪后连续提交同一时间段
+    app = create_app(config, instance_path=instance_path)
+    client = app.test_client()
+    login(client, username, 'password')
+    ready.release()
+    go.wait()
+    booked = 0
+    for _ in range(POSTS_PER_WORKER):
+        response = client.post('/reservation/new', data={
+            'room_id': '1',
+            'title': username,
+            'start_time': f'{start:%Y-%m-%dT%H:%M}',
+            'end_time': f'{start + timedelta(hours=1):%Y-%m-%dT%H:%M}',
+            'attendees': '1',
+        })
+        # 成功时重定向到仪表盘，冲突或加锁失败时重定向回预订页面
+        booked += response.headers['Location'].endswith('/dashboard')
+    results.put(booked)
+
+
+def test_concurrent_posts_never_overbook(app, tmp_path):
+    with app.app_context():
+        db.session.get(Room, 1).total_slots = TOTAL_SLOTS
+        for index in range(WORKERS):
+            db.session.add(User(username=f'worker-{index}', password='password'))
+        db.session.commit()
+        db.engine.dispose()
+
+    start = (datetime.now() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+    context = multiprocessing.get_context('spawn')
+    ready, go, results = context.Semaphore(0), context.Event(), context.Queue()
+    config = {key: app.config[key] for key in ('SQLALCHEMY_DATABASE_URI', 'SESSION_COOKIE_SECURE')}
+    processes = [context.Process(target=post_reservations, args=(
+        config, app.instance_path, f'worker-{index}', start, ready, go, results)) for index in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        assert ready.acquire(timeout=60)
+    go.set()
+    booked = sum(results.get(timeout=120) for _ in processes)
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+
+    with app.app_context():
+        rows = Reservation.query.filter_by(room_id=1).count()
+        assert rows <= TOTAL_SLOTS
+        assert rows == booked
+        counters = {(counter.scope, counter.scope_id): counter.reservation_count
+                    for counter in ReservationCounter.query if counter.reservation_count}
+        expected = {('total', 0): Reservation.query.count()}
+        for scope, column in (('room', Reservation.room_id), ('user', Reservation.user_id)):
+            for scope_id, count in db.session.query(column, func.count()).group_by(column):
+                expected[(scope, scope_id)] = count
+        assert counters == expected
@@ -0,0 +1,44 @@
+"""
+批量导入测试
+同一块中混有带时区偏移和不带时区的预订时间时，带时区的行作为无效行报告，其余行正常导入，不会中断整个导入。
+"""
+import io
+from datetime import datetime, timedelta
+
+from bulk_import import ImportReport
+from conftest import login
+from models import Reservation, db
+
+
+def mixed_csv():
+    # 第 3 行带时区偏移，其余行使用本地时间
+    day = (datetime.now() + timedelta(days=1)).date().isoformat()
+    return (
+        'room_id,user_id,title,start_time,end_time\n'
+        f'1,1,local-1,{day}T09:00,{day}T10:00\n'
+        f'1,1,offset,{day}T10:00+08:00,{day}T11:00+08:00\n'
+        f'1,1,local-2,{day}T11:00,{day}T12:00\n'
+    )
+
+
+def test_import_data_reports_timezone_row(app):
+    import views
+
+    with app.app_context():
+        report = views.import_data(io.StringIO(mixed_csv()), 'csv', 'reservations', ImportReport())
+        titles = sorted(title for (title,) in db.session.query(Reservation.title))
+    assert (report.processed, report.imported, report.failed) == (3, 2, 1)
+    [(line, message)] = report.errors
+    assert line == 3 and message.startswith('字段 start_time 不能包含时区')
+    assert titles == ['local-1', 'local-2']
+
+
+def test_admin_import_mixed_timezones(client):
+    login(client, 'admin', 'admin123')
+    response = client.post('/admin/import', data={
+        'kind': 'reservations',
+        'format': 'csv',
+        'file': (io.BytesIO(mixed_csv().encode()), 'reservations.csv'),
+    })
+    assert response.status_code == 200
+    assert '不能包含时区' in response.get_data(as_text=True)
@@ -0,0 +1,59 @@
+"""
+日历订阅条件请求测试
+会议室日历显示预订人的用户名，用户日历显示会议室名称，改名后另一类订阅的 ETag 也要变化，不能继续返回 304。
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import login
+from models import Reservation, User, db, record_reservation_changes
+
+
+@pytest.fixture
+def booked(app):
+    # 用户 alice 在会议室 1 的一个预订
+    start = (datetime.now() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+    with app.app_context():
+        alice = User(username='alice', password='password')
+        db.session.add(alice)
+        db.session.flush()
+        db.session.add(Reservation(room_id=1, user_id=alice.id, title='sync', start_time=start,
+                                   end_time=start + timedelta(hours=1)))
+        record_reservation_changes([(1, alice.id, 1)])
+        db.session.commit()
+        return alice.id
+
+
+def revalidate(client, path):
+    # 第一次请求取得 ETag，返回之后带 If-None-Match 的条件请求函数
+    etag = client.get(path).headers['ETag']
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+    return lambda: client.get(path, headers={'If-None-Match': etag})
+
+
+def test_room_feed_changes_when_user_renamed(client, booked):
+    login(client, 'admin', 'admin123')
+    conditional = revalidate(client, '/calendar/room/1.ics')
+    client.post(f'/admin/users/edit/{booked}', data={'username': 'alice-renamed', 'password': ''})
+    response = conditional()
+    assert response.status_code == 200
+    assert 'alice-renamed' in response.get_data(as_text=True)
+
+
+def test_user_feed_changes_when_room_renamed(client, booked):
+    login(client, 'admin', 'admin123')
+    conditional = revalidate(client, f'/calendar/user/{booked}.ics')
+    client.post('/room/edit/1', data={'name': '董事会议室', 'capacity': '20', 'total_slots': '10',
+                                      'description': ''})
+    response = conditional()
+    assert response.status_code == 200
+    assert '董事会议室' in response.get_data(as_text=True)
+
+
+def test_feed_unchanged_by_other_edits(client, booked):
+    login(client, 'admin', 'admin123')
+    conditional = revalidate(client, '/calendar/room/1.ics')
+    # 只修改密码时会议室日历的内容不变
+    client.post(f'/admin/users/edit/{booked}', data={'username': 'alice', 'password': 'new'})
+    assert conditional().status_code == 304
@@ -0,0 +1,50 @@
+"""
+配置测试
+连接池参数只在显式设置 DB_POOL_* 环境变量时传给 SQLAlchemy，内存 SQLite 数据库（StaticPool）也能创建应用。
+"""
+import contextlib
+import io
+
+import pytest
+
+from app import create_app
+from config import load_config
+from conftest import login
+from init_db import init_db
+from models import db
+
+POOL_VARIABLES = ('DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_TIMEOUT')
+
+
+@pytest.fixture
+def environ(monkeypatch):
+    for name in POOL_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+def test_in_memory_database(environ, tmp_path):
+    environ.setenv('DATABASE_URL', 'sqlite://')
+    app = create_app({'SESSION_COOKIE_SECURE': False, 'METRICS_FLUSH_SECONDS': 0},
+                     instance_path=str(tmp_path / 'instance'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db(app)
+    client = app.test_client()
+    login(client, 'admin', 'admin123')
+    assert client.get('/dashboard').status_code == 200
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_pool_options_from_environment(environ, tmp_path):
+    assert load_config({})['SQLALCHEMY_ENGINE_OPTIONS'] == {}
+    options = {'DB_POOL_SIZE': '8', 'DB_MAX_OVERFLOW': '2', 'DB_POOL_TIMEOUT': '1.5'}
+    assert load_config(options)['SQLALCHEMY_ENGINE_OPTIONS'] == {
+        'pool_size': 8, 'max_overflow': 2, 'pool_timeout': 1.5}
+    for name, value in options.items():
+        environ.setenv(name, value)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}"},
+                     web=False, instance_path=str(tmp_path / 'instance'))
+    with app.app_context():
+        assert db.engine.pool.size() == 8
+        db.engine.dispose()
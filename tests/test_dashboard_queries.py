@@ -0,0 +1,43 @@
+"""
+仪表盘查询数测试
+仪表盘的预订和会议室用一条 JOIN 查询获取，查询数不随预订数量增长（没有逐行延迟加载 reservation.room）。
+"""
+from datetime import datetime, timedelta
+
+from conftest import login
+from models import Reservation, Room, db, rebuild_reservation_counters
+from query_budget import QUERY_BUDGETS, assert_max_queries
+
+
+def add_reservations(count):
+    # 为管理员添加 count 条未来的预订，依次使用所有会议室
+    room_ids = [room_id for (room_id,) in db.session.query(Room.id)]
+    start = (datetime.now() + timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+    existing = Reservation.query.count()
+    for index in range(existing, existing + count):
+        begin = start + timedelta(days=index // 10, minutes=60 * (index % 10))
+        db.session.add(Reservation(room_id=room_ids[index % len(room_ids)], user_id=1, title=f'meeting-{index}',
+                                   start_time=begin, end_time=begin + timedelta(minutes=30)))
+    db.session.commit()
+    rebuild_reservation_counters()
+
+
+def test_dashboard_query_count_does_not_grow(app, client):
+    login(client, 'admin', 'admin123')
+    budget = QUERY_BUDGETS['main.dashboard'].max_queries
+    with app.app_context():
+        engine = db.engine
+    counts = {}
+    total = 0
+    for count in (1, 10, 50):
+        with app.app_context():
+            add_reservations(count - total)
+        total = count
+        # 第一次请求预热会议室列表缓存和登录用户缓存
+        client.get('/dashboard')
+        with assert_max_queries(engine, budget, f'/dashboard（{count} 条预订）') as counter:
+            response = client.get('/dashboard')
+        assert response.status_code == 200
+        assert f'meeting-{count - 1}' in response.get_data(as_text=True)
+        counts[count] = counter.count
+    assert len(set(counts.values())) == 1, counts
@@ -0,0 +1,79 @@
+"""
+预订表索引测试
+记录冲突检查、仪表盘和过期预订清理实际执行的 SQL 语句，用 EXPLAIN QUERY PLAN 检查 SQLite 使用了对应的索引。
+"""
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from conftest import login
+from models import Reservation, cleanup_expired_reservations, db, rebuild_reservation_counters
+
+
+@pytest.fixture
+def reservations(app):
+    # 会议室 1 上管理员的预订，一半已经结束
+    now = datetime.now().replace(second=0, microsecond=0)
+    with app.app_context():
+        for day in range(-10, 10):
+            start = now + timedelta(days=day, hours=1)
+            db.session.add(Reservation(room_id=1, user_id=1, title=f'r{day}',
+                                       start_time=start, end_time=start + timedelta(hours=1)))
+        db.session.commit()
+        rebuild_reservation_counters()
+    return now
+
+
+def reservation_plans(app, call):
+    # 执行 call，返回其中查询 reservation 表的语句及其查询计划
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM reservation' in statement and not statement.startswith('EXPLAIN'):
+            executed.append((statement, parameters))
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            call()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        plans = []
+        for statement, parameters in executed:
+            rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+            plans.append((statement, ' | '.join(row[-1] for row in rows)))
+        db.session.rollback()
+    assert plans, '没有执行查询 reservation 表的语句'
+    return plans
+
+
+def assert_uses_index(plans, index, keyword):
+    # keyword 所在语句的查询计划都使用了 index
+    matched = [(statement, plan) for statement, plan in plans if keyword in statement]
+    assert matched, keyword
+    for statement, plan in matched:
+        assert re.search(rf'INDEX {index}\b', plan), f'{statement}\n{plan}'
+
+
+def test_availability_check_uses_room_time_index(app, reservations):
+    import views
+
+    def check():
+        start = reservations + timedelta(days=3)
+        views.check_room_availability(1, start, start + timedelta(hours=1), use_cache=False)
+
+    plans = reservation_plans(app, check)
+    assert_uses_index(plans, 'ix_reservation_room_time', 'reservation.room_id IN')
+
+
+def test_dashboard_uses_user_start_index(app, client, reservations):
+    login(client, 'admin', 'admin123')
+    plans = reservation_plans(app, lambda: client.get('/dashboard'))
+    assert_uses_index(plans, 'ix_reservation_user_start', 'reservation.user_id = ?')
+
+
+def test_cleanup_uses_end_time_index(app, reservations):
+    plans = reservation_plans(app, cleanup_expired_reservations)
+    assert_uses_index(plans, 'ix_reservation_end_time', 'reservation.end_time < ?')
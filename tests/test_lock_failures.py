@@ -0,0 +1,90 @@
+"""
+获取写锁失败时的处理测试
+run_serialized 多次重试后仍无法获取写锁时抛出 OperationalError，视图应提示失败并重定向，而不是返回 500。
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import views
+from conftest import login
+from models import Reservation, ReservationSeries, User, db, get_reservation_count, record_reservation_changes
+
+
+@pytest.fixture
+def locked(monkeypatch):
+    # 让所有串行化事务都因为数据库被锁定而失败
+    def run_serialized(*args, **kwargs):
+        raise OperationalError('BEGIN IMMEDIATE', (), sqlite3.OperationalError('database is locked'))
+
+    monkeypatch.setattr(views, 'run_serialized', run_serialized)
+
+
+@pytest.fixture
+def reservation_id(app):
+    # 管理员在会议室 1 的一个预订
+    start = (datetime.now() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+    with app.app_context():
+        reservation = Reservation(room_id=1, user_id=1, title='sync', start_time=start,
+                                  end_time=start + timedelta(hours=1))
+        db.session.add(reservation)
+        record_reservation_changes([(1, 1, 1)])
+        db.session.commit()
+        return reservation.id
+
+
+def test_admin_delete_user_lock_failure(app, client, locked):
+    with app.app_context():
+        user = User(username='someone', password='password')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    login(client, 'admin', 'admin123')
+    response = client.post(f'/admin/users/delete/{user_id}', follow_redirects=True)
+    assert response.status_code == 200
+    assert response.request.path == '/admin/users'
+    assert '删除失败，请重试' in response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.get(User, user_id) is not None
+
+
+def test_cancel_series_lock_failure(app, client, locked):
+    with app.app_context():
+        series = ReservationSeries(room_id=1, user_id=1, title='weekly', frequency='weekly', occurrences=4)
+        db.session.add(series)
+        db.session.commit()
+        series_id = series.id
+    login(client, 'admin', 'admin123')
+    response = client.get(f'/reservation/series/cancel/{series_id}', follow_redirects=True)
+    assert response.status_code == 200
+    assert response.request.path == '/dashboard'
+    assert '取消失败，请重试' in response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.get(ReservationSeries, series_id) is not None
+
+
+@pytest.mark.parametrize('path, redirected_to, message', [
+    ('/reservation/cancel/{id}', '/dashboard', '取消失败，请重试'),
+    ('/admin/delete_reservation/{id}', '/admin/reservations', '删除失败，请重试'),
+])
+def test_delete_reservation_lock_failure(app, client, reservation_id, locked, path, redirected_to, message):
+    login(client, 'admin', 'admin123')
+    response = client.get(path.format(id=reservation_id), follow_redirects=True)
+    assert response.status_code == 200
+    assert response.request.path == redirected_to
+    assert message in response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.get(Reservation, reservation_id) is not None
+        assert get_reservation_count('total') == 1
+
+
+@pytest.mark.parametrize('path', ['/reservation/cancel/{id}', '/admin/delete_reservation/{id}'])
+def test_delete_reservation_updates_counters(app, client, reservation_id, path):
+    login(client, 'admin', 'admin123')
+    client.get(path.format(id=reservation_id))
+    with app.app_context():
+        assert db.session.get(Reservation, reservation_id) is None
+        assert (get_reservation_count('total'), get_reservation_count('room', 1),
+                get_reservation_count('user', 1)) == (0, 0, 0)
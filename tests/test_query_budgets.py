@@ -0,0 +1,45 @@
+"""
+SQL 查询数预算测试
+用 generate_data 生成几千条预订，在缓存预热后检查 QUERY_BUDGETS 中每个视图的查询数不超过预算；
+模板中逐行延迟加载 reservation.room、reservation.user 之类的 N+1 查询会让测试失败并列出执行的语句。
+"""
+import contextlib
+import io
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from conftest import login
+from generate_data import generate
+from models import Reservation, User, db
+from query_budget import QUERY_BUDGETS, assert_max_queries
+
+
+@pytest.fixture
+def seeded(app):
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate(app, rooms=20, users=30, reservations=3000, days=20, seed=0, prefix='ci')
+    with app.app_context():
+        # 未结束预订最多的用户，仪表盘会显示他的预订
+        busiest_id = db.session.query(Reservation.user_id).filter(
+            Reservation.end_time > datetime.now()
+        ).group_by(Reservation.user_id).order_by(func.count().desc()).limit(1).scalar()
+        return db.session.get(User, busiest_id).username
+
+
+@pytest.mark.parametrize('endpoint', sorted(QUERY_BUDGETS))
+def test_view_within_query_budget(app, client, seeded, endpoint):
+    budget = QUERY_BUDGETS[endpoint]
+    if budget.admin:
+        login(client, 'admin', 'admin123')
+    else:
+        login(client, seeded, 'password')
+    path = budget.path.format(tomorrow=(date.today() + timedelta(days=1)).isoformat())
+    with app.app_context():
+        engine = db.engine
+    # 第一次请求预热缓存，预算按第二次请求计算
+    assert client.get(path).status_code == 200
+    with assert_max_queries(engine, budget.max_queries, endpoint):
+        response = client.get(path)
+    assert response.status_code == 200
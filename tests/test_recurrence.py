@@ -0,0 +1,47 @@
+"""
+周期性预订规则测试
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import login
+from recurrence import MAX_SERIES_DAYS, expand_occurrences, validate_rule
+
+START = datetime(2030, 1, 7, 10, 0)
+END = START + timedelta(hours=1)
+
+
+@pytest.mark.parametrize('frequency, count, interval', [
+    ('daily', 1, 10 ** 9),
+    ('weekly', 52, 10 ** 18),
+    ('weekly', 2, MAX_SERIES_DAYS // 7 + 1),
+    ('daily', 52, MAX_SERIES_DAYS // 51 + 1),
+    ('daily', 2, 0),
+])
+def test_rejects_out_of_range_intervals(frequency, count, interval):
+    assert validate_rule(START, END, frequency, count, interval) is not None
+
+
+@pytest.mark.parametrize('frequency, count, interval', [
+    ('weekly', 52, 2),
+    ('weekly', 2, MAX_SERIES_DAYS // 7),
+    ('daily', 1, MAX_SERIES_DAYS),
+])
+def test_accepted_rules_expand_within_limit(frequency, count, interval):
+    assert validate_rule(START, END, frequency, count, interval) is None
+    occurrences = expand_occurrences(START, END, frequency, count, interval)
+    assert len(occurrences) == count
+    assert occurrences[-1][0] - START <= timedelta(days=MAX_SERIES_DAYS)
+
+
+def test_huge_interval_is_flashed_not_500(client):
+    login(client, 'admin', 'admin123')
+    start = (datetime.now() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+    response = client.post('/reservation/new', data={
+        'room_id': '1', 'title': 'weekly', 'attendees': '1',
+        'start_time': f'{start:%Y-%m-%dT%H:%M}', 'end_time': f'{start + timedelta(hours=1):%Y-%m-%dT%H:%M}',
+        'frequency': 'weekly', 'count': '3', 'repeat_interval': str(10 ** 12),
+    }, follow_redirects=True)
+    assert response.status_code == 200
+    assert '重复间隔必须在 1 到' in response.get_data(as_text=True)
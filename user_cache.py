@@ -0,0 +1,135 @@
+"""
+登录用户缓存
+Flask-Login 在每个已登录的请求中都会调用 user_loader，原来的实现每次都要查询一次用户表。
+这个模块在每个工作进程内缓存用户的身份信息（ID、用户名、是否为管理员），条目在 TTL 秒后过期。
+修改或删除用户时通过共享的代数表（见 occupancy_cache.SharedGenerations）让所有工作进程的条目失效，
+TTL 只用于限制共享代数表不可用（例如不支持 fcntl 的平台）时的最长过期时间。
+缓存中不保存密码，需要修改用户数据时应从数据库重新加载 User 对象。
+类:
+- CachedUser: 供 Flask-Login 使用的只读用户身份
+- UserCache: 按用户ID缓存 CachedUser 的 TTL 缓存
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+
+class CachedUser(UserMixin):
+    """
+    供 Flask-Login 使用的只读用户身份，不绑定数据库会话
+    属性:
+        id (int): 用户ID
+        username (str): 用户名
+        is_admin (bool): 是否为管理员
+    """
+    __slots__ = ('id', 'username', 'is_admin')
+
+    def __init__(self, id, username, is_admin):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+
+    def __repr__(self):
+        return f'<CachedUser {self.id} {self.username!r}>'
+
+
+class UserCache:
+    """
+    按用户ID缓存 CachedUser 的 TTL 缓存（按工作进程缓存）
+    属性:
+        loader (callable): loader(user_id) 返回 CachedUser，用户不存在时返回 None
+        generations (SharedGenerations): 多进程共享的代数计数器表
+        ttl (float): 条目的有效时间（秒），0 表示不缓存
+        max_entries (int): 最多缓存的用户数，超过时淘汰最近最少使用的条目
+    方法:
+        get(user_id):
+            返回用户身份，未命中或过期时调用 loader
+        invalidate(user_id):
+            使所有工作进程中该用户的缓存失效，应在写操作提交之后调用
+        stats():
+            返回命中、未命中、过期和失效次数
+    """
+
+    def __init__(self, loader, generations, ttl=60, max_entries=4096):
+        self.loader = loader
+        self.generations = generations
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(user_id):
+        # 代数表中的键，与占用情况缓存的 (会议室ID, 日期) 键不会相同
+        return ('user', user_id)
+
+    def get(self, user_id):
+        """
+        返回用户身份
+        参数:
+            user_id (int): 用户ID
+        返回:
+            CachedUser: 用户身份，用户不存在时返回 None（不缓存）
+        """
+        if self.ttl <= 0:
+            return self.loader(user_id)
+        # 先读取代数再查询数据库，保证查询期间的修改会让这次填充的条目失效
+        generation = (self.generations.get(None), self.generations.get(self._key(user_id)))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry_generation, expires_at, user = entry
+                if entry_generation == generation and expires_at > now:
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return user
+                if entry_generation == generation:
+                    self.expirations += 1
+            self.misses += 1
+
+        user = self.loader(user_id)
+        with self._lock:
+            if user is None:
+                self._entries.pop(user_id, None)
+            else:
+                self._entries[user_id] = (generation, now + self.ttl, user)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        """
+        使所有工作进程中该用户的缓存失效，应在写操作提交之后调用
+        参数:
+            user_id (int): 用户ID
+        """
+        self.generations.bump([self._key(user_id)])
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        返回当前工作进程的缓存统计
+        返回:
+            dict: 包含 entries、ttl、hits、misses、expirations、invalidations 和 hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,2433 @@
+"""
+会议室预订系统的 Web 界面
+这个模块包含所有路由、页面使用的辅助函数和每个工作进程的缓存，路由注册在蓝图 main 上。
+create_app 在需要 Web 界面时才导入这个模块并调用 init_app，维护脚本和命令行命令不会加载它。
+模块:
+- flask: 提供蓝图、请求和响应等 Web 功能
+- flask_login: 提供用户会话管理
+- werkzeug.local: 提供指向当前应用缓存的代理
+- sqlalchemy: 提供查询条件组合和关联对象的预加载
+- models: 提供数据模型、计数器和变更版本的辅助函数
+- availability: 提供基于扫描线的会议室可用性计算
+- occupancy_cache: 提供按 (会议室, 日期) 缓存预订区间的 LRU 缓存
+- booking: 提供把可用性检查和写入放进同一个串行化事务的预订函数
+- recurrence: 提供周期性预订规则的展开和检查
+- bulk_import: 提供批量导入文件的逐行读取、字段校验和错误报告
+- bulk_export: 提供批量导出时 CSV 和 JSON Lines 的分批编码
+- icalendar_feed: 提供 iCalendar 订阅内容的生成
+- itsdangerous: 提供日历订阅链接的签名令牌
+- functools: 提供装饰器使用的 wraps
+- user_cache: 提供按用户ID缓存登录用户身份的 TTL 缓存
+- metrics: 提供请求和 SQL 查询指标的 Prometheus 文本格式输出
+缓存:
+- occupancy_cache / room_list_cache / user_cache: 由 init_app 按应用配置创建并保存在 app.extensions 中，
+  模块中的同名变量是指向当前应用缓存的代理
+- booking_stats: 当前工作进程的串行化预订事务统计
+辅助函数:
+- parse_date / format_cursor / parse_cursor: 解析筛选日期，生成和解析分页游标
+- reservation_filters: 根据会议室、用户名和日期范围生成预订的筛选条件
+- load_reservation_intervals: 查询多个会议室在指定范围内的预订，供占用情况缓存使用
+- load_room_snapshots: 查询所有会议室，供会议室列表缓存使用
+- load_user_identity: 查询用户身份，供登录用户缓存使用
+- check_room_availability: 检查会议室在指定时间段内的可用性（使用 availability 模块的扫描线算法）
+- check_room_availability_batch: 批量检查多个 (会议室, 时间段) 候选的可用性
+- check_reservation_quota: 根据计数器检查会议总数、用户和会议室的预订数量限制
+- calendar_token / check_calendar_token: 生成和验证日历订阅链接的令牌
+- renamed_version_keys: 会议室或用户改名后需要递增的变更版本（包括显示这个名称的另一类日历订阅）
+- not_modified / set_validators: 处理条件请求，设置 ETag 和 Last-Modified
+- conditional_get: 根据全局变更版本为页面生成 ETag，内容未变化时返回 304 的装饰器
+- format_occurrences: 把周期性预订中冲突的各次预订格式化为提示信息
+- book_reservation_series: 在一个串行化事务中检查并批量写入周期性预订系列
+- runtime_samples: 当前工作进程的缓存和预订事务统计，写入指标快照时调用
+- load_basic_auth_admin: 用 HTTP Basic 认证信息加载管理员，供不能登录的监控系统使用
+路由:
+- index: 首页
+- login: 用户登录
+- register: 用户注册
+- dashboard: 用户仪表盘（支持 ETag 条件请求）
+- add_room: 添加会议室（管理员）
+- edit_room: 编辑会议室（管理员）
+- delete_room: 删除会议室（管理员）
+- new_reservation: 创建新预订（GET 支持 ETag 条件请求）
+- cancel_reservation: 取消预订
+- edit_reservation: 编辑预订
+- edit_series: 批量编辑周期性预订系列
+- cancel_series: 取消整个周期性预订系列
+- admin_reservations: 管理员查看所有预订（支持筛选和游标分页）
+- delete_reservation: 管理员删除预订
+- admin_edit_reservation: 管理员编辑预订
+- admin_users: 管理员查看所有用户
+- admin_add_user: 管理员添加用户
+- admin_edit_user: 管理员编辑用户
+- admin_delete_user: 管理员删除用户
+- available_rooms: 获取可用会议室（支持 ETag 条件请求）
+- available_rooms_batch: 批量检查多个 (会议室, 时间段) 候选的可用性（JSON POST）
+- next_free_windows: 查找最早可以预订的空闲时间段
+- room_calendar: 会议室的 iCalendar 订阅（支持 ETag/Last-Modified 条件请求）
+- user_calendar: 用户的 iCalendar 订阅（支持 ETag/Last-Modified 条件请求）
+- about: 关于页面
+- forgot_password: 忘记密码页面
+- admin_rooms: 管理员查看所有会议室（支持 ETag 条件请求）
+- change_password: 用户修改密码
+- logout: 用户登出
+- admin_maintenance: 管理员查看后台维护任务状态
+- admin_stats: 管理员查看占用情况缓存、登录用户缓存和预订事务的运行统计
+- metrics: 管理员获取所有工作进程汇总的请求、SQL 查询、缓存和清理任务指标（Prometheus 文本格式）
+- admin_profiles: 管理员查看最近的请求性能分析结果
+- admin_profile: 管理员下载一个请求性能分析结果（.prof 或 .json）
+- admin_import: 管理员上传 CSV 或 JSON Lines 文件批量导入会议室、用户或预订
+- admin_export: 管理员按筛选条件流式导出预订（CSV 或 JSON Lines）
+其他功能:
+- import_data: 分块导入会议室、用户或预订，每块在一个事务中校验、检查冲突并批量写入
+- export_reservation_rows: 用服务器端游标逐批读取要导出的预订
+- init_app: 创建缓存、注册指标收集函数、初始化登录管理器并注册蓝图
+"""
+import os
+from collections import namedtuple
+from functools import wraps
+from datetime import datetime, timedelta, timezone
+from flask import (Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify,
+                   Response, abort, make_response, send_from_directory, session, stream_with_context)
+from itsdangerous import BadSignature, URLSafeSerializer
+from flask_login import LoginManager, login_user, login_required, logout_user, current_user
+from sqlalchemy import and_, func, insert, or_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import joinedload
+from werkzeug.local import LocalProxy
+from availability import (BUFFER_MINUTES, IntervalIndex, buffered_window, find_free_windows, first_overbooked_time,
+                          first_overbooked_times, peak_concurrency_by_room)
+from booking import BookingConflict, BookingStats, run_serialized
+from bulk_export import EXPORT_FORMATS, encode_rows
+from icalendar_feed import CalendarEvent, build_calendar
+from metrics import render_prometheus
+from bulk_import import (IMPORT_CHUNK_SIZE, IMPORT_KINDS, ImportReport, ImportRowError, chunked, detect_format,
+                         parse_reservation, parse_room, parse_user, read_rows)
+from models import (Reservation, ReservationCounter, ReservationSeries, Room, User, db,
+                    delete_reservations, get_change_version, get_reservation_count, record_reservation_changes,
+                    touch_change_versions)
+from occupancy_cache import CachedValue, OccupancyCache
+from recurrence import expand_occurrences, validate_rule
+from user_cache import CachedUser, UserCache
+
+# 所有页面和接口的蓝图，由 init_app 注册到应用
+bp = Blueprint('main', __name__)
+# 初始化 Flask-Login 管理器，由 init_app 绑定到应用
+login_manager = LoginManager()
+# 设置登录视图的端点
+login_manager.login_view = 'main.login'
+
+# 设置允许的最大会议数量
+MAX_TOTAL_MEETINGS = 100
+# 批量可用性检查一次允许的最大候选数量
+MAX_BATCH_CANDIDATES = 200
+# 仪表盘显示未来多少天内的预订，以及最多显示的预订数量
+DASHBOARD_DAYS = 30
+DASHBOARD_RESERVATION_LIMIT = 50
+# 预订列表每页的默认数量和最大数量
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# 空闲时间段搜索的最大天数和最多返回的时间段数量
+MAX_SEARCH_HORIZON_DAYS = 31
+# 可用性检查一个时间段的最大天数：占用情况缓存按 (会议室, 日期) 分条目，范围越长取出和缓存的条目越多
+MAX_AVAILABILITY_SPAN_DAYS = 31
+MAX_FREE_WINDOWS = 20
+# 批量导出时每次从数据库读取的行数
+EXPORT_BATCH_SIZE = 1000
+# 仪表盘的 ETag 按多少秒分段：仪表盘只显示尚未结束的预订，即使数据没有修改，内容也会随时间变化
+DASHBOARD_ETAG_SECONDS = 60
+# 日历订阅包含的时间范围：过去多少天到未来多少天
+CALENDAR_PAST_DAYS = 30
+CALENDAR_FUTURE_DAYS = 180
+
+# 按 (会议室ID, 日期) 缓存预订区间，写操作提交后通过 invalidate 使相关条目失效
+occupancy_cache = LocalProxy(lambda: current_app.extensions['occupancy_cache'])
+# 会议室列表缓存，添加、编辑、删除会议室后通过 invalidate 使所有工作进程的缓存失效
+room_list_cache = LocalProxy(lambda: current_app.extensions['room_list_cache'])
+# 登录用户缓存，修改或删除用户后通过 invalidate 使所有工作进程的缓存失效
+user_cache = LocalProxy(lambda: current_app.extensions['user_cache'])
+# 后台维护任务调度器，由 create_app 创建
+maintenance_scheduler = LocalProxy(lambda: current_app.extensions['maintenance_scheduler'])
+# 请求和 SQL 查询指标收集器，由 create_app 创建
+request_metrics = LocalProxy(lambda: current_app.extensions['metrics'])
+# 请求性能分析器，由 create_app 创建
+profiler = LocalProxy(lambda: current_app.extensions['profiler'])
+
+# 辅助函数
+
+
+def parse_date(value):
+    """
+    解析 YYYY-MM-DD 格式的日期
+    参数:
+        value (str): 日期字符串
+    返回:
+        date or None: 解析后的日期，为空或格式错误时返回 None
+    """
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def format_cursor(reservation):
+    """
+    生成分页游标，格式为 "开始时间,预订ID"
+    参数:
+        reservation (Reservation): 当前页的第一条或最后一条预订
+    返回:
+        str: 分页游标
+    """
+    return f'{reservation.start_time.isoformat()},{reservation.id}'
+
+
+def parse_cursor(value):
+    """
+    解析分页游标
+    参数:
+        value (str): format_cursor 生成的游标
+    返回:
+        tuple or None: (开始时间, 预订ID)，为空或格式错误时返回 None
+    """
+    try:
+        start_time, reservation_id = value.rsplit(',', 1)
+        return datetime.fromisoformat(start_time), int(reservation_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def reservation_filters(room_id=None, username=None, date_from=None, date_to=None):
+    """
+    根据会议室、用户名和开始日期范围生成预订的筛选条件
+    参数:
+        room_id (int, optional): 会议室ID
+        username (str, optional): 用户名，使用时查询需要 JOIN 用户表
+        date_from (date, optional): 最早的开始日期（包含）
+        date_to (date, optional): 最晚的开始日期（包含）
+    返回:
+        list: 传给 Query.filter 的条件列表
+    """
+    criteria = []
+    if room_id:
+        criteria.append(Reservation.room_id == room_id)
+    if username:
+        criteria.append(User.username == username)
+    if date_from:
+        criteria.append(Reservation.start_time >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        criteria.append(Reservation.start_time < datetime.combine(date_to, datetime.min.time()) + timedelta(days=1))
+    return criteria
+
+
+def load_reservation_intervals(room_ids, range_start, range_end):
+    """
+    查询多个会议室与指定范围重叠的预订，供占用情况缓存填充使用
+    参数:
+        room_ids (list): 会议室ID列表
+        range_start (datetime): 范围开始时间
+        range_end (datetime): 范围结束时间
+    返回:
+        list: (会议室ID, 预订ID, 开始时间, 结束时间) 元组列表
+    """
+    return db.session.query(
+        Reservation.room_id, Reservation.id, Reservation.start_time, Reservation.end_time
+    ).filter(
+        Reservation.room_id.in_(room_ids),
+        Reservation.end_time > range_start,
+        Reservation.start_time < range_end
+    ).all()
+
+
+# 串行化预订事务的统计数据（重试次数、等待锁的时间等）
+booking_stats = BookingStats()
+
+
+# 会议室列表缓存中保存的会议室信息，与数据库会话无关，可以在多个请求间复用
+RoomSnapshot = namedtuple(
+    'RoomSnapshot', ['id', 'name', 'capacity', 'total_slots', 'max_reservations', 'description'])
+
+
+def load_room_snapshots():
+    """
+    查询所有会议室，供会议室列表缓存使用
+    返回:
+        list: 按ID排序的 RoomSnapshot 列表
+    """
+    rows = db.session.query(
+        Room.id, Room.name, Room.capacity, Room.total_slots, Room.max_reservations, Room.description
+    ).order_by(Room.id).all()
+    return [RoomSnapshot(*row) for row in rows]
+
+
+def load_user_identity(user_id):
+    """
+    查询用户身份，供登录用户缓存使用
+    参数:
+        user_id (int): 用户ID
+    返回:
+        CachedUser: 用户身份，用户不存在时返回 None
+    """
+    row = db.session.query(User.id, User.username, User.is_admin).filter(
+        User.id == user_id).first()
+    return CachedUser(*row) if row else None
+
+
+def check_room_availability(room_id, start_time, end_time, exclude_reservation_id=None, use_cache=True):
+    """
+    检查会议室在指定时间段内的可用性
+    返回 (是否可用, 原因)
+    参数:
+        room_id (int): 会议室ID
+        start_time (datetime): 开始时间
+        end_time (datetime): 结束时间
+        exclude_reservation_id (int, optional): 要排除的预订ID（用于编辑预订时）
+        use_cache (bool): 是否使用占用情况缓存，在串行化事务内检查时应为 False，直接查询数据库
+    返回:
+        tuple: (bool, str) 是否可用及原因
+    """
+    # 添加缓冲时间
+    check_start, check_end = buffered_window(start_time, end_time)
+
+    # 获取房间信息
+    room = db.session.get(Room, room_id)
+    if not room:
+        return False, "会议室不存在"
+
+    # 获取该时间段内的所有预订，如果是编辑预订，排除当前预订
+    if use_cache:
+        existing_reservations = occupancy_cache.intervals(
+            room.id, check_start, check_end, exclude_reservation_id)
+    else:
+        existing_reservations = [
+            (start, end)
+            for _, reservation_id, start, end in load_reservation_intervals([room.id], check_start, check_end)
+            if reservation_id != exclude_reservation_id
+        ]
+
+    # 扫描线计算并发预订数首次达到总槽位数的时间
+    overbooked_time = first_overbooked_time(
+        existing_reservations, check_start, check_end, room.total_slots)
+    if overbooked_time is not None:
+        formatted_time = overbooked_time.strftime('%Y-%m-%d %H:%M')
+        return False, f"时间段 {formatted_time} 已达到最大预订数量"
+
+    return True, "可以预订"
+
+
+def check_room_availability_batch(candidates, use_cache=True):
+    """
+    批量检查多个 (会议室, 时间段) 候选的可用性
+    与 check_room_availability 使用相同的缓冲时间和判断规则，
+    但所有会议室只查询一次，每个会议室的预订按其候选的总时间范围从占用情况缓存获取，
+    相距超过 MAX_AVAILABILITY_SPAN_DAYS 天的候选分组获取。
+    参数:
+        candidates (list): (room_id, start_time, end_time) 元组列表
+        use_cache (bool): 是否使用占用情况缓存，在串行化事务内检查时应为 False，直接查询数据库
+    返回:
+        list: 与 candidates 一一对应的 (是否可用, 原因, 冲突时间) 元组，冲突时间为 datetime 或 None
+    """
+    results = [None] * len(candidates)
+    room_ids = {room_id for room_id, _, _ in candidates}
+    rooms = {room.id: room for room in Room.query.filter(Room.id.in_(room_ids))}
+
+    # 按会议室分组，记录每个候选的检查区间和在结果中的位置
+    windows_by_room = {}
+    for index, (room_id, start_time, end_time) in enumerate(candidates):
+        if room_id not in rooms:
+            results[index] = (False, "会议室不存在", None)
+            continue
+        if start_time >= end_time:
+            results[index] = (False, "开始时间必须早于结束时间", None)
+            continue
+        windows_by_room.setdefault(room_id, []).append(
+            (index, buffered_window(start_time, end_time)))
+
+    # 同一会议室的候选按开始时间分组，每组的总范围不超过 MAX_AVAILABILITY_SPAN_DAYS 天，
+    # 相距很远的候选分别取预订，取出的 (会议室, 日期) 条目数不随候选之间的距离增长
+    max_span = timedelta(days=MAX_AVAILABILITY_SPAN_DAYS)
+    groups = []
+    for room_id, indexed_windows in windows_by_room.items():
+        indexed_windows.sort(key=lambda item: item[1])
+        for item in indexed_windows:
+            group_room_id, group = groups[-1] if groups else (None, None)
+            if group_room_id == room_id and item[1][1] - group[0][1][0] <= max_span:
+                group.append(item)
+            else:
+                groups.append((room_id, [item]))
+
+    for room_id, indexed_windows in groups:
+        windows = [window for _, window in indexed_windows]
+        range_start = min(window_start for window_start, _ in windows)
+        range_end = max(window_end for _, window_end in windows)
+        if use_cache:
+            existing_reservations = occupancy_cache.intervals(
+                room_id, range_start, range_end)
+        else:
+            existing_reservations = [
+                (start, end) for _, _, start, end
+                in load_reservation_intervals([room_id], range_start, range_end)]
+        overbooked_times = first_overbooked_times(
+            existing_reservations, windows, rooms[room_id].total_slots)
+        for (index, _), overbooked_time in zip(indexed_windows, overbooked_times):
+            if overbooked_time is None:
+                results[index] = (True, "可以预订", None)
+            else:
+                formatted_time = overbooked_time.strftime('%Y-%m-%d %H:%M')
+                results[index] = (
+                    False, f"时间段 {formatted_time} 已达到最大预订数量", overbooked_time)
+
+    return results
+
+
+def check_reservation_quota(room, user, count=1):
+    """
+    检查新建 count 个预订是否会超过预订数量限制
+    在串行化事务中调用时，检查结果和随后的写入不会被其他工作进程打断。
+    参数:
+        room (RoomSnapshot 或 Room): 会议室
+        user (User 或 CachedUser): 预订的用户
+        count (int): 要新建的预订数量，周期性预订为系列中的预订次数
+    返回:
+        str: 超过限制时返回原因，否则返回 None
+    """
+    if get_reservation_count('total') + count > MAX_TOTAL_MEETINGS:
+        return f'已达到会议总数限制（{MAX_TOTAL_MEETINGS}个）。请稍后再试。'
+    if current_app.config['MAX_RESERVATIONS_PER_USER'] and not user.is_admin:
+        limit = current_app.config['MAX_RESERVATIONS_PER_USER']
+        if get_reservation_count('user', user.id) + count > limit:
+            return f'您已达到最大预订数量（{limit}个）。请取消一些预订后再试。'
+    if current_app.config['ENFORCE_ROOM_QUOTA'] and room.max_reservations:
+        if get_reservation_count('room', room.id) + count > room.max_reservations:
+            return f'该会议室已达到最大预订数量（{room.max_reservations}个）'
+    return None
+
+
+def format_occurrences(conflicts, limit=5):
+    """
+    把周期性预订中冲突的各次预订格式化为提示信息
+    参数:
+        conflicts (list): (开始时间, 结束时间, 原因) 元组列表
+        limit (int): 最多列出的预订次数
+    返回:
+        str: 提示信息
+    """
+    listed = '、'.join(start.strftime('%Y-%m-%d %H:%M') for start, _, _ in conflicts[:limit])
+    more = ' 等' if len(conflicts) > limit else ''
+    return f'以下 {len(conflicts)} 次预订与已有预订冲突: {listed}{more}'
+
+
+def book_reservation_series(room, user, rule, details, skip_conflicts=False):
+    """
+    在一个串行化事务中检查并批量写入周期性预订系列
+    所有预订次数与系列时间范围内的已有预订一次性比较（每个会议室只查询一次），然后用一条 INSERT 批量写入，
+    并调整预订数量计数器。
+    参数:
+        room (Room): 会议室
+        user (User 或 CachedUser): 预订的用户
+        rule (dict): 重复规则，包含 start_time、end_time、frequency、count 和 interval
+        details (dict): 每次预订共用的字段，包含 title、purpose 和 attendees
+        skip_conflicts (bool): 为 True 时跳过冲突的预订次数只预订其余的，否则有冲突时全部不预订
+    返回:
+        tuple: (系列ID, 已预订的 (开始时间, 结束时间) 列表, 冲突的 (开始时间, 结束时间, 原因) 列表)
+    异常:
+        BookingConflict: 有冲突且 skip_conflicts 为 False、所有次数都冲突，或超过预订数量限制
+    """
+    occurrences = expand_occurrences(
+        rule['start_time'], rule['end_time'], rule['frequency'], rule['count'], rule['interval'])
+
+    def create_series():
+        # 持有写锁时直接查询数据库检查所有预订次数
+        results = check_room_availability_batch(
+            [(room.id, start, end) for start, end in occurrences], use_cache=False)
+        booked, conflicts = [], []
+        for (start, end), (is_available, message, _) in zip(occurrences, results):
+            if is_available:
+                booked.append((start, end))
+            else:
+                conflicts.append((start, end, message))
+        if conflicts and (not skip_conflicts or not booked):
+            raise BookingConflict(format_occurrences(conflicts))
+        quota_message = check_reservation_quota(room, user, len(booked))
+        if quota_message:
+            raise BookingConflict(quota_message)
+
+        series = ReservationSeries(
+            room_id=room.id, user_id=user.id, title=details['title'],
+            frequency=rule['frequency'], repeat_interval=rule['interval'],
+            occurrences=len(occurrences))
+        db.session.add(series)
+        db.session.flush()
+        created_at = datetime.now()
+        db.session.execute(insert(Reservation), [
+            dict(details, room_id=room.id, user_id=user.id, start_time=start, end_time=end,
+                 series_id=series.id, created_at=created_at)
+            for start, end in booked
+        ])
+        record_reservation_changes([(room.id, user.id, len(booked))])
+        return series.id, booked, conflicts
+
+    return run_serialized(db.session, Room, room.id, create_series, booking_stats)
+
+
+def runtime_samples():
+    """
+    当前工作进程的缓存和预订事务统计，写入指标快照时调用，汇总时各工作进程的值相加
+    返回:
+        list: (指标名, 说明, 类型, 标签字典, 值) 元组列表
+    """
+    samples = []
+    for name, cache in (('occupancy', occupancy_cache), ('room_list', room_list_cache), ('user', user_cache)):
+        stats = cache.stats()
+        for field, label in (('hits', '命中'), ('misses', '未命中'), ('evictions', '淘汰'),
+                             ('expirations', '过期'), ('invalidations', '失效')):
+            if field in stats:
+                samples.append((f'cache_{field}_total', f'缓存{label}次数', 'counter', {'cache': name}, stats[field]))
+        if 'entries' in stats:
+            samples.append(('cache_entries', '缓存条目数（所有工作进程之和）', 'gauge', {'cache': name}, stats['entries']))
+    booking = booking_stats.stats()
+    samples += [
+        ('booking_transactions_total', '串行化预订事务数', 'counter', {}, booking['transactions']),
+        ('booking_conflicts_total', '因冲突或数量限制失败的预订事务数', 'counter', {}, booking['conflicts']),
+        ('booking_retries_total', '预订事务的重试次数', 'counter', {}, booking['retries']),
+        ('booking_lock_failures_total', '等待写锁超时的预订事务数', 'counter', {}, booking['lock_failures']),
+        ('booking_lock_wait_seconds_total', '预订事务等待写锁的总时间（秒）', 'counter', {}, booking['lock_wait_total']),
+    ]
+    return samples
+
+
+def load_basic_auth_admin():
+    """
+    用 HTTP Basic 认证信息加载管理员，供不能通过登录页面登录的监控系统（如 Prometheus）使用
+    返回:
+        User: 用户名和密码正确且是管理员时返回用户，否则返回 None
+    """
+    auth = request.authorization
+    if auth is None or auth.type != 'basic' or not auth.username:
+        return None
+    user = User.query.filter_by(username=auth.username).first()
+    if user and user.is_admin and user.check_password(auth.password or ''):
+        return user
+    return None
+
+
+def calendar_token(scope, scope_id):
+    """
+    生成日历订阅链接的令牌，日历客户端无法登录，通过链接中的令牌访问订阅
+    参数:
+        scope (str): 'room' 或 'user'
+        scope_id (int): 会议室ID或用户ID
+    返回:
+        str: 签名后的令牌
+    """
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='calendar').dumps([scope, scope_id])
+
+
+def check_calendar_token(token, scope, scope_id):
+    """
+    验证日历订阅链接的令牌
+    参数:
+        token (str): 链接中的令牌
+        scope (str): 'room' 或 'user'
+        scope_id (int): 会议室ID或用户ID
+    返回:
+        bool: 令牌是否有效且属于该会议室或用户
+    """
+    if not token:
+        return False
+    try:
+        return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='calendar').loads(token) == [scope, scope_id]
+    except BadSignature:
+        return False
+
+
+def renamed_version_keys(scope, scope_id):
+    """
+    返回会议室或用户改名后需要递增的变更版本
+    会议室日历的描述中有预订人的用户名，用户日历的地点是会议室名称，
+    只递增自身的版本时，有相关预订的另一类日历订阅会一直返回 304。
+    参数:
+        scope (str): 'room' 或 'user'
+        scope_id (int): 会议室ID或用户ID
+    返回:
+        list: 自身以及与它有预订关系的另一类订阅的 (范围, ID) 元组列表
+    """
+    if scope == 'room':
+        other, column, owner = 'user', Reservation.user_id, Reservation.room_id
+    else:
+        other, column, owner = 'room', Reservation.room_id, Reservation.user_id
+    related = db.session.query(column).filter(owner == scope_id).distinct()
+    return [(scope, scope_id)] + [(other, other_id) for (other_id,) in related]
+
+
+def _http_time(value):
+    # 不带时区的本地时间转换为 UTC，Werkzeug 会把不带时区的时间当作 UTC
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def not_modified(etag, last_modified):
+    """
+    处理条件请求，内容未变化时返回 304 响应
+    If-None-Match 优先于 If-Modified-Since，与 RFC 9110 一致。
+    参数:
+        etag (str): 当前内容的 ETag（不含引号）
+        last_modified (datetime): 当前内容的最后修改时间（本地时间）
+    返回:
+        flask.Response: 内容未变化时返回 304 响应，否则返回 None
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains(etag)
+    elif request.if_modified_since:
+        matched = _http_time(last_modified) <= request.if_modified_since
+    else:
+        matched = False
+    if not matched:
+        return None
+    return set_validators(Response(status=304), etag, last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    """
+    设置 ETag、Last-Modified 和 Cache-Control 响应头，要求客户端每次使用前重新验证
+    参数:
+        response (flask.Response): 响应对象
+        etag (str): 内容的 ETag（不含引号）
+        last_modified (datetime): 内容的最后修改时间（本地时间）
+    返回:
+        flask.Response: 传入的响应对象
+    """
+    response.set_etag(etag)
+    response.last_modified = _http_time(last_modified)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional_get(page, time_bucket=None):
+    """
+    根据全局变更版本为 GET 请求生成强 ETag 和 Last-Modified，内容未变化时返回 304 的装饰器
+    每个写操作都会在同一个事务中递增全局版本，因此 ETag 由页面名称、全局版本和当前用户组成
+    （页面的导航栏随用户变化，用户修改也会递增全局版本）；同一 URL 的查询参数不同时浏览器会分别缓存。
+    有待显示的提示信息（flash）时不使用条件请求，因为提示信息只显示一次，不属于页面数据。
+    参数:
+        page (str): 页面名称，用于区分 ETag
+        time_bucket (int, optional): 内容随时间变化的页面按多少秒分段，ETag 包含当前分段
+    返回:
+        callable: 装饰器，应放在 login_required 之后
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or '_flashes' in session:
+                return view(*args, **kwargs)
+            version, updated_at = get_change_version('global')
+            user_id = current_user.id if current_user.is_authenticated else 0
+            etag = f'{page}-{version}-{user_id}'
+            last_modified = updated_at or datetime(2000, 1, 1)
+            if time_bucket:
+                bucket = int(datetime.now().timestamp()) // time_bucket
+                etag = f'{etag}-{bucket}'
+                last_modified = max(last_modified, datetime.fromtimestamp(bucket * time_bucket))
+            response = not_modified(etag, last_modified)
+            if response is not None:
+                return response
+            response = make_response(view(*args, **kwargs))
+            # 视图中可能产生了提示信息或重定向，这些响应不设置 ETag
+            if response.status_code == 200 and '_flashes' not in session:
+                set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    """
+    根据用户ID加载用户
+    返回登录用户缓存中的只读身份（CachedUser），需要修改用户数据时应从数据库重新加载 User 对象
+    """
+    return user_cache.get(int(user_id))
+
+# 路由定义
+
+
+@bp.route('/')
+def index():
+    """
+    渲染首页模板
+    """
+    return render_template('index.html')
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """
+    用户登录的路由。
+    该函数执行以下操作：
+    1. 如果请求方法为POST，获取并验证表单数据。
+    2. 根据用户名查询用户信息。
+    3. 检查用户是否存在以及密码是否正确。
+    4. 如果验证通过，登录用户并重定向到仪表盘。
+    5. 如果验证失败，显示错误消息。
+    返回:
+        werkzeug.wrappers.Response: 渲染登录页面或重定向到仪表盘的响应对象。
+    """
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        user = User.query.filter_by(username=username).first()
+
+        if user and user.check_password(password):
+            login_user(user)
+            return redirect(url_for('main.dashboard'))
+        flash('用户名或密码错误')
+    return render_template('login.html')
+
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    """
+    用户注册的路由。
+    该函数执行以下操作：
+    1. 如果请求方法为POST，获取并验证表单数据。
+    2. 检查用户名、密码和确认密码是否为空。
+    3. 检查两次输入的密码是否一致。
+    4. 检查用户名是否已存在。
+    5. 创建新用户并提交数据库会话。
+    6. 显示注册成功的消息并重定向到登录页面。
+    返回:
+        werkzeug.wrappers.Response: 渲染注册页面或重定向到登录页面的响应对象。
+    """
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        confirm_password = request.form.get('confirm_password')
+
+        # 验证用户输入
+        if not username or not password or not confirm_password:
+            flash('请填写所有必填字段')
+            return render_template('register.html')
+        if password != confirm_password:
+            flash('两次输入的密码不一致')
+            return render_template('register.html')
+
+        # 检查用户名是否已存在
+        existing_user = User.query.filter_by(username=username).first()
+        if existing_user:
+            flash('用户名已存在，请选择其他用户名')
+            return render_template('register.html')
+
+        # 创建新用户
+        new_user = User(
+            username=username,
+            password=password,
+            is_admin=False
+        )
+        db.session.add(new_user)
+        touch_change_versions()
+        db.session.commit()
+
+        flash('注册成功！请登录')
+        return redirect(url_for('main.login'))
+
+    return render_template('register.html')
+
+
+@bp.route('/dashboard')
+@login_required
+@conditional_get('dashboard', time_bucket=DASHBOARD_ETAG_SECONDS)
+def dashboard():
+    """
+    仪表盘视图函数。
+    该函数从会议室列表缓存中获取所有会议室，并计算剩余的会议次数。
+    当前用户的预订用一条查询获取，同时 JOIN 加载会议室，只包含未来 DASHBOARD_DAYS 天内
+    尚未结束的预订，最多 DASHBOARD_RESERVATION_LIMIT 条。
+    然后将这些数据传递给'dashboard.html'模板进行渲染。
+    返回:
+        渲染后的HTML页面，包含会议室信息、当前用户的预订和剩余会议次数。
+    """
+    rooms = room_list_cache.get()
+    remaining_meetings = MAX_TOTAL_MEETINGS - get_reservation_count('total')
+    now = datetime.now()
+    my_reservations = Reservation.query.options(joinedload(Reservation.room)).filter(
+        Reservation.user_id == current_user.id,
+        Reservation.end_time > now,
+        Reservation.start_time < now + timedelta(days=DASHBOARD_DAYS)
+    ).order_by(Reservation.start_time).limit(DASHBOARD_RESERVATION_LIMIT).all()
+    # 日历订阅链接包含令牌，日历客户端不需要登录
+    calendar_urls = {
+        room.id: url_for('main.room_calendar', id=room.id, token=calendar_token('room', room.id), _external=True)
+        for room in rooms
+    }
+    user_calendar_url = url_for('main.user_calendar', id=current_user.id,
+                                token=calendar_token('user', current_user.id), _external=True)
+    return render_template('dashboard.html', rooms=rooms, remaining_meetings=remaining_meetings,
+                           my_reservations=my_reservations, dashboard_days=DASHBOARD_DAYS,
+                           reservation_limit=DASHBOARD_RESERVATION_LIMIT,
+                           calendar_urls=calendar_urls, user_calendar_url=user_calendar_url)
+
+
+@bp.route('/room/add', methods=['GET', 'POST'])
+@login_required
+def add_room():
+    """
+    添加会议室的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 如果请求方法为POST，获取并验证表单数据。
+    3. 创建新会议室并提交数据库会话。
+    4. 显示会议室添加成功的消息并重定向到仪表盘。
+    返回:
+        werkzeug.wrappers.Response: 渲染添加会议室页面或重定向到仪表盘的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+
+    if request.method == 'POST':
+        name = request.form.get('name')
+        capacity = int(request.form.get('capacity'))
+        total_slots = int(request.form.get('total_slots'))
+        description = request.form.get('description', '')
+
+        room = Room(
+            name=name,
+            capacity=capacity,
+            total_slots=total_slots,
+            description=description
+        )
+        db.session.add(room)
+        touch_change_versions()
+        db.session.commit()
+        room_list_cache.invalidate()
+        flash('会议室添加成功')
+        return redirect(url_for('main.dashboard'))
+
+    return render_template('add_room.html')
+
+
+@bp.route('/room/edit/<int:id>', methods=['GET', 'POST'])
+@login_required
+def edit_room(id):
+    """
+    编辑会议室信息的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 根据会议室ID获取会议室信息，如果会议室不存在则返回404错误。
+    3. 如果请求方法为GET，渲染编辑会议室页面并传递会议室信息。
+    4. 如果请求方法为POST，获取并验证表单数据。
+    5. 更新会议室信息并提交数据库会话。
+    6. 显示会议室信息更新成功的消息并重定向到仪表盘。
+    返回:
+        werkzeug.wrappers.Response: 渲染编辑会议室页面或重定向到仪表盘的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+
+    room = Room.query.get_or_404(id)
+
+    if request.method == 'POST':
+        name = request.form.get('name')
+        # 改名时用户日历中这个会议室的预订的地点也会变化
+        keys = renamed_version_keys('room', room.id) if name != room.name else [('room', room.id)]
+        room.name = name
+        room.capacity = int(request.form.get('capacity'))
+        room.total_slots = int(request.form.get('total_slots'))
+        room.description = request.form.get('description', '')
+
+        touch_change_versions(keys)
+        db.session.commit()
+        room_list_cache.invalidate()
+        flash('会议室信息已更新')
+        return redirect(url_for('main.dashboard'))
+
+    return render_template('edit_room.html', room=room)
+
+
+@bp.route('/room/delete/<int:id>')
+@login_required
+def delete_room(id):
+    """
+    删除会议室的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 根据会议室ID获取会议室信息，如果会议室不存在则返回404错误。
+    3. 删除会议室并提交数据库会话。
+    4. 显示会议室删除成功的消息并重定向到仪表盘。
+    返回:
+        werkzeug.wrappers.Response: 重定向到仪表盘的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+    room = Room.query.get_or_404(id)
+    db.session.delete(room)
+    db.session.query(ReservationCounter).filter_by(scope='room', scope_id=id).delete()
+    ReservationSeries.query.filter_by(room_id=id).delete()
+    touch_change_versions([('room', id)])
+    db.session.commit()
+    occupancy_cache.invalidate_all()
+    room_list_cache.invalidate()
+    flash('会议室已删除')
+    return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/reservation/new', methods=['GET', 'POST'])
+@login_required
+@conditional_get('new_reservation')
+def new_reservation():
+    """
+    创建新预订的路由。
+    该函数执行以下操作：
+    1. 如果请求方法为POST，获取并验证表单数据。
+    2. 检查开始时间和结束时间的合理性。
+    3. 检查会议总数限制。
+    4. 检查会议室是否存在，参会人数是否超过会议室容量。
+    5. 检查用户的预订数量限制。
+    6. 检查会议室在指定时间段内是否可用。
+    7. 创建新预订并提交数据库会话。
+    8. 显示预订成功的消息并重定向到仪表盘。
+    如果表单中选择了重复频率，则按规则创建周期性预订系列，所有预订次数在一个事务中检查并批量写入，
+    冲突的预订次数会在提示信息中列出。
+    返回:
+        werkzeug.wrappers.Response: 渲染新预订页面或重定向到仪表盘的响应对象。
+    """
+    if request.method == 'POST':
+        room_id = request.form.get('room_id')
+        title = request.form.get('title')
+        start_time = datetime.strptime(
+            request.form.get('start_time'), '%Y-%m-%dT%H:%M')
+        end_time = datetime.strptime(
+            request.form.get('end_time'), '%Y-%m-%dT%H:%M')
+        purpose = request.form.get('purpose', '')
+        attendees = request.form.get('attendees')
+        attendees = int(attendees) if attendees else 1
+
+        # 基本验证
+        if start_time >= end_time:
+            flash('开始时间必须早于结束时间')
+            return redirect(url_for('main.new_reservation'))
+
+        current_time = datetime.now()
+        if start_time < current_time - timedelta(minutes=2):
+            flash('开始时间不能早于当前时间2分钟以上')
+            return redirect(url_for('main.new_reservation'))
+
+        # 检查会议室容量
+        room = db.session.get(Room, room_id)
+        if not room:
+            flash('会议室不存在')
+            return redirect(url_for('main.new_reservation'))
+        if attendees > room.capacity:
+            flash(f'参会人数超过会议室容量（最大容量：{room.capacity}人）')
+            return redirect(url_for('main.new_reservation'))
+        room_id = room.id
+
+        # 周期性预订: 展开规则后在一个事务中检查所有预订次数并批量写入
+        frequency = request.form.get('frequency', '')
+        if frequency:
+            rule = {
+                'start_time': start_time,
+                'end_time': end_time,
+                'frequency': frequency,
+                'count': request.form.get('count', 0, type=int),
+                'interval': request.form.get('repeat_interval', 1, type=int),
+            }
+            rule_message = validate_rule(buffer_minutes=BUFFER_MINUTES, **rule)
+            if rule_message:
+                flash(rule_message)
+                return redirect(url_for('main.new_reservation'))
+            details = {'title': title, 'purpose': purpose, 'attendees': attendees}
+            try:
+                _, booked, conflicts = book_reservation_series(
+                    room, current_user._get_current_object(), rule, details,
+                    skip_conflicts=request.form.get('skip_conflicts') == 'on')
+            except BookingConflict as conflict:
+                flash(conflict.message)
+                return redirect(url_for('main.new_reservation'))
+            except Exception:
+                flash('预订失败，请重试')
+                return redirect(url_for('main.new_reservation'))
+            occupancy_cache.invalidate(room_id, booked[0][0], booked[-1][1])
+            flash(f'已预订 {len(booked)} 次会议')
+            if conflicts:
+                flash(format_occurrences(conflicts) + '，已跳过')
+            return redirect(url_for('main.dashboard'))
+
+        # 检查会议总数、用户和会议室的预订数量限制（读取计数器，不扫描预订表）
+        quota_message = check_reservation_quota(room, current_user)
+        if quota_message:
+            flash(quota_message)
+            return redirect(url_for('main.new_reservation'))
+
+        # 使用缓存快速检查，明显不可用时不必获取写锁
+        is_available, message = check_room_availability(
+            room_id, start_time, end_time)
+        if not is_available:
+            flash(message)
+            return redirect(url_for('main.new_reservation'))
+
+        user = current_user._get_current_object()
+        user_id = user.id
+
+        def create_reservation():
+            # 持有写锁时再检查一次数量限制和可用性，防止其他工作进程同时预订
+            quota_message = check_reservation_quota(room, user)
+            if quota_message:
+                raise BookingConflict(quota_message)
+            is_available, message = check_room_availability(
+                room_id, start_time, end_time, use_cache=False)
+            if not is_available:
+                raise BookingConflict(message)
+            db.session.add(Reservation(
+                room_id=room_id,
+                user_id=user_id,
+                title=title,
+                start_time=start_time,
+                end_time=end_time,
+                purpose=purpose,
+                attendees=attendees
+            ))
+            record_reservation_changes([(room_id, user_id, 1)])
+
+        # 创建预订（检查和写入在同一个串行化事务中完成）
+        try:
+            run_serialized(db.session, Room, room_id, create_reservation, booking_stats)
+        except BookingConflict as conflict:
+            flash(conflict.message)
+            return redirect(url_for('main.new_reservation'))
+        except Exception:
+            flash('预订失败，请重试')
+            return redirect(url_for('main.new_reservation'))
+        occupancy_cache.invalidate(room_id, start_time, end_time)
+        flash('预订成功')
+        return redirect(url_for('main.dashboard'))
+
+    rooms = room_list_cache.get()
+    return render_template('new_reservation.html', rooms=rooms)
+
+
+@bp.route('/reservation/cancel/<int:id>')
+@login_required
+def cancel_reservation(id):
+    """
+    取消预订的路由。
+    该函数执行以下操作：
+    1. 根据预订ID获取预订信息，如果预订不存在则返回404错误。
+    2. 检查当前用户是否有权限取消此预订（预订的用户或管理员）。
+    3. 如果有权限，在串行化事务中删除预订并调整预订数量计数器，多次重试后仍无法获取写锁时提示取消失败。
+    4. 显示预订取消成功的消息并重定向到仪表盘。
+    返回:
+        werkzeug.wrappers.Response: 重定向到仪表盘的响应对象。
+    """
+    reservation = Reservation.query.get_or_404(id)
+    if reservation.user_id == current_user.id or current_user.is_admin:
+        room_id, start_time, end_time = reservation.room_id, reservation.start_time, reservation.end_time
+        # 删除和计数器调整在同一个串行化事务中完成
+        try:
+            run_serialized(db.session, Room, room_id,
+                           lambda: delete_reservations(Reservation.id == id), booking_stats)
+        except (BookingConflict, OperationalError):
+            # 多次重试后仍无法获取写锁
+            flash('取消失败，请重试')
+            return redirect(url_for('main.dashboard'))
+        occupancy_cache.invalidate(room_id, start_time, end_time)
+        flash('预订已成功取消')
+    else:
+        flash('您没有权限取消此预订')
+    return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/reservation/edit/<int:id>', methods=['GET', 'POST'])
+@login_required
+def edit_reservation(id):
+    """
+    编辑预订的路由。
+    该函数执行以下操作：
+    1. 根据预订ID获取预订信息，如果预订不存在则返回404错误。
+    2. 检查当前用户是否有权限编辑此预订（预订的用户或管理员）。
+    3. 如果请求方法为GET，查询所有会议室信息并渲染编辑预订页面。
+    4. 如果请求方法为POST，获取并验证表单数据。
+    5. 检查会议室是否存在，参会人数是否超过会议室容量。
+    6. 验证开始时间和结束时间的合理性。
+    7. 检查会议室在指定时间段内是否可用（排除当前预订）。
+    8. 更新预订信息并提交数据库会话。
+    9. 显示预订更新成功的消息并重定向到仪表盘。
+    返回:
+        werkzeug.wrappers.Response: 渲染编辑预订页面或重定向到仪表盘的响应对象。
+    """
+    reservation = Reservation.query.get_or_404(id)
+
+    # 检查当前用户是否有权限编辑此预订
+    if not (reservation.user_id == current_user.id or current_user.is_admin):
+        flash('您没有权限编辑此预订')
+        return redirect(url_for('main.dashboard'))
+
+    if request.method == 'GET':
+        rooms = room_list_cache.get()
+        return render_template('edit_reservation.html', reservation=reservation, rooms=rooms)
+
+    if request.method == 'POST':
+        title = request.form.get('title')
+        start_time = datetime.strptime(
+            request.form.get('start_time'), '%Y-%m-%dT%H:%M')
+        end_time = datetime.strptime(
+            request.form.get('end_time'), '%Y-%m-%dT%H:%M')
+        purpose = request.form.get('purpose', '')
+        room_id = request.form.get('room_id')
+        attendees = request.form.get('attendees')
+        attendees = int(attendees) if attendees else 1
+
+        room = db.session.get(Room, room_id)
+        if not room:
+            flash('会议室不存在')
+            return redirect(url_for('main.edit_reservation', id=id))
+
+        if attendees > room.capacity:
+            flash(f'参会人数超过会议室容量（最大容量：{room.capacity}人）')
+            return redirect(url_for('main.edit_reservation', id=id))
+
+        # 验证开始时间不能晚于结束时间
+        if start_time >= end_time:
+            flash('开始时间必须早于结束时间')
+            return redirect(url_for('main.edit_reservation', id=id))
+
+        # 验证开始时间不能早于当前时间太多
+        current_time = datetime.now()
+        if start_time < current_time - timedelta(minutes=2):
+            flash('开始时间不能早于当前时间2分钟以上')
+            return redirect(url_for('main.edit_reservation', id=id))
+
+        # 检查会议室是否可用（包含10分钟准备时间，排除当前预订）
+        room_id = room.id
+        is_available, message = check_room_availability(
+            room_id,
+            start_time,
+            end_time,
+            exclude_reservation_id=id
+        )
+        if not is_available:
+            flash(message)
+            return redirect(url_for('main.edit_reservation', id=id))
+
+        old_room_id, old_start_time, old_end_time = \
+            reservation.room_id, reservation.start_time, reservation.end_time
+
+        def update_reservation():
+            # 持有写锁时直接查询数据库再检查一次
+            is_available, message = check_room_availability(
+                room_id, start_time, end_time, exclude_reservation_id=id, use_cache=False)
+            if not is_available:
+                raise BookingConflict(message)
+            # 更新预订信息，更换会议室时把预订数量从原会议室移到新会议室
+            record_reservation_changes([(old_room_id, reservation.user_id, -1),
+                                        (room_id, reservation.user_id, 1)])
+            reservation.title = title
+            reservation.room_id = room_id
+            reservation.start_time = start_time
+            reservation.end_time = end_time
+            reservation.purpose = purpose
+            reservation.attendees = attendees
+
+        try:
+            run_serialized(db.session, Room, room_id, update_reservation, booking_stats)
+        except BookingConflict as conflict:
+            flash(conflict.message)
+            return redirect(url_for('main.edit_reservation', id=id))
+        except Exception:
+            flash('更新失败，请重试')
+            return redirect(url_for('main.edit_reservation', id=id))
+        occupancy_cache.invalidate(old_room_id, old_start_time, old_end_time)
+        occupancy_cache.invalidate(room_id, start_time, end_time)
+        flash('预订已更新')
+        return redirect(url_for('main.dashboard'))
+
+    return render_template('edit_reservation.html', reservation=reservation, rooms=rooms)
+
+
+@bp.route('/reservation/series/edit/<int:id>', methods=['GET', 'POST'])
+@login_required
+def edit_series(id):
+    """
+    编辑周期性预订系列的路由。
+    该函数执行以下操作：
+    1. 根据系列ID获取系列信息，如果系列不存在则返回404错误。
+    2. 检查当前用户是否有权限编辑此系列（创建系列的用户或管理员）。
+    3. 如果请求方法为GET，渲染编辑系列页面。
+    4. 如果请求方法为POST，获取并验证表单数据，检查参会人数是否超过会议室容量。
+    5. 用一条 UPDATE 语句更新系列中所有尚未结束的预订的标题、用途和参会人数。
+    6. 显示系列更新成功的消息并重定向到仪表盘。
+    返回:
+        werkzeug.wrappers.Response: 渲染编辑系列页面或重定向到仪表盘的响应对象。
+    """
+    series = ReservationSeries.query.get_or_404(id)
+    if not (series.user_id == current_user.id or current_user.is_admin):
+        flash('您没有权限编辑此系列')
+        return redirect(url_for('main.dashboard'))
+
+    room = db.session.get(Room, series.room_id)
+    upcoming = Reservation.query.filter(
+        Reservation.series_id == id, Reservation.end_time > datetime.now()
+    ).order_by(Reservation.start_time).all()
+
+    if request.method == 'POST':
+        title = request.form.get('title')
+        purpose = request.form.get('purpose', '')
+        attendees = request.form.get('attendees')
+        attendees = int(attendees) if attendees else 1
+
+        if not title:
+            flash('请填写会议标题')
+            return redirect(url_for('main.edit_series', id=id))
+        if attendees > room.capacity:
+            flash(f'参会人数超过会议室容量（最大容量：{room.capacity}人）')
+            return redirect(url_for('main.edit_series', id=id))
+
+        # 只修改标题、用途和参会人数，不影响可用性，因此不需要重新检查冲突
+        updated = Reservation.query.filter(
+            Reservation.series_id == id, Reservation.end_time > datetime.now()
+        ).update({'title': title, 'purpose': purpose, 'attendees': attendees},
+                 synchronize_session=False)
+        series.title = title
+        # 预订数量不变，只递增会议室和用户的变更版本，让仪表盘和日历订阅的 ETag 失效
+        touch_change_versions([('room', series.room_id), ('user', series.user_id)])
+        db.session.commit()
+        flash(f'已更新系列中的 {updated} 次预订')
+        return redirect(url_for('main.dashboard'))
+
+    return render_template('edit_series.html', series=series, room=room, upcoming=upcoming)
+
+
+@bp.route('/reservation/series/cancel/<int:id>')
+@login_required
+def cancel_series(id):
+    """
+    取消周期性预订系列的路由。
+    该函数执行以下操作：
+    1. 根据系列ID获取系列信息，如果系列不存在则返回404错误。
+    2. 检查当前用户是否有权限取消此系列（创建系列的用户或管理员）。
+    3. 用一条 DELETE 语句删除系列中的所有预订，调整预订数量计数器并删除系列，在同一个事务中完成；
+       多次重试后仍无法获取写锁时提示取消失败。
+    4. 显示系列取消成功的消息并重定向到仪表盘。
+    返回:
+        werkzeug.wrappers.Response: 重定向到仪表盘的响应对象。
+    """
+    series = ReservationSeries.query.get_or_404(id)
+    if not (series.user_id == current_user.id or current_user.is_admin):
+        flash('您没有权限取消此系列')
+        return redirect(url_for('main.dashboard'))
+
+    room_id = series.room_id
+
+    def remove_series():
+        # 记录系列的时间范围，提交后使这段时间的占用情况缓存失效
+        first_start, last_end = db.session.query(
+            func.min(Reservation.start_time), func.max(Reservation.end_time)
+        ).filter(Reservation.series_id == id).one()
+        removed = delete_reservations(Reservation.series_id == id)
+        db.session.delete(series)
+        return removed, first_start, last_end
+
+    try:
+        removed, first_start, last_end = run_serialized(
+            db.session, Room, room_id, remove_series, booking_stats)
+    except (BookingConflict, OperationalError):
+        # 多次重试后仍无法获取写锁
+        flash('取消失败，请重试')
+        return redirect(url_for('main.dashboard'))
+    if first_start is not None:
+        occupancy_cache.invalidate(room_id, first_start, last_end)
+    flash(f'已取消系列中的 {removed} 次预订')
+    return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/admin/reservations')
+@login_required
+def admin_reservations():
+    """
+    管理员查看所有预订的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 读取筛选条件（会议室、用户名、开始日期范围）和每页数量（最多 MAX_PAGE_SIZE 条）。
+    3. 按 (开始时间, ID) 降序进行游标分页查询，并用 JOIN 同时加载会议室和用户。
+       after 参数表示翻到更早的一页，before 参数表示翻到更新的一页，页码越大查询耗时不会增加。
+    4. 渲染管理员预订管理页面，并传递当前页的预订、筛选条件和翻页链接。
+    返回:
+        werkzeug.wrappers.Response: 渲染管理员预订管理页面的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+
+    # 读取筛选条件，无法解析的条件被忽略
+    room_id = request.args.get('room_id', type=int)
+    username = request.args.get('username', '').strip()
+    date_from = parse_date(request.args.get('date_from'))
+    date_to = parse_date(request.args.get('date_to'))
+    per_page = min(max(request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    after = parse_cursor(request.args.get('after'))
+    before = parse_cursor(request.args.get('before'))
+
+    # 一次查询预订及其会议室和用户，避免模板中逐行加载
+    query = Reservation.query.options(
+        joinedload(Reservation.room), joinedload(Reservation.user))
+    if username:
+        query = query.join(Reservation.user)
+    query = query.filter(*reservation_filters(room_id, username, date_from, date_to))
+
+    # 按 (开始时间, ID) 降序的游标分页，多取一条用于判断是否还有下一页
+    if before:
+        # 向前翻页: 按升序取比游标更新的记录，再反转
+        query = query.filter(or_(
+            Reservation.start_time > before[0],
+            and_(Reservation.start_time == before[0], Reservation.id > before[1])
+        )).order_by(Reservation.start_time.asc(), Reservation.id.asc())
+        reservations = query.limit(per_page + 1).all()
+        has_newer = len(reservations) > per_page
+        reservations = reservations[:per_page][::-1]
+        has_older = True
+    else:
+        if after:
+            query = query.filter(or_(
+                Reservation.start_time < after[0],
+                and_(Reservation.start_time == after[0], Reservation.id < after[1])
+            ))
+        query = query.order_by(Reservation.start_time.desc(), Reservation.id.desc())
+        reservations = query.limit(per_page + 1).all()
+        has_older = len(reservations) > per_page
+        reservations = reservations[:per_page]
+        has_newer = after is not None
+
+    filter_args = {key: value for key, value in request.args.items()
+                   if key in ('room_id', 'username', 'date_from', 'date_to', 'per_page') and value}
+    newer_url = older_url = None
+    if reservations and has_newer:
+        newer_url = url_for('main.admin_reservations', before=format_cursor(reservations[0]), **filter_args)
+    if reservations and has_older:
+        older_url = url_for('main.admin_reservations', after=format_cursor(reservations[-1]), **filter_args)
+
+    rooms = sorted(room_list_cache.get(), key=lambda room: room.name)
+    return render_template('admin_reservations.html', reservations=reservations, admin_view=True,
+                           rooms=rooms, filters=filter_args, per_page=per_page,
+                           newer_url=newer_url, older_url=older_url)
+
+
+@bp.route('/admin/delete_reservation/<int:id>')
+@login_required
+def delete_reservation(id):
+    """
+    管理员删除预订的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 根据预订ID获取预订信息，如果预订不存在则返回404错误。
+    3. 在串行化事务中删除预订并调整预订数量计数器，多次重试后仍无法获取写锁时提示删除失败。
+    4. 显示预订删除成功的消息并重定向到管理员预订页面。
+    返回:
+        werkzeug.wrappers.Response: 重定向到管理员预订页面的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+    reservation = Reservation.query.get_or_404(id)
+    room_id, start_time, end_time = reservation.room_id, reservation.start_time, reservation.end_time
+    # 删除和计数器调整在同一个串行化事务中完成
+    try:
+        run_serialized(db.session, Room, room_id,
+                       lambda: delete_reservations(Reservation.id == id), booking_stats)
+    except (BookingConflict, OperationalError):
+        # 多次重试后仍无法获取写锁
+        flash('删除失败，请重试')
+        return redirect(url_for('main.admin_reservations'))
+    occupancy_cache.invalidate(room_id, start_time, end_time)
+    flash('预订已删除')
+    return redirect(url_for('main.admin_reservations'))
+
+
+@bp.route('/admin/edit_reservation/<int:id>', methods=['GET', 'POST'])
+@login_required
+def admin_edit_reservation(id):
+    """
+    管理员编辑预订的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 根据预订ID获取预订信息，如果预订不存在则返回404错误。
+    3. 如果请求方法为GET，查询所有会议室信息并渲染编辑预订页面。
+    4. 如果请求方法为POST，获取并验证表单数据。
+    5. 检查会议室是否存在，参会人数是否超过会议室容量。
+    6. 验证开始时间和结束时间的合理性。
+    7. 检查会议室在指定时间段内是否可用（排除当前预订）。
+    8. 更新预订信息并提交数据库会话。
+    9. 显示预订更新成功的消息并重定向到管理员预订页面。
+    返回:
+        werkzeug.wrappers.Response: 渲染编辑预订页面或重定向到管理员预订页面的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+
+    reservation = Reservation.query.get_or_404(id)
+
+    if request.method == 'POST':
+        title = request.form.get('title')
+        start_time = datetime.strptime(
+            request.form.get('start_time'), '%Y-%m-%dT%H:%M')
+        end_time = datetime.strptime(
+            request.form.get('end_time'), '%Y-%m-%dT%H:%M')
+        purpose = request.form.get('purpose', '')
+        room_id = request.form.get('room_id')
+        attendees = request.form.get('attendees')
+        attendees = int(attendees) if attendees else 1
+
+        # 基本验证
+        if start_time >= end_time:
+            flash('开始时间必须早于结束时间')
+            return redirect(url_for('main.admin_edit_reservation', id=id))
+
+        current_time = datetime.now()
+        if start_time < current_time - timedelta(minutes=1):
+            flash('开始时间不能早于当前时间1分钟以上')
+            return redirect(url_for('main.admin_edit_reservation', id=id))
+
+        # 检查会议室容量
+        room = db.session.get(Room, room_id)
+        if not room:
+            flash('会议室不存在')
+            return redirect(url_for('main.admin_edit_reservation', id=id))
+
+        if attendees > room.capacity:
+            flash(f'参会人数超过会议室容量（最大容量：{room.capacity}人）')
+            return redirect(url_for('main.admin_edit_reservation', id=id))
+        room_id = room.id
+
+        # 使用新的可用性检查函数，排除当前预订
+        is_available, message = check_room_availability(
+            room_id,
+            start_time,
+            end_time,
+            exclude_reservation_id=id
+        )
+        if not is_available:
+            flash(message)
+            return redirect(url_for('main.admin_edit_reservation', id=id))
+
+        old_room_id, old_start_time, old_end_time = \
+            reservation.room_id, reservation.start_time, reservation.end_time
+
+        def update_reservation():
+            # 持有写锁时直接查询数据库再检查一次
+            is_available, message = check_room_availability(
+                room_id, start_time, end_time, exclude_reservation_id=id, use_cache=False)
+            if not is_available:
+                raise BookingConflict(message)
+            record_reservation_changes([(old_room_id, reservation.user_id, -1),
+                                        (room_id, reservation.user_id, 1)])
+            reservation.title = title
+            reservation.room_id = room_id
+            reservation.start_time = start_time
+            reservation.end_time = end_time
+            reservation.purpose = purpose
+            reservation.attendees = attendees
+
+        # 更新预订（检查和写入在同一个串行化事务中完成）
+        try:
+            run_serialized(db.session, Room, room_id, update_reservation, booking_stats)
+        except BookingConflict as conflict:
+            flash(conflict.message)
+            return redirect(url_for('main.admin_edit_reservation', id=id))
+        except Exception:
+            flash('更新失败，请重试')
+            return redirect(url_for('main.admin_edit_reservation', id=id))
+        occupancy_cache.invalidate(old_room_id, old_start_time, old_end_time)
+        occupancy_cache.invalidate(room_id, start_time, end_time)
+        flash('预订已更新')
+        return redirect(url_for('main.admin_reservations'))
+
+    if request.method == 'GET':
+        rooms = room_list_cache.get()
+        # 不传递参会人数，让前端显示为空
+        return render_template('admin_edit_reservation.html', reservation=reservation, rooms=rooms)
+
+    return render_template('admin_edit_reservation.html', reservation=reservation, rooms=rooms)
+
+
+@bp.route('/admin/users')
+@login_required
+def admin_users():
+    """
+    管理员查看所有用户的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 查询所有用户信息。
+    3. 渲染管理员用户管理页面，并传递用户信息。
+    返回:
+        werkzeug.wrappers.Response: 渲染管理员用户管理页面的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+    users = User.query.all()
+    return render_template('admin_users.html', users=users)
+
+
+@bp.route('/admin/users/add', methods=['GET', 'POST'])
+@login_required
+def admin_add_user():
+    """
+    管理员添加用户的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 如果请求方法为POST，获取并验证表单数据。
+    3. 检查用户名和密码是否为空。
+    4. 检查用户名是否已存在。
+    5. 创建新用户并提交数据库会话。
+    6. 显示用户添加成功的消息并重定向到用户管理页面。
+    返回:
+        werkzeug.wrappers.Response: 渲染添加用户页面或重定向到用户管理页面的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        is_admin = request.form.get('is_admin') == 'on'
+
+        if not username or not password:
+            flash('请填写所有必填字段')
+            return redirect(url_for('main.admin_users'))
+
+        existing_user = User.query.filter_by(username=username).first()
+        if existing_user:
+            flash('用户名已存在')
+            return redirect(url_for('main.admin_users'))
+
+        new_user = User(
+            username=username,
+            password=password,
+            is_admin=is_admin
+        )
+        db.session.add(new_user)
+        touch_change_versions()
+        db.session.commit()
+        flash('用户添加成功')
+        return redirect(url_for('main.admin_users'))
+
+    return render_template('admin_add_user.html')
+
+
+@bp.route('/admin/users/edit/<int:id>', methods=['GET', 'POST'])
+@login_required
+def admin_edit_user(id):
+    """
+    管理员编辑用户信息的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 根据用户ID获取用户信息，如果用户不存在则返回404错误。
+    3. 如果请求方法为POST，获取并验证表单数据。
+    4. 检查用户名是否为空，是否已存在。
+    5. 更新用户信息（用户名、密码、管理员权限）并提交数据库会话。
+    6. 显示用户信息更新成功的消息并重定向到用户管理页面。
+    返回:
+        werkzeug.wrappers.Response: 渲染编辑用户页面或重定向到用户管理页面的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+
+    user = User.query.get_or_404(id)
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        is_admin = request.form.get('is_admin') == 'on'
+
+        if not username:
+            flash('用户名不能为空')
+            return redirect(url_for('main.admin_users'))
+
+        existing_user = User.query.filter(
+            User.username == username, User.id != id).first()
+        if existing_user:
+            flash('用户名已存在')
+            return redirect(url_for('main.admin_users'))
+
+        # 改名时会议室日历中这个用户的预订的描述也会变化
+        keys = renamed_version_keys('user', user.id) if username != user.username else [('user', user.id)]
+        user.username = username
+        # 只有在提供了新密码时才更新密码
+        if password:
+            user.password = password
+        user.is_admin = is_admin
+        touch_change_versions(keys)
+        db.session.commit()
+        user_cache.invalidate(user.id)
+        flash('用户信息更新成功')
+        return redirect(url_for('main.admin_users'))
+
+    return render_template('admin_edit_user.html', user=user)
+
+
+@bp.route('/admin/users/delete/<int:id>', methods=['POST'])
+@login_required
+def admin_delete_user(id):
+    """
+    管理员删除用户的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 检查当前用户是否尝试删除自己，如果是则提示不能删除当前登录的用户。
+    3. 根据用户ID获取用户信息，如果用户不存在则返回404错误。
+    4. 检查是否尝试删除管理员账户，如果是则检查管理员数量，确保不能删除最后一个管理员账户。
+    5. 删除用户的所有预订记录。
+    6. 删除用户并提交数据库会话，多次重试后仍无法获取写锁时提示删除失败。
+    7. 显示用户删除成功的消息并重定向到用户管理页面。
+    返回:
+        werkzeug.wrappers.Response: 重定向到用户管理页面的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+
+    if current_user.id == id:
+        flash('不能删除当前登录的用户')
+        return redirect(url_for('main.admin_users'))
+
+    user = User.query.get_or_404(id)
+    if user.is_admin:
+        admin_count = User.query.filter_by(is_admin=True).count()
+        if admin_count <= 1:
+            flash('不能删除最后一个管理员账户')
+            return redirect(url_for('main.admin_users'))
+
+    def remove_user():
+        # 删除用户的所有预订并调整计数器，然后删除用户
+        delete_reservations(Reservation.user_id == id)
+        db.session.query(ReservationCounter).filter_by(scope='user', scope_id=id).delete()
+        ReservationSeries.query.filter_by(user_id=id).delete()
+        touch_change_versions([('user', id)])
+        db.session.delete(user)
+
+    try:
+        run_serialized(db.session, Room, None, remove_user, booking_stats)
+    except (BookingConflict, OperationalError):
+        # 多次重试后仍无法获取写锁
+        flash('删除失败，请重试')
+        return redirect(url_for('main.admin_users'))
+    occupancy_cache.invalidate_all()
+    user_cache.invalidate(id)
+    flash('用户删除成功')
+    return redirect(url_for('main.admin_users'))
+
+
+@bp.route('/available_rooms')
+@login_required
+@conditional_get('available_rooms')
+def available_rooms():
+    """
+    获取指定时间段内可用的会议室。
+    该函数执行以下操作：
+    1. 从请求参数中获取开始时间和结束时间，并将其转换为 datetime 对象；时间段超过
+       MAX_AVAILABILITY_SPAN_DAYS 天时返回 400。
+    2. 从会议室列表缓存获取所有会议室信息。
+    3. 从占用情况缓存取出所有会议室在该时间段（包含前后缓冲时间）内的预订，未命中的部分用一条查询补齐。
+    4. 用扫描线计算每个会议室的最大并发预订数。
+    5. 如果最大并发数小于会议室的总槽位数，则将会议室添加到可用列表中。
+    6. 返回包含可用会议室信息的 JSON 响应。
+    缓存命中时不查询数据库，未命中时最多两条查询，不随会议室数量增长。
+    返回:
+        flask.Response: 包含可用会议室信息的 JSON 响应对象。
+    """
+    start_time = datetime.strptime(
+        request.args.get('start_time'), '%Y-%m-%dT%H:%M')
+    end_time = datetime.strptime(
+        request.args.get('end_time'), '%Y-%m-%dT%H:%M')
+    if end_time - start_time > timedelta(days=MAX_AVAILABILITY_SPAN_DAYS):
+        return jsonify({'error': f'查询的时间段不能超过 {MAX_AVAILABILITY_SPAN_DAYS} 天'}), 400
+    # 与 check_room_availability 使用相同的缓冲时间，保证显示可用的会议室可以预订
+    check_start, check_end = buffered_window(start_time, end_time)
+
+    # 从会议室列表缓存获取所有会议室
+    all_rooms = room_list_cache.get()
+
+    # 一次取出所有会议室在该时间段内的预订，计算每个会议室的最大并发数
+    intervals_by_room = occupancy_cache.intervals_by_room(
+        [room.id for room in all_rooms], check_start, check_end)
+    peaks = peak_concurrency_by_room(intervals_by_room, check_start, check_end)
+
+    available_rooms = []
+    for room in all_rooms:
+        peak = peaks.get(room.id, 0)
+        # 如果这个时间段内该会议室的最大并发预订数小于总槽位数，就添加到可用列表中
+        if peak < room.total_slots:
+            available_slots = room.total_slots - peak
+            available_rooms.append({
+                'id': room.id,
+                'name': room.name,
+                'capacity': room.capacity,
+                # 显示实际可用的槽位数量
+                'available_slots': available_slots,
+                'description': room.description
+            })
+
+    return jsonify({'rooms': available_rooms})
+
+
+@bp.route('/available_rooms/batch', methods=['POST'])
+@login_required
+def available_rooms_batch():
+    """
+    批量检查多个 (会议室, 时间段) 候选的可用性。
+    该函数执行以下操作：
+    1. 从 JSON 请求体的 candidates 字段中读取候选列表，每项包含 room_id、start_time 和 end_time。
+    2. 校验候选数量和格式，时间格式为 ISO 8601（例如 2024-01-01T09:00），每个候选的时间段不超过
+       MAX_AVAILABILITY_SPAN_DAYS 天。
+    3. 调用 check_room_availability_batch 一次性检查所有候选。
+    4. 返回每个候选的检查结果及冲突时间。
+    返回:
+        flask.Response: 包含检查结果的 JSON 响应对象，请求格式错误时返回 400。
+    """
+    payload = request.get_json(silent=True) or {}
+    raw_candidates = payload.get('candidates')
+    if not isinstance(raw_candidates, list) or not raw_candidates:
+        return jsonify({'error': 'candidates 必须是非空列表'}), 400
+    if len(raw_candidates) > MAX_BATCH_CANDIDATES:
+        return jsonify({'error': f'一次最多检查 {MAX_BATCH_CANDIDATES} 个候选'}), 400
+
+    candidates = []
+    for index, item in enumerate(raw_candidates):
+        try:
+            room_id = int(item['room_id'])
+            start_time = datetime.fromisoformat(item['start_time'])
+            end_time = datetime.fromisoformat(item['end_time'])
+            too_long = end_time - start_time > timedelta(days=MAX_AVAILABILITY_SPAN_DAYS)
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': f'第 {index + 1} 个候选格式错误'}), 400
+        if too_long:
+            return jsonify({'error': f'第 {index + 1} 个候选的时间段超过 {MAX_AVAILABILITY_SPAN_DAYS} 天'}), 400
+        candidates.append((room_id, start_time, end_time))
+
+    results = []
+    for (room_id, start_time, end_time), (is_available, message, blocking_time) in zip(
+            candidates, check_room_availability_batch(candidates)):
+        results.append({
+            'room_id': room_id,
+            'start_time': start_time.strftime('%Y-%m-%dT%H:%M'),
+            'end_time': end_time.strftime('%Y-%m-%dT%H:%M'),
+            'available': is_available,
+            'message': message,
+            'blocking_time': blocking_time.strftime('%Y-%m-%dT%H:%M') if blocking_time else None
+        })
+    return jsonify({'results': results})
+
+
+@bp.route('/available_rooms/next_free')
+@login_required
+def next_free_windows():
+    """
+    查找最早可以预订的空闲时间段。
+    该函数执行以下操作：
+    1. 从请求参数中获取会议时长（duration，分钟），以及可选的会议室ID（room_id）、
+       参会人数（attendees）、搜索开始时间（start_time）、搜索天数（horizon_days）和返回数量（limit）。
+    2. 未指定会议室时，在容量不小于参会人数的所有会议室中搜索。
+    3. 从占用情况缓存取出这些会议室在搜索范围内的预订，未命中的部分用一条查询补齐。
+    4. 对每个会议室计算已满的时间段，在空闲区间中查找满足时长和10分钟缓冲时间的时间段。
+    5. 合并所有会议室的结果，按开始时间返回最早的若干个时间段。
+    返回:
+        flask.Response: 包含空闲时间段的 JSON 响应对象，参数错误时返回 400。
+    """
+    try:
+        duration = timedelta(minutes=int(request.args.get('duration', '')))
+        room_id = request.args.get('room_id', type=int)
+        attendees = request.args.get('attendees', 1, type=int)
+        horizon_days = min(request.args.get('horizon_days', 7, type=int), MAX_SEARCH_HORIZON_DAYS)
+        limit = min(request.args.get('limit', 5, type=int), MAX_FREE_WINDOWS)
+        if request.args.get('start_time'):
+            search_start = datetime.fromisoformat(request.args.get('start_time'))
+        else:
+            # 默认从下一个整5分钟开始搜索
+            now = datetime.now().replace(second=0, microsecond=0)
+            search_start = now + timedelta(minutes=5 - now.minute % 5)
+    except ValueError:
+        return jsonify({'error': '参数格式错误'}), 400
+    if duration <= timedelta(0) or horizon_days <= 0 or limit <= 0:
+        return jsonify({'error': '会议时长、搜索天数和返回数量必须大于0'}), 400
+    search_end = search_start + timedelta(days=horizon_days)
+
+    if room_id is not None:
+        rooms = [room for room in room_list_cache.get() if room.id == room_id]
+    else:
+        rooms = [room for room in room_list_cache.get() if room.capacity >= attendees]
+
+    # 一次取出所有候选会议室在搜索范围内的预订
+    check_start, check_end = buffered_window(search_start, search_end)
+    intervals_by_room = occupancy_cache.intervals_by_room(
+        [room.id for room in rooms], check_start, check_end)
+
+    windows = []
+    for room in rooms:
+        for start, end in find_free_windows(intervals_by_room[room.id], room.total_slots,
+                                            duration, search_start, search_end, count=limit):
+            windows.append((start, room.id, end, room))
+    windows.sort(key=lambda window: (window[0], window[1]))
+
+    return jsonify({'windows': [{
+        'room_id': room.id,
+        'room_name': room.name,
+        'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+        'end_time': end.strftime('%Y-%m-%dT%H:%M')
+    } for start, _, end, room in windows[:limit]]})
+
+
+def calendar_window():
+    """
+    返回日历订阅包含的时间范围，按天取整，同一天内的请求使用相同的范围
+    返回:
+        tuple: (范围开始时间, 范围结束时间)
+    """
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    return today - timedelta(days=CALENDAR_PAST_DAYS), today + timedelta(days=CALENDAR_FUTURE_DAYS + 1)
+
+
+def calendar_response(name, scope, scope_id, load_events):
+    """
+    生成日历订阅的响应
+    ETag 由变更版本和订阅范围的开始日期组成，Last-Modified 为最后一次修改的时间（至少为当天零点，
+    因为订阅范围每天移动）。客户端的条件请求只读取一行变更版本，内容未变化时返回 304，不查询预订表。
+    参数:
+        name (str): 日历名称
+        scope (str): 'room' 或 'user'
+        scope_id (int): 会议室ID或用户ID
+        load_events (callable): load_events(范围开始时间, 范围结束时间) 返回 CalendarEvent 列表
+    返回:
+        flask.Response: iCalendar 响应或 304 响应
+    """
+    window_start, window_end = calendar_window()
+    version, updated_at = get_change_version(scope, scope_id)
+    etag = f'{scope}-{scope_id}-{version}-{window_start:%Y%m%d}'
+    today = window_start + timedelta(days=CALENDAR_PAST_DAYS)
+    last_modified = max(updated_at or today, today)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+    body = build_calendar(name, load_events(window_start, window_end))
+    response = Response(body, content_type='text/calendar; charset=utf-8')
+    response.headers['Content-Disposition'] = f'inline; filename={scope}-{scope_id}.ics'
+    return set_validators(response, etag, last_modified)
+
+
+@bp.route('/calendar/room/<int:id>.ics')
+def room_calendar(id):
+    """
+    会议室的 iCalendar 订阅路由。
+    该函数执行以下操作：
+    1. 检查访问权限：已登录的用户，或链接中带有该会议室的有效令牌。
+    2. 从会议室列表缓存中获取会议室，如果会议室不存在则返回404错误。
+    3. 条件请求的内容未变化时返回 304；否则用 ix_reservation_room_time 索引查询订阅范围内的预订并生成日历。
+    返回:
+        flask.Response: iCalendar 响应、304 响应或 404 错误。
+    """
+    if not (current_user.is_authenticated or check_calendar_token(request.args.get('token'), 'room', id)):
+        return login_manager.unauthorized()
+    room = next((room for room in room_list_cache.get() if room.id == id), None)
+    if room is None:
+        abort(404)
+
+    def load_events(window_start, window_end):
+        rows = db.session.query(
+            Reservation.id, Reservation.title, Reservation.start_time, Reservation.end_time,
+            Reservation.purpose, Reservation.created_at, User.username
+        ).join(User, Reservation.user_id == User.id).filter(
+            Reservation.room_id == id,
+            Reservation.start_time >= window_start,
+            Reservation.start_time < window_end
+        ).order_by(Reservation.start_time).all()
+        return [CalendarEvent(
+            uid=f'reservation-{row.id}@{request.host}', start_time=row.start_time, end_time=row.end_time,
+            summary=row.title, description=f'预订人: {row.username}\n{row.purpose or ""}'.strip(),
+            location=room.name, stamp=row.created_at or row.start_time) for row in rows]
+
+    return calendar_response(room.name, 'room', id, load_events)
+
+
+@bp.route('/calendar/user/<int:id>.ics')
+def user_calendar(id):
+    """
+    用户的 iCalendar 订阅路由。
+    该函数执行以下操作：
+    1. 检查访问权限：该用户本人或管理员，或链接中带有该用户的有效令牌。
+    2. 从登录用户缓存中获取用户，如果用户不存在则返回404错误。
+    3. 条件请求的内容未变化时返回 304；否则用 ix_reservation_user_start 索引查询订阅范围内的预订并生成日历。
+    返回:
+        flask.Response: iCalendar 响应、304 响应或 404 错误。
+    """
+    is_owner = current_user.is_authenticated and (current_user.id == id or current_user.is_admin)
+    if not (is_owner or check_calendar_token(request.args.get('token'), 'user', id)):
+        return login_manager.unauthorized()
+    user = user_cache.get(id)
+    if user is None:
+        abort(404)
+
+    def load_events(window_start, window_end):
+        rows = db.session.query(
+            Reservation.id, Reservation.title, Reservation.start_time, Reservation.end_time,
+            Reservation.purpose, Reservation.created_at, Room.name
+        ).join(Room, Reservation.room_id == Room.id).filter(
+            Reservation.user_id == id,
+            Reservation.start_time >= window_start,
+            Reservation.start_time < window_end
+        ).order_by(Reservation.start_time).all()
+        return [CalendarEvent(
+            uid=f'reservation-{row.id}@{request.host}', start_time=row.start_time, end_time=row.end_time,
+            summary=row.title, description=row.purpose, location=row.name,
+            stamp=row.created_at or row.start_time) for row in rows]
+
+    return calendar_response(f'{user.username} 的会议', 'user', id, load_events)
+
+
+@bp.route('/about')
+def about():
+    """
+    渲染关于页面的路由。
+    该函数执行以下操作：
+    1. 渲染关于页面模板。
+    返回:
+        werkzeug.wrappers.Response: 渲染关于页面的响应对象。
+    """
+    return render_template('about.html')
+
+
+@bp.route('/forgot-password')
+def forgot_password():
+    """
+    渲染忘记密码页面的路由。
+    该函数执行以下操作：
+    1. 渲染忘记密码页面模板。
+    返回:
+        werkzeug.wrappers.Response: 渲染忘记密码页面的响应对象。
+    """
+    return render_template('forgot_password.html')
+
+
+@bp.route('/admin/rooms')
+@login_required
+@conditional_get('admin_rooms')
+def admin_rooms():
+    """
+    管理员查看所有会议室的路由。
+    该函数执行以下操作：
+    1. 从会议室列表缓存获取所有会议室信息。
+    2. 渲染管理员会议室管理页面，并传递会议室信息。
+    返回:
+        werkzeug.wrappers.Response: 渲染管理员会议室管理页面的响应对象。
+    """
+    rooms = room_list_cache.get()
+    return render_template('admin_rooms.html', rooms=rooms)
+
+
+@bp.route('/change_password', methods=['GET', 'POST'])
+@login_required
+def change_password():
+    """
+    处理用户修改密码的函数。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果是则提示管理员在用户管理页面修改密码。
+    2. 如果请求方法为POST，获取并验证当前密码、新密码和确认密码。
+    3. 如果当前密码错误，提示用户当前密码错误。
+    4. 如果新密码和确认密码不一致，提示用户两次输入的新密码不一致。
+    5. 如果验证通过，更新用户密码并提交数据库会话。
+    6. 显示密码修改成功的消息并重定向到仪表盘。
+    返回:
+        werkzeug.wrappers.Response: 渲染修改密码页面或重定向到仪表盘的响应对象。
+    """
+    # 用户修改密码的功能
+    if current_user.is_admin:
+        flash('管理员请在用户管理页面修改密码')
+        return redirect(url_for('main.dashboard'))
+
+    if request.method == 'POST':
+        current_password = request.form.get('current_password')
+        new_password = request.form.get('new_password')
+        confirm_password = request.form.get('confirm_password')
+
+        # current_user 是缓存中的只读身份，从数据库加载用户以验证和修改密码
+        user = db.session.get(User, current_user.id)
+
+        # 验证当前密码
+        if not user.check_password(current_password):
+            flash('当前密码错误')
+            return redirect(url_for('main.change_password'))
+
+        # 验证新密码
+        if new_password != confirm_password:
+            flash('两次输入的新密码不一致')
+            return redirect(url_for('main.change_password'))
+
+        # 更新密码
+        user.set_password(new_password)
+        touch_change_versions([('user', user.id)])
+        db.session.commit()
+        user_cache.invalidate(user.id)
+        flash('密码修改成功')
+        return redirect(url_for('main.dashboard'))
+
+    return render_template('change_password.html')
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    """
+    处理用户登出操作的函数。
+    该函数执行以下操作：
+    1. 调用 logout_user() 函数，注销当前用户。
+    2. 使用 flash() 函数显示一条成功退出登录的消息。
+    3. 重定向用户到主页。
+    返回:
+        werkzeug.wrappers.Response: 重定向到主页的响应对象。
+    """
+    logout_user()
+    flash('您已成功退出登录')
+    return redirect(url_for('main.index'))
+
+
+@bp.route('/admin/maintenance')
+@login_required
+def admin_maintenance():
+    """
+    管理员查看后台维护任务状态的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 读取清理任务最近一次执行的时间和删除的预订数量。
+    3. 返回包含任务状态的 JSON 响应。
+    返回:
+        flask.Response: 包含维护任务状态的 JSON 响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+    status = maintenance_scheduler.status()
+    return jsonify({
+        'interval_seconds': maintenance_scheduler.interval,
+        'last_run': status.get('last_run'),
+        'removed': status.get('removed'),
+        'total_removed': status.get('total_removed'),
+        'runner_pid': status.get('pid')
+    })
+
+
+@bp.route('/admin/stats')
+@login_required
+def admin_stats():
+    """
+    管理员查看运行统计的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 返回处理本次请求的工作进程的占用情况缓存统计（命中、未命中、淘汰和失效次数）、会议室列表缓存统计、
+       登录用户缓存统计和串行化预订事务统计（重试次数、等待锁的时间）。
+    返回:
+        flask.Response: 包含运行统计的 JSON 响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+    return jsonify({
+        'pid': os.getpid(),
+        'occupancy_cache': occupancy_cache.stats(),
+        'room_list_cache': room_list_cache.stats(),
+        'user_cache': user_cache.stats(),
+        'booking': booking_stats.stats()
+    })
+
+
+@bp.route('/metrics')
+def metrics():
+    """
+    管理员获取运行指标的路由（Prometheus 文本格式）。
+    该函数执行以下操作：
+    1. 已登录时检查当前用户是否为管理员，如果不是则提示需要管理员权限；
+       未登录时检查 HTTP Basic 认证的管理员账号，认证失败返回 401。
+    2. 汇总所有存活工作进程的快照：每个端点的请求数和延迟直方图、SQL 查询数和耗时、每个请求的查询数、
+       缓存命中和预订事务统计。
+    3. 加上清理任务最近一次执行的时间、删除的预订数量和累计删除数量。
+    返回:
+        flask.Response: Prometheus 文本格式的响应对象。
+    """
+    if current_user.is_authenticated:
+        if not current_user.is_admin:
+            flash('需要管理员权限')
+            return redirect(url_for('main.dashboard'))
+    elif load_basic_auth_admin() is None:
+        return Response('需要管理员权限\n', 401, {'WWW-Authenticate': 'Basic realm="metrics"'},
+                        content_type='text/plain; charset=utf-8')
+
+    status = maintenance_scheduler.status()
+    cleanup = [
+        ('maintenance_interval_seconds', '后台清理任务的执行间隔（秒）', 'gauge', {}, maintenance_scheduler.interval),
+        ('maintenance_removed_total', '后台清理任务累计删除的过期预订数', 'counter', {},
+         status.get('total_removed', 0)),
+        ('maintenance_last_removed', '最近一次清理删除的过期预订数', 'gauge', {}, status.get('removed', 0)),
+    ]
+    if status.get('last_run'):
+        cleanup.append(('maintenance_last_run_timestamp_seconds', '最近一次清理的时间（Unix 时间戳）', 'gauge', {},
+                        datetime.fromisoformat(status['last_run']).timestamp()))
+    return Response(render_prometheus(request_metrics.aggregate(), cleanup),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@bp.route('/admin/profiles')
+@login_required
+def admin_profiles():
+    """
+    管理员查看请求性能分析结果的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 返回所有工作进程保存的分析结果的元数据（端点、路径、状态码、耗时、触发方式），最新的在前。
+    返回:
+        flask.Response: 包含分析结果列表的 JSON 响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+    return jsonify({
+        'sample_rate': profiler.sample_rate,
+        'keep': profiler.keep,
+        'profiles': profiler.list_profiles()
+    })
+
+
+@bp.route('/admin/profiles/<profile_id>.<any(prof, json):extension>')
+@login_required
+def admin_profile(profile_id, extension):
+    """
+    管理员下载请求性能分析结果的路由。
+    .prof 文件可以用 python -m pstats 或 snakeviz 打开，.json 文件包含元数据和耗时最多的函数。
+    参数:
+        profile_id (str): 分析结果的名称（响应头 X-Profile-Id 或 admin_profiles 中的 id）
+        extension (str): 'prof' 或 'json'
+    返回:
+        flask.Response: 分析结果文件，不存在时返回 404。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+    return send_from_directory(profiler.directory, f'{profile_id}.{extension}', as_attachment=extension == 'prof')
+
+
+def import_rooms_chunk(chunk):
+    """
+    导入一块会议室数据，名称与已有会议室或文件中之前的行重复时报错
+    参数:
+        chunk (list): (行号, parse_room 返回的字段) 元组列表
+    返回:
+        tuple: (导入的行数, (行号, 错误原因) 列表)
+    """
+    names = {record['name'] for _, record in chunk}
+    existing = {name for (name,) in db.session.query(Room.name).filter(Room.name.in_(names))}
+    rows, errors = [], []
+    for line, record in chunk:
+        if record['name'] in existing:
+            errors.append((line, f"会议室 {record['name']} 已存在"))
+            continue
+        existing.add(record['name'])
+        rows.append(record)
+    if rows:
+        db.session.execute(insert(Room), rows)
+        touch_change_versions()
+    return len(rows), errors
+
+
+def import_users_chunk(chunk):
+    """
+    导入一块用户数据，用户名与已有用户或文件中之前的行重复时报错
+    参数:
+        chunk (list): (行号, parse_user 返回的字段) 元组列表
+    返回:
+        tuple: (导入的行数, (行号, 错误原因) 列表)
+    """
+    usernames = {record['username'] for _, record in chunk}
+    existing = {username for (username,) in
+                db.session.query(User.username).filter(User.username.in_(usernames))}
+    rows, errors = [], []
+    for line, record in chunk:
+        if record['username'] in existing:
+            errors.append((line, f"用户名 {record['username']} 已存在"))
+            continue
+        existing.add(record['username'])
+        rows.append(record)
+    if rows:
+        db.session.execute(insert(User), rows)
+        touch_change_versions()
+    return len(rows), errors
+
+
+def import_reservations_chunk(chunk):
+    """
+    导入一块预订数据
+    该函数执行以下操作：
+    1. 用两次查询找出这一块涉及的会议室和用户，名称不存在或会议室名称不唯一的行报错。
+    2. 检查参会人数是否超过会议室容量。
+    3. 用一次查询把这些会议室在这一块时间范围内的已有预订载入 IntervalIndex，
+       然后逐行检查冲突（与 check_room_availability 的规则相同），通过的行加入索引，
+       因此同一块中的行之间也会互相检查。
+    4. 用一条 INSERT 批量写入通过的行，并调整预订数量计数器。
+    导入的是已有的预订，因此不检查开始时间是否早于当前时间，也不检查会议总数等预订数量限制。
+    参数:
+        chunk (list): (行号, parse_reservation 返回的字段) 元组列表
+    返回:
+        tuple: (导入的行数, (行号, 错误原因) 列表)
+    """
+    room_ids = {record['room_id'] for _, record in chunk if 'room_id' in record}
+    room_names = {record['room_name'] for _, record in chunk if 'room_name' in record}
+    rooms_by_id, rooms_by_name = {}, {}
+    for room in db.session.query(Room.id, Room.name, Room.capacity, Room.total_slots).filter(
+            or_(Room.id.in_(room_ids), Room.name.in_(room_names))):
+        rooms_by_id[room.id] = room
+        rooms_by_name.setdefault(room.name, []).append(room)
+    user_ids = {record['user_id'] for _, record in chunk if 'user_id' in record}
+    usernames = {record['username'] for _, record in chunk if 'username' in record}
+    users_by_id, users_by_name = set(), {}
+    for user_id, username in db.session.query(User.id, User.username).filter(
+            or_(User.id.in_(user_ids), User.username.in_(usernames))):
+        users_by_id.add(user_id)
+        users_by_name[username] = user_id
+
+    errors, resolved = [], []
+    for line, record in chunk:
+        if 'room_id' in record:
+            room = rooms_by_id.get(record['room_id'])
+        else:
+            matches = rooms_by_name.get(record['room_name'], [])
+            if len(matches) > 1:
+                errors.append((line, f"会议室名称 {record['room_name']} 不唯一，请使用 room_id"))
+                continue
+            room = matches[0] if matches else None
+        if room is None:
+            errors.append((line, '会议室不存在'))
+            continue
+        if 'user_id' in record:
+            user_id = record['user_id'] if record['user_id'] in users_by_id else None
+        else:
+            user_id = users_by_name.get(record['username'])
+        if user_id is None:
+            errors.append((line, '用户不存在'))
+            continue
+        if record['attendees'] > room.capacity:
+            errors.append((line, f'参会人数超过会议室容量（最大容量：{room.capacity}人）'))
+            continue
+        resolved.append((line, record, room, user_id))
+
+    rows = []
+    if resolved:
+        windows = [buffered_window(record['start_time'], record['end_time'])
+                   for _, record, _, _ in resolved]
+        index = IntervalIndex()
+        for room_id, _, start, end in load_reservation_intervals(
+                sorted({room.id for _, _, room, _ in resolved}),
+                min(start for start, _ in windows), max(end for _, end in windows)):
+            index.add(room_id, start, end)
+        created_at = datetime.now()
+        for line, record, room, user_id in resolved:
+            start_time, end_time = record['start_time'], record['end_time']
+            overbooked_time = index.first_overbooked_time(
+                room.id, start_time, end_time, room.total_slots)
+            if overbooked_time is not None:
+                formatted_time = overbooked_time.strftime('%Y-%m-%d %H:%M')
+                errors.append((line, f'时间段 {formatted_time} 已达到最大预订数量'))
+                continue
+            index.add(room.id, start_time, end_time)
+            rows.append({
+                'room_id': room.id,
+                'user_id': user_id,
+                'title': record['title'],
+                'start_time': start_time,
+                'end_time': end_time,
+                'purpose': record['purpose'],
+                'attendees': record['attendees'],
+                'created_at': created_at,
+            })
+    if rows:
+        db.session.execute(insert(Reservation), rows)
+        record_reservation_changes((row['room_id'], row['user_id'], 1) for row in rows)
+    return len(rows), sorted(errors)
+
+
+# 导入的数据类型 -> (解析一行的函数, 导入一块的函数)
+IMPORTERS = {
+    'rooms': (parse_room, import_rooms_chunk),
+    'users': (parse_user, import_users_chunk),
+    'reservations': (parse_reservation, import_reservations_chunk),
+}
+
+
+def import_data(stream, fmt, kind, report, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    分块导入会议室、用户或预订
+    文件逐行读取，每 chunk_size 行在一个串行化事务中校验、检查冲突并批量写入，
+    内存占用只与块大小有关，与文件大小无关。某一块写入后，之后的块会把它作为已有预订检查冲突。
+    参数:
+        stream (file): 导入文件
+        fmt (str): 'csv' 或 'jsonl'
+        kind (str): IMPORT_KINDS 中的一项
+        report (ImportReport): 导入结果和逐行错误报告
+        chunk_size (int): 每个事务写入的行数
+    返回:
+        ImportReport: 传入的 report
+    """
+    parse, import_chunk = IMPORTERS[kind]
+
+    def parsed_rows():
+        # 无法解析的行作为 ImportRowError 留在块中，与写入时发现的错误一起按行号报告
+        for line, row in read_rows(stream, fmt):
+            if isinstance(row, ImportRowError):
+                yield line, row
+                continue
+            try:
+                yield line, parse(row)
+            except ImportRowError as error:
+                yield line, error
+
+    try:
+        for rows in chunked(parsed_rows(), chunk_size):
+            report.processed += len(rows)
+            errors = [(line, row.message) for line, row in rows if isinstance(row, ImportRowError)]
+            chunk = [(line, row) for line, row in rows if not isinstance(row, ImportRowError)]
+            if chunk:
+                imported, chunk_errors = run_serialized(
+                    db.session, Room, None, lambda: import_chunk(chunk), booking_stats)
+                report.imported += imported
+                errors.extend(chunk_errors)
+            for line, message in sorted(errors):
+                report.add_error(line, message)
+    finally:
+        # 即使中途失败，已提交的块也需要让缓存失效
+        if report.imported and kind == 'reservations':
+            occupancy_cache.invalidate_all()
+        elif report.imported and kind == 'rooms':
+            room_list_cache.invalidate()
+    return report
+
+
+@bp.route('/admin/import', methods=['GET', 'POST'])
+@login_required
+def admin_import():
+    """
+    管理员批量导入数据的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 如果请求方法为POST，读取上传的文件、数据类型和文件格式（未指定时根据扩展名判断）。
+    3. 调用 import_data 分块导入，上传的文件由 Werkzeug 暂存到磁盘，逐行读取。
+    4. 渲染导入页面并显示导入结果和逐行错误报告（最多显示 MAX_REPORTED_ERRORS 条）。
+    返回:
+        werkzeug.wrappers.Response: 渲染导入页面的响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+
+    report = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        kind = request.form.get('kind')
+        if not upload or not upload.filename:
+            flash('请选择要导入的文件')
+            return redirect(url_for('main.admin_import'))
+        if kind not in IMPORT_KINDS:
+            flash('不支持的数据类型')
+            return redirect(url_for('main.admin_import'))
+        fmt = request.form.get('format') or detect_format(upload.filename)
+        try:
+            report = import_data(upload.stream, fmt, kind, ImportReport()).to_dict()
+        except UnicodeDecodeError:
+            flash('文件必须使用 UTF-8 编码')
+            return redirect(url_for('main.admin_import'))
+        flash(f"导入完成：成功 {report['imported']} 行，失败 {report['failed']} 行")
+
+    return render_template('admin_import.html', kinds=IMPORT_KINDS, report=report)
+
+
+# 导出的列，与 export_reservation_rows 返回的行元组顺序一致
+EXPORT_COLUMNS = ['id', 'room_id', 'room_name', 'user_id', 'username', 'title', 'start_time',
+                  'end_time', 'purpose', 'attendees', 'created_at', 'series_id']
+
+
+def export_reservation_rows(criteria, batch_size=EXPORT_BATCH_SIZE):
+    """
+    用服务器端游标逐批读取要导出的预订
+    只查询需要的列（不创建 ORM 对象），按 (开始时间, ID) 排序，
+    stream_results 让支持的数据库驱动使用服务器端游标，yield_per 每次只从游标取出 batch_size 行。
+    参数:
+        criteria (list): reservation_filters 返回的筛选条件
+        batch_size (int): 每次从数据库读取的行数
+    返回:
+        generator: 与 EXPORT_COLUMNS 顺序一致的行元组
+    """
+    query = db.session.query(
+        Reservation.id, Reservation.room_id, Room.name, Reservation.user_id, User.username,
+        Reservation.title, Reservation.start_time, Reservation.end_time, Reservation.purpose,
+        Reservation.attendees, Reservation.created_at, Reservation.series_id
+    ).join(Room, Reservation.room_id == Room.id).join(User, Reservation.user_id == User.id).filter(
+        *criteria
+    ).order_by(Reservation.start_time, Reservation.id).execution_options(
+        stream_results=True, yield_per=batch_size)
+    for row in query:
+        yield tuple(row)
+
+
+@bp.route('/admin/export')
+@login_required
+def admin_export():
+    """
+    管理员导出预订的路由。
+    该函数执行以下操作：
+    1. 检查当前用户是否为管理员，如果不是则提示需要管理员权限。
+    2. 读取导出格式（csv 或 jsonl）和与预订管理页面相同的筛选条件。
+    3. 以分块传输的流式响应返回导出的数据，数据库按批读取、按批编码，不会把所有预订载入内存。
+    返回:
+        flask.Response: CSV 或 JSON Lines 格式的流式响应对象。
+    """
+    if not current_user.is_admin:
+        flash('需要管理员权限')
+        return redirect(url_for('main.dashboard'))
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        flash('不支持的导出格式')
+        return redirect(url_for('main.admin_reservations'))
+    criteria = reservation_filters(
+        request.args.get('room_id', type=int),
+        request.args.get('username', '').strip(),
+        parse_date(request.args.get('date_from')),
+        parse_date(request.args.get('date_to')))
+
+    filename = f"reservations-{datetime.now().strftime('%Y%m%d%H%M%S')}.{fmt}"
+    chunks = encode_rows(export_reservation_rows(criteria), EXPORT_COLUMNS, fmt, EXPORT_BATCH_SIZE)
+    return Response(
+        stream_with_context(chunks),
+        content_type=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
+def init_app(app):
+    """
+    为应用创建缓存、注册运行统计的指标收集函数、初始化登录管理器并注册蓝图
+    缓存使用 create_app 创建的共享代数表，因此命令行命令和后台清理的写操作也会让缓存失效。
+    参数:
+        app (flask.Flask): create_app 创建的应用
+    """
+    generations = app.extensions['generations']
+    app.extensions['occupancy_cache'] = OccupancyCache(
+        loader=load_reservation_intervals,
+        generations=generations,
+        max_entries=app.config['OCCUPANCY_CACHE_SIZE']
+    )
+    app.extensions['room_list_cache'] = CachedValue(
+        loader=load_room_snapshots,
+        generations=generations,
+        key='rooms'
+    )
+    app.extensions['user_cache'] = UserCache(
+        loader=load_user_identity,
+        generations=generations,
+        ttl=app.config['USER_CACHE_TTL_SECONDS']
+    )
+    # 写入指标快照时附带当前工作进程的缓存和预订事务统计
+    app.extensions['metrics'].add_collector(runtime_samples)
+    login_manager.init_app(app)
+    app.register_blueprint(bp)
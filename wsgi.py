@@ -1,10 +1,17 @@
 """
 WSGI配置文件,用于启动Flask应用。
-此文件从app模块导入Flask应用实例,并在脚本直接运行时启动应用。
-模块:app (module): 包含Flask应用实例的模块。
+此文件调用 create_app 创建Flask应用实例,并在脚本直接运行时启动应用。
+每个 gunicorn 工作进程导入此文件时都会启动后台清理调度器，由文件锁保证只有一个进程执行清理。
+模块:app (module): 提供 create_app 工厂函数的模块。
 运行方式:直接运行此脚本将启动Flask开发服务器。
 """
-from app import app
+from app import create_app
+
+app = create_app()
+maintenance_scheduler = app.extensions['maintenance_scheduler']
+
+# 启动后台清理过期预订的任务
+maintenance_scheduler.start()
 
 if __name__ == "__main__":
     app.run()